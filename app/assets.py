@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+静态资源发布
+- 构建（scripts/build_assets.py）：把 static/ 下的 css/js 复制到 static/dist/，文件名带内容哈希，
+  CSS 去掉注释与缩进，同时生成 .gz 预压缩版本，并写出 manifest.json（原路径 -> 带哈希路径）
+- 运行时：模板统一用 asset_url('css/custom.css')；生产模式且 manifest 存在时指向带哈希的文件，
+  按 Accept-Encoding 直接返回 .gz，并设置一年 immutable 缓存；开发模式与 url_for('static', ...) 完全一致
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from flask import Flask, current_app, request, send_from_directory, url_for
+
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+ASSET_EXTENSIONS = (".css", ".js")
+# 文件名已带内容哈希，内容变化必然换 URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CSS_COMMENT = re.compile(r"/\*(?!!).*?\*/", re.S)
+
+
+def minify_css(text: str) -> str:
+	"""保守压缩：去掉普通注释（保留 /*! 版权注释）、缩进与空行，不改动任何声明。"""
+	text = _CSS_COMMENT.sub("", text)
+	return "\n".join(line.strip() for line in text.splitlines() if line.strip()) + "\n"
+
+
+def _hashed_name(rel_path: str, data: bytes) -> str:
+	root, ext = os.path.splitext(rel_path)
+	return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def build_assets(static_dir: str) -> Dict[str, str]:
+	"""生成 static/dist 与 manifest.json，返回 manifest。旧的构建产物会被清掉。"""
+	dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+	if os.path.isdir(dist_dir):
+		for root, _dirs, files in os.walk(dist_dir, topdown=False):
+			for name in files:
+				os.remove(os.path.join(root, name))
+			os.rmdir(root)
+
+	manifest: Dict[str, str] = {}
+	for root, dirs, files in os.walk(static_dir):
+		dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist_dir)
+		for name in sorted(files):
+			if not name.endswith(ASSET_EXTENSIONS):
+				continue
+			src = os.path.join(root, name)
+			rel = os.path.relpath(src, static_dir).replace(os.sep, "/")
+			with open(src, "rb") as f:
+				data = f.read()
+			# .min.css 同样压缩：文件名不代表内容已压缩（如 icons/font-awesome.min.css），保守压缩可重复执行
+			if name.endswith(".css"):
+				data = minify_css(data.decode("utf-8")).encode("utf-8")
+
+			hashed = _hashed_name(rel, data)
+			dst = os.path.join(dist_dir, hashed)
+			os.makedirs(os.path.dirname(dst), exist_ok=True)
+			with open(dst, "wb") as f:
+				f.write(data)
+			# mtime=0：同样的输入得到同样的 .gz
+			gz = gzip.compress(data, compresslevel=9, mtime=0)
+			if len(gz) < len(data):
+				with open(dst + ".gz", "wb") as f:
+					f.write(gz)
+			manifest[rel] = f"{DIST_DIRNAME}/{hashed}"
+
+	os.makedirs(dist_dir, exist_ok=True)
+	with open(os.path.join(dist_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+		json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+	return manifest
+
+
+def load_manifest(static_dir: str) -> Optional[Dict[str, str]]:
+	path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+	if not os.path.exists(path):
+		return None
+	with open(path, "r", encoding="utf-8") as f:
+		return json.load(f)
+
+
+def asset_url(filename: str) -> str:
+	"""模板用：与 url_for('static', filename=...) 等价，生产模式下替换为带哈希的文件名。"""
+	manifest = current_app.extensions.get("asset_manifest") or {}
+	return url_for("static", filename=manifest.get(filename, filename))
+
+
+def _send_static(filename: str):
+	app = current_app
+	is_dist = filename.startswith(DIST_DIRNAME + "/")
+	# 按 q 值判断（gzip;q=0 表示明确拒绝，* 可匹配 gzip），不做子串匹配
+	if is_dist and request.accept_encodings["gzip"] > 0:
+		if os.path.exists(os.path.join(app.static_folder, filename + ".gz")):
+			resp = send_from_directory(app.static_folder, filename + ".gz")
+			resp.headers["Content-Encoding"] = "gzip"
+			resp.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+			resp.headers["Vary"] = "Accept-Encoding"
+			resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+			return resp
+
+	resp = app.send_static_file(filename)
+	if is_dist:
+		resp.headers["Vary"] = "Accept-Encoding"
+		resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+	return resp
+
+
+def init_assets(app: Flask, production: bool = False) -> None:
+	"""注册 asset_url 模板函数；生产模式下加载 manifest 并接管 static 路由。"""
+	app.jinja_env.globals["asset_url"] = asset_url
+	if not production:
+		return
+
+	manifest = load_manifest(app.static_folder)
+	if manifest is None:
+		app.logger.warning("未找到 %s，静态资源按原文件名提供（先运行 python scripts/build_assets.py）", MANIFEST_NAME)
+		return
+	app.extensions["asset_manifest"] = manifest
+	app.view_functions["static"] = _send_static
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+题库类 JSON 接口的 HTTP 条件缓存
+- ETag 由题库版本号、最后变更时间与应用构建标识组成；Last-Modified 取最后变更时间
+  （换库后版本号可能重复、发版后响应结构可能变化，都不能复用旧的缓存）
+- 客户端带 If-None-Match / If-Modified-Since 且题库未变时直接返回 304，不进入视图函数
+- Cache-Control: no-cache —— 浏览器可以缓存，但每次使用前都要向服务端验证
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+from werkzeug.http import is_resource_modified
+
+from app.database.bank import bank_cache
+
+CACHE_CONTROL = "no-cache"
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_build_id = None
+
+
+def _source_digest() -> str:
+	# 未显式指定时取 app/ 下全部 Python 源码的摘要：代码变了构建标识就变
+	h = hashlib.sha256()
+	for root, dirs, files in os.walk(_APP_DIR):
+		dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+		for name in sorted(files):
+			if name.endswith(".py"):
+				path = os.path.join(root, name)
+				h.update(os.path.relpath(path, _APP_DIR).encode("utf-8"))
+				with open(path, "rb") as f:
+					h.update(f.read())
+	return h.hexdigest()[:10]
+
+
+def build_id() -> str:
+	"""应用构建标识：APP_BUILD_ID 环境变量优先（发布流水线可传提交号），否则按源码计算一次。"""
+	global _build_id
+	if _build_id is None:
+		_build_id = os.environ.get("APP_BUILD_ID", "").strip() or _source_digest()
+	return _build_id
+
+
+def bank_conditional(view):
+	@wraps(view)
+	def wrapper(*args, **kwargs):
+		snap = bank_cache.snapshot()
+		etag = f"bank-{snap.version}-{snap.updated_at}-{build_id()}"
+		last_modified = datetime.fromtimestamp(snap.updated_at, tz=timezone.utc)
+
+		if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+			resp = make_response("", 304)
+		else:
+			resp = make_response(view(*args, **kwargs))
+			if resp.status_code != 200:
+				return resp
+
+		# 题库版本 + 变更时间 + 构建标识覆盖所有影响响应内容的因素；缓存按完整 URL（含查询参数）区分
+		resp.set_etag(etag, weak=True)
+		resp.last_modified = last_modified
+		resp.headers["Cache-Control"] = CACHE_CONTROL
+		return resp
+
+	return wrapper
@@ -1,147 +1,119 @@
 from __future__ import annotations
 
-import random
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Optional
 
 from flask import Blueprint, jsonify, render_template, request, session
 
-from app.database.db import fetch_all, fetch_one, get_conn, init_schema
+from app.core.interview_simulator import InterviewSimulator, finish_exam, parse_answers
+from app.core.question_bank import question_bank
+from app.core.user_progress import user_progress
+from app.database.attempt_log import EXAM_ATTEMPT_INSERT
+from app.database.bank import normalize_answer
+from app.database.exam_sessions import MODE_BUNDLE, MODE_STEP, ExamSession, exam_store
 
 bp = Blueprint("interview", __name__)
 
+# 到时后仍接受提交/交卷的秒数（网络延迟、前端计时误差），超过即按超时处理
+DEADLINE_GRACE_SECONDS = 15
 
-def _normalize_answer(ans: str) -> str:
-	if not ans:
-		return ""
-	ans = ans.upper()
-	ans = "".join([c for c in ans if c in "ABCD"])
-	return "".join(sorted(ans))
-
-
-def _visible_where(category_key: str) -> Tuple[str, Tuple[Any, ...]]:
-	# 与题库分类页口径一致（basic/framework/project）
-	key = (category_key or "").lower().strip()
-	if key == "basic":
-		return "(category LIKE '%Basics%' OR category LIKE '%基础%')", ()
-	if key == "framework":
-		return "(category LIKE '%Flask%' OR category LIKE '%框架%')", ()
-	if key == "project":
-		return "(category LIKE '%Project%' OR category LIKE '%项目%')", ()
-	# all：三类合并（避免抽到“题库页看不到”的题导致用户困惑）
-	return (
-		"(category LIKE '%Basics%' OR category LIKE '%基础%' OR category LIKE '%Flask%' OR category LIKE '%框架%' OR category LIKE '%Project%' OR category LIKE '%项目%')",
-		(),
-	)
 
+def _parse_mix(raw: Any) -> Optional[Dict[str, float]]:
+	# {"Easy": 40, "Medium": 40, "Hard": 20}：按比例分配，不要求加起来等于 100
+	if raw is None:
+		return None
+	if not isinstance(raw, dict):
+		raise ValueError("difficulty_mix")
+	mix = {str(k): float(v) for k, v in raw.items()}
+	if any(v < 0 for v in mix.values()):
+		raise ValueError("difficulty_mix")
+	return mix
 
-def _pick_question_ids(count: int, category: str = "all") -> List[int]:
-	where, params = _visible_where(category)
-	rows = fetch_all(f"SELECT id FROM questions WHERE {where} ORDER BY id ASC", params)
-	ids = [int(r["id"]) for r in rows]
-	if not ids:
-		return []
-	count = max(1, min(int(count), 50, len(ids)))  # 上限保护
-	return random.sample(ids, count)
 
+def _current_exam() -> Optional[ExamSession]:
+	# cookie 里只有会话 id，状态在服务端（exam_sessions）
+	return exam_store.get(session.get("exam_id"))
 
-def _get_question_payload(question_id: int) -> Optional[Dict[str, Any]]:
-	q = fetch_one(
-		"""
-		SELECT id, category, title, option_a, option_b, option_c, option_d, difficulty
-		FROM questions
-		WHERE id=?
-		""",
-		(question_id,),
-	)
-	if not q:
-		return None
 
-	a = fetch_one("SELECT correct_answer FROM answers WHERE question_id=?", (question_id,))
-	correct = _normalize_answer((a or {}).get("correct_answer", ""))
-	q_type = "multi" if len(correct) > 1 else "single"
-
-	return {
-		"id": q["id"],
-		"title": q["title"],
-		"category": q.get("category") or "",
-		"difficulty": q.get("difficulty") or "Easy",
-		"type": q_type,
-		"options": [
-			{"option_key": "A", "option_content": q.get("option_a") or ""},
-			{"option_key": "B", "option_content": q.get("option_b") or ""},
-			{"option_key": "C", "option_content": q.get("option_c") or ""},
-			{"option_key": "D", "option_content": q.get("option_d") or ""},
-		],
-	}
+def _timed_out(exam: ExamSession) -> bool:
+	return time.time() > exam.deadline + DEADLINE_GRACE_SECONDS
+
+
+def _get_question_payload(question_id: int) -> Optional[Dict[str, Any]]:
+	return question_bank.get_payload(question_id)
 
 
 @bp.get("/interview/mock")
 @bp.get("/exam/mock")
 def mock_interview():
-	init_schema()
 	return render_template("mock_interview.html")
 
 
 @bp.post("/exam/api/start")
 def api_start():
-	init_schema()
 	payload = request.get_json(silent=True) or {}
 	count = int(payload.get("count") or 10)
 	category = str(payload.get("category") or "all")
 	time_limit = int(payload.get("time_limit_seconds") or 10 * 60)  # 默认 10 分钟
 	time_limit = max(60, min(time_limit, 60 * 60))  # 1min~60min
+	# bundle=true：一次下发整卷（不含答案），前端本地作答，交卷时统一判分
+	mode = MODE_BUNDLE if payload.get("bundle") else MODE_STEP
 
-	ids = _pick_question_ids(count=count, category=category)
+	try:
+		difficulty_mix = _parse_mix(payload.get("difficulty_mix"))
+		hf_weight = float(payload.get("high_frequency_weight") or 1.0)
+	except (TypeError, ValueError):
+		return jsonify({"success": False, "msg": "抽题参数无效"}), 400
+	if hf_weight < 0:
+		return jsonify({"success": False, "msg": "抽题参数无效"}), 400
+
+	# 在预先分好桶的抽题索引上抽样，代价与题量成正比，与题库大小无关
+	sim = InterviewSimulator(question_bank)
+	sim.generate_exam(category=category, count=count, difficulty_mix=difficulty_mix, high_frequency_weight=hf_weight)
+	ids = sim.question_ids
 	if not ids:
 		return jsonify({"success": False, "msg": "题库为空或该分类下无题目"}), 400
 
-	now = int(time.time())
-	session["mock"] = {
-		"ids": ids,
-		"idx": 0,
-		"start_ts": now,
-		"time_limit": time_limit,
-		"category": category,
-		"answers": {},  # qid -> {user_answer,is_correct}
+	# exams 里留下这一场的记录，进行中的状态放在 exam_sessions
+	record_id = sim.start_exam(time_limit=time_limit, mode=mode)
+	exam = exam_store.create(ids, time_limit=time_limit, category=category, mode=mode, record_id=record_id)
+	session.pop("mock", None)  # 旧版本放在 cookie 里的整场状态
+	session["exam_id"] = exam.id
+
+	data = {
+		"mode": mode,
+		"total": len(ids),
+		"index": 1,
+		"time_limit_seconds": time_limit,
+		"start_ts": exam.start_ts,
+		"question_ids": ids,
+		"question": _get_question_payload(ids[0]),
 	}
-
-	first = _get_question_payload(ids[0])
-	return jsonify(
-		{
-			"success": True,
-			"data": {
-				"total": len(ids),
-				"index": 1,
-				"time_limit_seconds": time_limit,
-				"start_ts": now,
-				"question": first,
-			},
-		}
-	)
+	if mode == MODE_BUNDLE:
+		data["questions"] = question_bank.get_payloads(ids)
+	return jsonify({"success": True, "data": data})
 
 
 @bp.get("/exam/api/question")
 def api_current_question():
-	init_schema()
-	state = session.get("mock") or {}
-	ids = state.get("ids") or []
-	idx = int(state.get("idx") or 0)
-
-	if not ids:
+	exam = _current_exam()
+	if exam is None:
 		return jsonify({"success": False, "msg": "未开始模拟面试，请先开始"}), 400
-	if idx < 0 or idx >= len(ids):
+	ids, idx = exam.question_ids, exam.idx
+	if exam.finished:
 		return jsonify({"success": False, "msg": "模拟面试已结束"}), 400
 
-	q = _get_question_payload(int(ids[idx]))
+	q = _get_question_payload(ids[idx])
 	return jsonify(
 		{
 			"success": True,
 			"data": {
+				"mode": exam.mode,
 				"total": len(ids),
 				"index": idx + 1,
-				"time_limit_seconds": int(state.get("time_limit") or 0),
-				"start_ts": int(state.get("start_ts") or 0),
+				"time_limit_seconds": exam.time_limit,
+				"start_ts": exam.start_ts,
+				"question_ids": ids,
 				"question": q,
 			},
 		}
@@ -150,15 +122,14 @@ def api_current_question():
 
 @bp.post("/exam/api/submit")
 def api_submit():
-	init_schema()
-	state = session.get("mock") or {}
-	ids = state.get("ids") or []
-	idx = int(state.get("idx") or 0)
-
-	if not ids:
+	exam = _current_exam()
+	if exam is None:
 		return jsonify({"success": False, "msg": "未开始模拟面试"}), 400
-	if idx < 0 or idx >= len(ids):
+	ids, idx = exam.question_ids, exam.idx
+	if exam.finished:
 		return jsonify({"success": False, "msg": "模拟面试已结束"}), 400
+	if _timed_out(exam):
+		return jsonify({"success": False, "msg": "已超过作答时间，请交卷"}), 400
 
 	payload = request.get_json(silent=True) or {}
 	try:
@@ -166,39 +137,36 @@ def api_submit():
 	except Exception:
 		return jsonify({"success": False, "msg": "question_id 无效"}), 400
 
-	current_id = int(ids[idx])
+	current_id = ids[idx]
 	if question_id != current_id:
 		return jsonify({"success": False, "msg": "题目状态不同步，请刷新重试"}), 409
 
-	user_answer = _normalize_answer(payload.get("user_answer", ""))
+	user_answer = normalize_answer(payload.get("user_answer", ""))
 	if not user_answer:
 		return jsonify({"success": False, "msg": "请选择答案后提交"}), 400
 
-	a = fetch_one("SELECT correct_answer, analysis, knowledge_point FROM answers WHERE question_id=?", (question_id,))
-	correct = _normalize_answer((a or {}).get("correct_answer", ""))
+	q = question_bank.get_record(question_id)
+	if not q:
+		return jsonify({"success": False, "msg": "题目不存在"}), 404
+	correct = q.correct_answer
 
 	is_correct = 1 if (correct and user_answer == correct) else 0
 
-	# 写入练习记录（用于进度统计）
-	q_meta = fetch_one("SELECT category, difficulty FROM questions WHERE id=?", (question_id,)) or {}
-	with get_conn() as conn:
-		conn.execute(
-			"""
-			INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty)
-			VALUES(1,?,?,?,?,?)
-			""",
-			(question_id, user_answer, is_correct, q_meta.get("category"), q_meta.get("difficulty")),
-		)
-
-	# 更新 session
-	answers = state.get("answers") or {}
-	answers[str(question_id)] = {"user_answer": user_answer, "is_correct": bool(is_correct)}
-	state["answers"] = answers
-
-	# 前进
+	# 记录答案并前进；练习记录（用于进度统计）与会话状态在同一事务里写入（会话本来就要提交一次，不走后写队列）
+	exam.answers[str(question_id)] = {"user_answer": user_answer, "is_correct": bool(is_correct)}
 	next_idx = idx + 1
-	state["idx"] = next_idx
-	session["mock"] = state
+	exam.idx = next_idx
+	row = (
+		exam.user_id, question_id, user_answer, is_correct, q.category, q.difficulty, int(time.time()), exam.record_id,
+	)
+	rev = []
+	saved = exam_store.save(
+		exam, also=lambda conn: rev.append(user_progress.insert_attempts(conn, [row], EXAM_ATTEMPT_INSERT))
+	)
+	if not saved:
+		# 同一场考试的另一个请求先一步提交了
+		return jsonify({"success": False, "msg": "题目状态不同步，请刷新重试"}), 409
+	user_progress.note_attempts([row], rev[-1])
 
 	finished = next_idx >= len(ids)
 	next_qid = None if finished else int(ids[next_idx])
@@ -209,8 +177,8 @@ def api_submit():
 			"data": {
 				"is_correct": bool(is_correct),
 				"correct_answer": correct,
-				"analysis": (a or {}).get("analysis") or "",
-				"knowledge_point": (a or {}).get("knowledge_point") or "",
+				"analysis": q.analysis,
+				"knowledge_point": q.knowledge_point,
 				"finished": finished,
 				"next_question_id": next_qid,
 				"progress": {"total": len(ids), "index": min(next_idx + 1, len(ids))},
@@ -221,26 +189,78 @@ def api_submit():
 
 @bp.post("/exam/api/finish")
 def api_finish():
-	init_schema()
-	state = session.get("mock") or {}
-	answers = state.get("answers") or {}
-	total = len(state.get("ids") or [])
-	correct = sum(1 for v in answers.values() if v.get("is_correct") is True)
-	wrong = max(0, len(answers) - correct)
+	exam = _current_exam()
+	if exam is None:
+		session.pop("exam_id", None)
+		return jsonify(
+			{"success": True, "data": {"total": 0, "answered": 0, "correct": 0, "wrong": 0, "accuracy": 0, "results": []}}
+		)
 
-	# 可选：结束后清理 session
-	session.pop("mock", None)
+	# 整卷模式在这里一次性判分：只收本场、且尚未逐题提交过的题；超时后提交的答案不计入
+	payload = request.get_json(silent=True) or {}
+	timed_out = _timed_out(exam)
+	submitted = {} if timed_out else parse_answers(payload.get("answers"))
+	records = {q.id: q for q in question_bank.get_records(exam.question_ids)}
+	now = int(time.time())
+	rows = []
+	for qid in exam.question_ids:
+		ans = submitted.get(qid)
+		q = records.get(qid)
+		if not ans or q is None or str(qid) in exam.answers:
+			continue
+		is_correct = 1 if (q.correct_answer and ans == q.correct_answer) else 0
+		exam.answers[str(qid)] = {"user_answer": ans, "is_correct": bool(is_correct)}
+		rows.append((exam.user_id, qid, ans, is_correct, q.category, q.difficulty, now, exam.record_id))
+
+	answered = len(exam.answers)
+	correct = sum(1 for v in exam.answers.values() if v.get("is_correct") is True)
+
+	rev = []
+
+	def _finish(conn) -> None:
+		if rows:
+			rev.append(user_progress.insert_attempts(conn, rows, EXAM_ATTEMPT_INSERT))
+		if exam.record_id is not None:  # 迁移前开始的会话没有对应记录
+			finish_exam(conn, exam.record_id, answered, correct, timed_out, now)
+
+	# 全部答题记录、成绩与删除会话在同一个事务里
+	closed = exam_store.close(exam, also=_finish)
+	if not closed:
+		# 会话还在（被并发请求改过），保留 cookie 里的 exam_id，刷新重试时答卷不丢
+		return jsonify({"success": False, "msg": "模拟面试状态已变化，请刷新重试"}), 409
+	session.pop("exam_id", None)
+	if rows:
+		user_progress.note_attempts(rows, rev[-1])
+
+	results = []
+	for qid in exam.question_ids:
+		q = records.get(qid)
+		given = exam.answers.get(str(qid)) or {}
+		results.append(
+			{
+				"question_id": qid,
+				"title": q.title if q else "",
+				"user_answer": given.get("user_answer"),
+				"is_correct": bool(given.get("is_correct")),
+				"correct_answer": q.correct_answer if q else "",
+				"analysis": q.analysis if q else "",
+				"knowledge_point": q.knowledge_point if q else "",
+			}
+		)
 
+	total = len(exam.question_ids)
 	accuracy = int(round((correct / total) * 100, 0)) if total else 0
 	return jsonify(
 		{
 			"success": True,
 			"data": {
 				"total": total,
-				"answered": len(answers),
+				"answered": answered,
 				"correct": correct,
-				"wrong": wrong,
+				"wrong": max(0, answered - correct),
 				"accuracy": accuracy,
+				"timed_out": timed_out,
+				"results": results,
 			},
 		}
 	)
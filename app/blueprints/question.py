@@ -2,40 +2,31 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify, redirect, render_template, request, url_for
 
-from app.database.db import fetch_all, fetch_one, get_conn, init_schema
+from app.blueprints.caching import bank_conditional
+from app.core.question_bank import DEFAULT_PAGE_SIZE, question_bank
+from app.core.user_progress import user_progress
+from app.database.bank import normalize_answer
+from app.database.categories import normalize_key
 
 bp = Blueprint("question", __name__)
 
+# 批量取题单次请求的题目数上限
+MAX_BATCH_IDS = 100
 
-def _normalize_answer(ans: str) -> str:
-	if not ans:
-		return ""
-	ans = ans.upper()
-	ans = "".join([c for c in ans if c in "ABCD"])
-	return "".join(sorted(ans))
-
-
-def _category_filter(category_key: str):
-	# 前端传 basic/framework/project
-	key = (category_key or "").lower().strip()
-	if key == "basic":
-		return "(category LIKE '%Basics%' OR category LIKE '%基础%')"
-	if key == "framework":
-		return "(category LIKE '%Flask%' OR category LIKE '%框架%')"
-	if key == "project":
-		return "(category LIKE '%Project%' OR category LIKE '%项目%')"
-	return "1=1"
+# 全文检索分页
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+# 深翻页时 OFFSET 要先排完前面所有命中，限制最大页码
+MAX_SEARCH_PAGE = 50
 
 
 @bp.get("/category")
 def question_category():
-	init_schema()
 	return render_template("question_category.html")
 
 
 @bp.get("/answer")
 def answer_page():
-	init_schema()
 	question_id = request.args.get("question_id", "1")
 	return render_template("answer_page.html", question_id=question_id)
 
@@ -48,7 +39,6 @@ def detail(question_id: int):
 
 @bp.get("/explanation/<int:question_id>")
 def explanation(question_id: int):
-	init_schema()
 	# explanation.html 由前端 JS 调 API 填充，模板只负责 UI 容器
 	return render_template("explanation.html", question_id=question_id)
 
@@ -56,139 +46,157 @@ def explanation(question_id: int):
 # ---------------- API ----------------
 
 @bp.get("/api/questions")
+@bank_conditional
 def api_questions():
-	init_schema()
+	# 游标分页：after=上一页最后一个 id，limit 每页条数；fields 可选返回列
 	category = request.args.get("category", "")
-	where = _category_filter(category)
 
-	rows = fetch_all(
-		f"SELECT id, title, category FROM questions WHERE {where} ORDER BY id ASC"
-	)
-	return jsonify({"success": True, "data": rows})
+	difficulty = request.args.get("difficulty", "").strip()
+	if difficulty and not question_bank.known_difficulty(difficulty):
+		return jsonify({"success": False, "msg": "difficulty 无效"}), 400
 
+	high_frequency = request.args.get("high_frequency", "").strip()
+	if high_frequency and high_frequency not in ("0", "1"):
+		return jsonify({"success": False, "msg": "high_frequency 无效"}), 400
 
-@bp.get("/api/question/<int:question_id>")
-def api_question(question_id: int):
-	init_schema()
-	q = fetch_one(
-		"""
-		SELECT id, category, title, option_a, option_b, option_c, option_d, difficulty
-		FROM questions
-		WHERE id=?
-		""",
-		(question_id,),
-	)
-	if not q:
-		return jsonify({"success": False, "msg": "题目不存在"}), 404
+	try:
+		after = int(request.args.get("after") or 0)
+		limit = int(request.args.get("limit") or DEFAULT_PAGE_SIZE)
+	except ValueError:
+		return jsonify({"success": False, "msg": "分页参数无效"}), 400
 
-	a = fetch_one("SELECT correct_answer FROM answers WHERE question_id=?", (question_id,))
-	correct = _normalize_answer((a or {}).get("correct_answer", ""))
+	fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+	try:
+		page = question_bank.get_questions_by_category(
+			category,
+			difficulty=difficulty or None,
+			high_frequency=int(high_frequency) if high_frequency else None,
+			after=after,
+			limit=limit,
+			fields=fields,
+		)
+	except ValueError as e:
+		return jsonify({"success": False, "msg": str(e)}), 400
+
+	result = {
+		"success": True,
+		"data": page["questions"],
+		"has_more": page["has_more"],
+		"next_cursor": page["next_cursor"],
+	}
+	if "total" in page:
+		result["total"] = page["total"]
+	return jsonify(result)
+
+
+@bp.get("/api/search")
+@bank_conditional
+def api_search():
+	# q=关键词（空格分隔多个词，全部命中）；category=basic/framework/project；page 从 1 开始
+	query = request.args.get("q", "").strip()
+	if not query:
+		return jsonify({"success": False, "msg": "缺少 q"}), 400
+	category = request.args.get("category", "").strip()
+	category_key = normalize_key(category) if category else None
+	if category and not category_key:
+		return jsonify({"success": False, "msg": "category 无效"}), 400
+	try:
+		page = int(request.args.get("page") or 1)
+		page_size = int(request.args.get("page_size") or DEFAULT_SEARCH_PAGE_SIZE)
+	except ValueError:
+		return jsonify({"success": False, "msg": "分页参数无效"}), 400
+	if page < 1 or page > MAX_SEARCH_PAGE:
+		return jsonify({"success": False, "msg": f"page 取值 1~{MAX_SEARCH_PAGE}"}), 400
+	page_size = max(1, min(page_size, MAX_SEARCH_PAGE_SIZE))
+
+	result = question_bank.search(query, category=category_key or "", limit=page_size, offset=(page - 1) * page_size)
+	return jsonify(
+		{
+			"success": True,
+			"data": result.items,
+			"page": page,
+			"page_size": page_size,
+			"has_more": result.has_more and page < MAX_SEARCH_PAGE,
+			"ranked": result.ranked,
+		}
+	)
 
-	q_type = "multi" if len(correct) > 1 else "single"
-	options = [
-		{"option_key": "A", "option_content": q.get("option_a") or ""},
-		{"option_key": "B", "option_content": q.get("option_b") or ""},
-		{"option_key": "C", "option_content": q.get("option_c") or ""},
-		{"option_key": "D", "option_content": q.get("option_d") or ""},
-	]
 
+@bp.get("/api/questions/batch")
+@bank_conditional
+def api_questions_batch():
+	# ids=1,2,3（也兼容 ids=1&ids=2）
+	raw = ",".join(request.args.getlist("ids"))
+	try:
+		ids = [int(x) for x in raw.split(",") if x.strip()]
+	except ValueError:
+		return jsonify({"success": False, "msg": "ids 无效"}), 400
+	if not ids:
+		return jsonify({"success": False, "msg": "缺少 ids"}), 400
+	ids = list(dict.fromkeys(ids))
+	if len(ids) > MAX_BATCH_IDS:
+		return jsonify({"success": False, "msg": f"一次最多获取 {MAX_BATCH_IDS} 道题"}), 400
+
+	found = question_bank.get_payloads(ids)
+	found_ids = {q["id"] for q in found}
 	return jsonify(
 		{
 			"success": True,
-			"data": {
-				"id": q["id"],
-				"title": q["title"],
-				"category": q["category"],
-				"difficulty": q.get("difficulty") or "Easy",
-				"type": q_type,
-				"options": options,
-			},
+			"data": found,
+			"missing": [i for i in ids if i not in found_ids],
 		}
 	)
 
 
+@bp.get("/api/question/<int:question_id>")
+@bank_conditional
+def api_question(question_id: int):
+	q = question_bank.get_payload(question_id)
+	if not q:
+		return jsonify({"success": False, "msg": "题目不存在"}), 404
+
+	return jsonify({"success": True, "data": q})
+
+
 @bp.post("/api/submit_answer")
 def api_submit_answer():
-	init_schema()
 	payload = request.get_json(silent=True) or {}
 	try:
 		question_id = int(payload.get("question_id"))
 	except Exception:
 		return jsonify({"success": False, "msg": "question_id 无效"}), 400
 
-	user_answer = _normalize_answer(payload.get("user_answer", ""))
-
-	q = fetch_one(
-		"SELECT id, category, difficulty FROM questions WHERE id=?",
-		(question_id,),
-	)
-	if not q:
+	# 判分、写入答题记录（同步，或开启 ATTEMPT_WRITE_BEHIND 后交给后写队列）并更新进度缓存
+	result = user_progress.submit_answer(question_id, payload.get("user_answer", ""))
+	if result is None:
 		return jsonify({"success": False, "msg": "题目不存在"}), 404
 
-	a = fetch_one("SELECT correct_answer FROM answers WHERE question_id=?", (question_id,))
-	correct = _normalize_answer((a or {}).get("correct_answer", ""))
-
-	is_correct = 1 if (user_answer and correct and user_answer == correct) else 0
-
-	with get_conn() as conn:
-		conn.execute(
-			"""
-			INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty)
-			VALUES(1,?,?,?,?,?)
-			""",
-			(question_id, user_answer, is_correct, q.get("category"), q.get("difficulty")),
-		)
-
-	return jsonify(
-		{
-			"success": True,
-			"data": {
-				"question_id": question_id,
-				"user_answer": user_answer,
-				"correct_answer": correct,
-				"is_correct": bool(is_correct),
-			},
-		}
-	)
+	return jsonify({"success": True, "data": result})
 
 
 @bp.get("/api/explanation/<int:question_id>")
+@bank_conditional
 def api_explanation(question_id: int):
-	init_schema()
-	user_answer = _normalize_answer(request.args.get("user_answer", ""))
-
-	q = fetch_one(
-		"""
-		SELECT id, title FROM questions WHERE id=?
-		""",
-		(question_id,),
-	)
+	user_answer = normalize_answer(request.args.get("user_answer", ""))
+
+	q = question_bank.get_record(question_id)
 	if not q:
 		return jsonify({"success": False, "msg": "题目不存在"}), 404
 
-	a = fetch_one(
-		"""
-		SELECT correct_answer, analysis, knowledge_point
-		FROM answers
-		WHERE question_id=?
-		""",
-		(question_id,),
-	) or {}
-
-	correct = _normalize_answer(a.get("correct_answer", ""))
+	correct = q.correct_answer
 	is_correct = bool(user_answer and correct and user_answer == correct)
 
 	return jsonify(
 		{
 			"success": True,
 			"data": {
-				"id": q["id"],
-				"title": q["title"],
+				"id": q.id,
+				"title": q.title,
 				"user_answer": user_answer or "未作答",
 				"correct_answer": correct or "--",
 				"is_correct": is_correct,
-				"analysis": a.get("analysis") or "",
-				"knowledge_point": a.get("knowledge_point") or "",
+				"analysis": q.analysis,
+				"knowledge_point": q.knowledge_point,
 			},
 		}
 	)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+模拟面试引擎
+- 抽题：在题库读服务的抽题索引上抽样（按 分类键 × 难度 预先分桶、桶内再分高频/普通两组，题库版本变化才重建），
+  每场只做 O(题量) 次随机选择，并发开考时不查库
+- 记录：每一场在 exams 表里有一行（题目、开始/交卷时间、成绩）；答题记录写入 attempts 并带上 exam_id，
+  一场的全部答案与成绩在同一个写事务里 executemany 写入
+- Web 端进行中的状态仍由 exam_sessions 保存（见 app/blueprints/interview.py），本模块负责抽题与落库
+- 旧库（scripts/init_db.py 建出的 user_records 结构，没有 exams 表）：答案写入 user_records，
+  exam_id 在写入事务里取 user_records 已有的最大值 + 1
+"""
+from __future__ import annotations
+
+import json
+import random
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.core.question_bank import QuestionBank, question_bank as default_question_bank
+from app.database.attempt_log import EXAM_ATTEMPT_INSERT
+from app.database.bank import normalize_answer
+from app.database.categories import VISIBLE_KEYS
+from app.database.db import ConnectionPool, get_pool, run_write
+from app.database.db_manager import DBManager
+from app.database.exam_sessions import MODE_STEP
+
+DEFAULT_EXAM_QUESTIONS = 10
+MAX_EXAM_QUESTIONS = 50  # 上限保护
+
+LEGACY_RECORD_INSERT = """
+	INSERT INTO user_records(question_id, user_answer, is_correct, answer_time, exam_id)
+	VALUES(?,?,?,?,?)
+"""
+
+
+def parse_answers(raw: Any) -> Dict[int, str]:
+	"""交卷时的答案：{"12": "AB"} 或 [{"question_id": 12, "user_answer": "AB"}]；未作答的题不出现。"""
+	items = raw.items() if isinstance(raw, Mapping) else (
+		(a.get("question_id"), a.get("user_answer")) for a in (raw or []) if isinstance(a, Mapping)
+	)
+	out: Dict[int, str] = {}
+	for qid, ans in items:
+		try:
+			qid = int(qid)
+		except (TypeError, ValueError):
+			continue
+		ans = normalize_answer(ans or "")
+		if ans:
+			out[qid] = ans
+	return out
+
+
+def create_exam(
+	conn,
+	question_ids: Iterable[int],
+	category: str = "all",
+	mode: str = MODE_STEP,
+	time_limit: Optional[int] = None,
+	user_id: int = 1,
+	now: Optional[int] = None,
+) -> int:
+	"""新建一场模拟面试记录，返回 exams.id。"""
+	now = int(time.time()) if now is None else int(now)
+	return conn.execute(
+		"INSERT INTO exams(user_id, category, mode, question_ids, time_limit, started_ts) VALUES(?,?,?,?,?,?)",
+		(user_id, category, mode, json.dumps([int(i) for i in question_ids]), time_limit, now),
+	).lastrowid
+
+
+def finish_exam(
+	conn, exam_id: int, answered: int, correct: int, timed_out: bool = False, now: Optional[int] = None
+) -> None:
+	"""交卷：写入成绩与交卷时间（与答题记录在同一事务里调用）。"""
+	now = int(time.time()) if now is None else int(now)
+	conn.execute(
+		"UPDATE exams SET finished_ts = ?, answered = ?, correct = ?, timed_out = ? WHERE id = ?",
+		(now, int(answered), int(correct), int(bool(timed_out)), int(exam_id)),
+	)
+
+
+class InterviewSimulator:
+	"""一场模拟面试：generate_exam -> start_exam -> end_exam -> save_exam_record。
+
+	不传 db_manager 时使用 Web 应用的全局连接池。
+	"""
+
+	def __init__(
+		self,
+		question_bank: Optional[QuestionBank] = None,
+		db_manager: Optional[DBManager] = None,
+		user_id: int = 1,
+	) -> None:
+		self.qb = question_bank or default_question_bank
+		self.db = db_manager
+		self.user_id = user_id
+		self.category = "all"
+		self.mode = MODE_STEP
+		self.time_limit: Optional[int] = None
+		self.question_ids: List[int] = []
+		self.exam_id: Optional[int] = None
+		self.started_ts: Optional[int] = None
+		self.finished_ts: Optional[int] = None
+
+	def _pool(self) -> ConnectionPool:
+		return self.db.pool if self.db is not None else get_pool()
+
+	def _legacy(self) -> bool:
+		return self._pool().connection().execute("PRAGMA table_info(exams)").fetchone() is None
+
+	def category_keys(self, category: str) -> Tuple[str, ...]:
+		# 与题库分类页口径一致（basic/framework/project，也接受分类名）
+		key = self.qb.resolve_category(category)
+		if key:
+			return (key,)
+		# all：三类合并（避免抽到“题库页看不到”的题导致用户困惑）
+		return VISIBLE_KEYS
+
+	def generate_exam(
+		self,
+		category: str = "all",
+		count: int = DEFAULT_EXAM_QUESTIONS,
+		difficulty_mix: Optional[Mapping[str, float]] = None,
+		high_frequency_weight: float = 1.0,
+		rng: Optional[random.Random] = None,
+	) -> List[Dict[str, Any]]:
+		"""抽题并返回题目（含答案与解析，供判分/结果页使用）；题库为空或该分类下无题时返回空列表。"""
+		count = max(1, min(int(count), MAX_EXAM_QUESTIONS))
+		self.category = category
+		self.question_ids = self.qb.sampling_index().sample(
+			count, self.category_keys(category), difficulty_mix=difficulty_mix, hf_weight=high_frequency_weight, rng=rng
+		)
+		self.exam_id = self.started_ts = self.finished_ts = None
+		return [q for q in (self.qb.get_question_by_id(i) for i in self.question_ids) if q]
+
+	def start_exam(self, time_limit: Optional[int] = None, mode: str = MODE_STEP, now: Optional[int] = None) -> Optional[int]:
+		"""开考：写入 exams 记录并返回 exam_id（旧库在交卷写入时才分配，这里返回 None）。"""
+		self.time_limit = time_limit
+		self.mode = mode
+		self.started_ts = int(time.time()) if now is None else int(now)
+		self.finished_ts = None
+		if not self._legacy():
+			self.exam_id = run_write(
+				lambda conn: create_exam(
+					conn, self.question_ids, self.category, mode, time_limit, self.user_id, self.started_ts
+				),
+				pool=self._pool(),
+			)
+		return self.exam_id
+
+	def end_exam(self, now: Optional[int] = None) -> None:
+		self.finished_ts = int(time.time()) if now is None else int(now)
+
+	def save_exam_record(self, answers: Any, timed_out: bool = False) -> Dict[str, Any]:
+		"""判分并一次性写入全部答题记录与成绩（一个写事务、一次 executemany），返回成绩汇总。
+
+		answers 的格式见 parse_answers；不属于本场的题目忽略。
+		"""
+		if self.started_ts is None:
+			self.start_exam()
+		if self.finished_ts is None:
+			self.end_exam()
+		given = parse_answers(answers)
+		if self.question_ids:
+			exam_ids = set(self.question_ids)
+			given = {qid: ans for qid, ans in given.items() if qid in exam_ids}
+		records = {q.id: q for q in self.qb.get_records(list(given))}
+
+		graded = []
+		for qid, ans in given.items():
+			q = records.get(qid)
+			if q is not None:
+				graded.append((q, ans, 1 if (q.correct_answer and ans == q.correct_answer) else 0))
+		correct = sum(ok for _, _, ok in graded)
+		now = self.finished_ts
+		legacy = self._legacy()
+
+		def _write(conn) -> int:
+			if legacy:
+				exam_id = conn.execute("SELECT COALESCE(MAX(exam_id), 0) + 1 FROM user_records").fetchone()[0]
+				answer_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+				conn.executemany(
+					LEGACY_RECORD_INSERT, [(q.id, ans, ok, answer_time, exam_id) for q, ans, ok in graded]
+				)
+				return exam_id
+			exam_id = self.exam_id
+			if exam_id is None:
+				exam_id = create_exam(
+					conn, self.question_ids, self.category, self.mode, self.time_limit, self.user_id, self.started_ts
+				)
+			conn.executemany(
+				EXAM_ATTEMPT_INSERT,
+				[(self.user_id, q.id, ans, ok, q.category, q.difficulty, now, exam_id) for q, ans, ok in graded],
+			)
+			finish_exam(conn, exam_id, len(graded), correct, timed_out, now)
+			return exam_id
+
+		self.exam_id = run_write(_write, pool=self._pool())
+		total = len(self.question_ids) or len(graded)
+		return {
+			"exam_id": self.exam_id,
+			"total": total,
+			"answered": len(graded),
+			"correct": correct,
+			"wrong": len(graded) - correct,
+			"accuracy": int(round((correct / total) * 100, 0)) if total else 0,
+			"timed_out": bool(timed_out),
+		}
+
+	def finished_count(self) -> int:
+		"""该用户已交卷的模拟面试场次（首页展示）。"""
+		conn = self._pool().connection()
+		if self._legacy():
+			return conn.execute("SELECT COUNT(DISTINCT exam_id) FROM user_records WHERE exam_id IS NOT NULL").fetchone()[0]
+		return conn.execute(
+			"SELECT COUNT(1) FROM exams WHERE user_id = ? AND finished_ts IS NOT NULL", (self.user_id,)
+		).fetchone()[0]
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+题库读服务（题目数据的唯一读取入口，题库页、答题、模拟面试都经由这里）
+- 单题/批量取题走题库快照（app/database/bank.py），判分用的 QuestionRecord 也从这里取
+- 构建好的返回结构（题目 payload、分类列表分页、检索结果）放进按 LRU 淘汰的有界缓存，
+  键里不含版本号：题库版本一变整体清空，缓存条目数不超过 cache_size
+- 返回的 dict/list 在多个请求之间共享，调用方只读不改
+- 没有 meta 表的旧库（未执行迁移，如测试库、scripts/init_db.py 建出的库）无法感知题库变化，
+  不做缓存，每次直接查库
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.database.bank import (
+	QUESTION_SELECT,
+	BankCache,
+	BankSnapshot,
+	QuestionRecord,
+	bank_cache,
+	load_question,
+	load_questions,
+	record_from_row,
+)
+from app.database.categories import OTHER_KEY, category_key_for, category_key_sql, normalize_key
+from app.database.db import ConnectionPool, get_pool
+from app.database.db_manager import DBManager
+from app.database.sampling import SamplingIndex, sampling_index
+from app.database.search import SearchPage, search_questions
+
+# 缓存的返回结构条数上限
+PAYLOAD_CACHE_SIZE = int(os.environ.get("QUESTION_CACHE_SIZE", "4096"))
+
+# 分类列表分页
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+LIST_FIELDS = ("id", "title", "category", "category_key", "difficulty", "is_high_frequency")
+DEFAULT_LIST_FIELDS = ("id", "title", "category")
+
+DEFAULT_SEARCH_LIMIT = 20
+
+
+class _LRU:
+	"""线程安全的有界 LRU；题库版本变化时整体清空。"""
+
+	def __init__(self, max_size: int) -> None:
+		self.max_size = max(0, int(max_size))
+		self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+		self._lock = threading.Lock()
+		self._version: Optional[int] = None
+		self.hits = 0
+		self.misses = 0
+
+	def get_or_build(self, version: int, key: Hashable, build: Callable[[], Any]) -> Any:
+		with self._lock:
+			if self._version != version:
+				self._data.clear()
+				self._version = version
+			if key in self._data:
+				self._data.move_to_end(key)
+				self.hits += 1
+				return self._data[key]
+			self.misses += 1
+		# 构建（可能查库）不持锁；并发时同一个键可能构建两次，结果相同
+		value = build()
+		with self._lock:
+			# None（如题目不存在）不缓存：快照最多落后 check_interval 秒，刚导入的题要能回源取到
+			if value is not None and self._version == version and self.max_size:
+				self._data[key] = value
+				self._data.move_to_end(key)
+				while len(self._data) > self.max_size:
+					self._data.popitem(last=False)
+		return value
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+
+def detail_payload(q: QuestionRecord) -> Dict[str, Any]:
+	"""含答案与解析的题目结构（判分后展示、后台/脚本使用）。"""
+	data = q.to_payload()
+	data.update(
+		{
+			"category_key": q.category_key,
+			"is_high_frequency": q.is_high_frequency,
+			"correct_answer": q.correct_answer,
+			"analysis": q.analysis,
+			"knowledge_point": q.knowledge_point,
+		}
+	)
+	return data
+
+
+class QuestionBank:
+	"""题库读服务。
+
+	不传 db_manager 时使用 Web 应用的全局连接池与进程级题库快照（每次调用时解析，跟随 db.configure 切库）；
+	传入 DBManager 时在它的连接池上单独建快照。
+	"""
+
+	def __init__(self, db_manager: Optional[DBManager] = None, cache_size: int = PAYLOAD_CACHE_SIZE) -> None:
+		self.db = db_manager
+		self._bank = BankCache(pool=db_manager.pool) if db_manager is not None else bank_cache
+		self._cache = _LRU(cache_size)
+		self._schema_lock = threading.Lock()
+		self._schema: Optional[Tuple[str, bool, bool]] = None  # (db_path, 有 meta 表, 有 category_key 列)
+		self._sampling: Optional[Tuple[BankSnapshot, SamplingIndex]] = None
+
+	# ---------------- 内部 ----------------
+
+	def _pool(self) -> ConnectionPool:
+		return self.db.pool if self.db is not None else get_pool()
+
+	def _conn(self):
+		return self._pool().connection()
+
+	def _inspect(self) -> Tuple[bool, bool]:
+		pool = self._pool()
+		schema = self._schema
+		if schema is None or schema[0] != pool.db_path:
+			with self._schema_lock:
+				conn = pool.connection()
+				has_meta = conn.execute("PRAGMA table_info(meta)").fetchone() is not None
+				columns = {r[1] for r in conn.execute("PRAGMA table_info(questions)")}
+				schema = (pool.db_path, has_meta, "category_key" in columns)
+				self._schema = schema
+				self._cache.clear()
+		return schema[1], schema[2]
+
+	def _versioned(self) -> bool:
+		return self._inspect()[0]
+
+	def _memo(self, key: Hashable, build: Callable[[], Any]) -> Any:
+		if not self._versioned():
+			return build()
+		return self._cache.get_or_build(self._bank.snapshot().version, key, build)
+
+	# ---------------- 单题/批量 ----------------
+
+	def get_record(self, question_id: int) -> Optional[QuestionRecord]:
+		"""判分用的题目记录（含规整后的正确答案）。"""
+		if not self._versioned():
+			return load_question(self._conn(), int(question_id))
+		return self._bank.get(int(question_id))
+
+	def get_records(self, ids: Sequence[int]) -> List[QuestionRecord]:
+		"""按传入顺序返回存在的题目（重复 id 只保留一次）。"""
+		if not self._versioned():
+			found = load_questions(self._conn(), ids)
+			return [found[i] for i in dict.fromkeys(int(x) for x in ids) if i in found]
+		return self._bank.get_many(ids)
+
+	def _record_payload(self, kind: str, question_id: int, build: Callable[[QuestionRecord], Dict[str, Any]]):
+		def load() -> Optional[Dict[str, Any]]:
+			q = self.get_record(question_id)
+			return build(q) if q else None
+
+		return self._memo((kind, question_id), load)
+
+	def get_payload(self, question_id: int) -> Optional[Dict[str, Any]]:
+		"""答题页/模拟面试使用的题目结构（不含答案）。"""
+		return self._record_payload("payload", int(question_id), QuestionRecord.to_payload)
+
+	def get_payloads(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+		"""批量取不含答案的题目结构，按传入顺序，不存在的 id 跳过。"""
+		out = []
+		for q in self.get_records(ids):
+			out.append(self._memo(("payload", q.id), q.to_payload))
+		return out
+
+	def get_question_by_id(self, question_id: int) -> Optional[Dict[str, Any]]:
+		"""含正确答案、解析、考点的题目结构。"""
+		return self._record_payload("detail", int(question_id), detail_payload)
+
+	# ---------------- 抽题 ----------------
+
+	def sampling_index(self) -> SamplingIndex:
+		"""按 (分类键, 难度) 预先分好桶的抽题索引（见 app/database/sampling.py），题库版本变化才重建。"""
+		if self.db is None:
+			return sampling_index()
+		if not self._versioned():
+			# 旧库感知不到变化，每次按当前数据现建
+			rows = self._conn().execute(QUESTION_SELECT + " ORDER BY q.id").fetchall()
+			return SamplingIndex(BankSnapshot(0, {int(r["id"]): record_from_row(r) for r in rows}))
+		snap = self._bank.snapshot()
+		cached = self._sampling
+		if cached is None or cached[0] is not snap:
+			cached = (snap, SamplingIndex(snap))
+			self._sampling = cached
+		return cached[1]
+
+	# ---------------- 分类列表 ----------------
+
+	def resolve_category(self, category: str) -> str:
+		"""分类参数 -> 分类键：接受 basic/framework/project，也接受题库里的分类名（如 Python Basics）；
+		无法识别（含 all）时返回空串，表示不按分类过滤。"""
+		key = normalize_key(category)
+		if key or not category:
+			return key
+		key = category_key_for(category)
+		return "" if key == OTHER_KEY else key
+
+	def known_difficulty(self, value: str) -> bool:
+		# 按库里实际存在的难度取值校验；快照可能落后 check_interval 秒，没命中再走难度索引确认一次
+		if self._versioned() and value in self._bank.snapshot().difficulties:
+			return True
+		return self._conn().execute("SELECT 1 FROM questions WHERE difficulty = ? LIMIT 1", (value,)).fetchone() is not None
+
+	def get_questions_by_category(
+		self,
+		category: str = "",
+		difficulty: Optional[str] = None,
+		high_frequency: Optional[int] = None,
+		after: int = 0,
+		limit: int = DEFAULT_PAGE_SIZE,
+		fields: Optional[Sequence[str]] = None,
+	) -> Dict[str, Any]:
+		"""分类题目列表，按 id 游标分页：after=上一页最后一个 id。
+
+		返回 {"questions", "has_more", "next_cursor"}，第一页另带 "total"。
+		fields 为 LIST_FIELDS 的子集，不合法时抛 ValueError。
+		"""
+		fields = tuple(fields or DEFAULT_LIST_FIELDS)
+		if any(f not in LIST_FIELDS for f in fields):
+			raise ValueError(f"fields 仅支持 {','.join(LIST_FIELDS)}")
+		key = self.resolve_category(category)
+		after = max(0, int(after or 0))
+		limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+		return self._memo(
+			("list", key, difficulty or None, high_frequency, after, limit, fields),
+			lambda: self._list_page(key, difficulty or None, high_frequency, after, limit, fields),
+		)
+
+	def _list_page(
+		self,
+		key: str,
+		difficulty: Optional[str],
+		high_frequency: Optional[int],
+		after: int,
+		limit: int,
+		fields: Tuple[str, ...],
+	) -> Dict[str, Any]:
+		has_key_column = self._inspect()[1]
+		# 迁移后的库分类键已持久化并建了索引，这里只做等值匹配；旧库现算
+		key_expr = "category_key" if has_key_column else category_key_sql("category")
+		conds: List[str] = []
+		params: List[Any] = []
+		if key:
+			conds.append(f"{key_expr} = ?")
+			params.append(key)
+		if difficulty:
+			conds.append("difficulty = ?")
+			params.append(difficulty)
+		if high_frequency is not None:
+			conds.append("is_high_frequency = ?")
+			params.append(int(high_frequency))
+		filter_sql = " AND ".join(conds) or "1=1"
+		columns = [
+			c if c != "category_key" or has_key_column else f"{key_expr} AS category_key"
+			for c in dict.fromkeys(("id",) + fields)
+		]
+
+		conn = self._conn()
+		# 多取一条判断是否还有下一页
+		rows = [
+			dict(r)
+			for r in conn.execute(
+				f"SELECT {', '.join(columns)} FROM questions WHERE {filter_sql} AND id > ? ORDER BY id ASC LIMIT ?",
+				(*params, after, limit + 1),
+			)
+		]
+		has_more = len(rows) > limit
+		rows = rows[:limit]
+		page: Dict[str, Any] = {
+			"questions": rows,
+			"has_more": has_more,
+			"next_cursor": rows[-1]["id"] if has_more else None,
+		}
+		if not after:
+			# 第一页附带总数（覆盖索引上计数）
+			page["total"] = conn.execute(f"SELECT COUNT(1) FROM questions WHERE {filter_sql}", params).fetchone()[0]
+		return page
+
+	# ---------------- 检索 ----------------
+
+	def search(
+		self, keyword: str, category: str = "", limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0
+	) -> SearchPage:
+		"""全文检索（见 app/database/search.py），返回一页结果。"""
+		key = self.resolve_category(category) or None
+		return self._memo(
+			("search", " ".join((keyword or "").split()), key, int(limit), int(offset)),
+			lambda: search_questions(self._conn(), keyword, category_key=key, limit=int(limit), offset=int(offset)),
+		)
+
+	def search_question(
+		self, keyword: str, category: str = "", limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0
+	) -> List[Dict[str, Any]]:
+		return self.search(keyword, category=category, limit=limit, offset=offset).items
+
+	# ---------------- 其他 ----------------
+
+	@property
+	def version(self) -> Optional[int]:
+		"""当前题库版本号；旧库没有版本号时为 None。"""
+		return self._bank.snapshot().version if self._versioned() else None
+
+	def invalidate(self) -> None:
+		"""同进程内改了题库时调用：下次访问立即检查版本号，版本变了缓存整体清空。"""
+		self._bank.invalidate()
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"cached": len(self._cache),
+			"cache_size": self._cache.max_size,
+			"hits": self._cache.hits,
+			"misses": self._cache.misses,
+			"bank": self._bank.stats(),
+		}
+
+
+question_bank = QuestionBank()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+复习模式：按间隔复习排期取到期的题
+- 错题本里的题、收藏的题在 review_schedule 里各有一行排期，下次复习时间在答题/收藏的同一事务里由触发器算好
+  （规则见 app/database/review_schedule.py），这里只在 (user_id, due_at) 索引上做范围扫描，与答题历史长短无关
+- 复习时照常调用答题接口提交，排期随之更新
+- 旧库（没有 review_schedule 表）没有复习队列，始终返回空
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.question_bank import QuestionBank, question_bank as default_question_bank
+from app.database.db import ConnectionPool, get_pool
+from app.database.db_manager import DBManager
+
+DEFAULT_REVIEW_BATCH = 20
+MAX_REVIEW_BATCH = 50
+
+# 只算题库里还在的题（题目删除时触发器会清掉排期，这里再兜一层）
+_DUE_FROM = "FROM review_schedule r JOIN questions q ON q.id = r.question_id WHERE r.user_id = ?"
+
+
+class ReviewScheduler:
+	"""到期复习题查询。不传 db_manager 时使用 Web 应用的全局连接池。"""
+
+	def __init__(self, db_manager: Optional[DBManager] = None, question_bank: Optional[QuestionBank] = None) -> None:
+		self.db = db_manager
+		self.qb = question_bank or (QuestionBank(db_manager) if db_manager is not None else default_question_bank)
+
+	def _pool(self) -> ConnectionPool:
+		return self.db.pool if self.db is not None else get_pool()
+
+	def _legacy(self, conn) -> bool:
+		return conn.execute("PRAGMA table_info(review_schedule)").fetchone() is None
+
+	def due(self, user_id: int = 1, limit: int = DEFAULT_REVIEW_BATCH, now: Optional[float] = None) -> Dict[str, Any]:
+		"""最早到期的 limit 道题（含排期信息），以及到期总数、下一道未到期题的到期时间。"""
+		limit = max(1, min(int(limit), MAX_REVIEW_BATCH))
+		now = int(time.time() if now is None else now)
+		conn = self._pool().connection()
+		if self._legacy(conn):
+			return {"questions": [], "due_count": 0, "next_due_at": None}
+
+		rows = conn.execute(
+			"""
+			SELECT r.question_id, r.due_at, r.reps, r.interval, r.ease
+			FROM review_schedule r
+			JOIN questions q ON q.id = r.question_id
+			WHERE r.user_id = ? AND r.due_at <= ?
+			ORDER BY r.due_at
+			LIMIT ?
+			""",
+			(user_id, now, limit),
+		).fetchall()
+		due_count = len(rows)
+		if due_count == limit:
+			due_count = conn.execute(
+				f"SELECT COUNT(1) {_DUE_FROM} AND r.due_at <= ?", (user_id, now)
+			).fetchone()[0]
+		next_due_at = conn.execute(
+			f"SELECT MIN(r.due_at) {_DUE_FROM} AND r.due_at > ?", (user_id, now)
+		).fetchone()[0]
+
+		schedule = {int(r[0]): r for r in rows}
+		questions: List[Dict[str, Any]] = []
+		# 题目 payload 在请求之间共享，复制后再附上排期
+		for q in self.qb.get_payloads(list(schedule)):
+			r = schedule[q["id"]]
+			questions.append(
+				dict(q, review={"due_at": r[1], "reps": r[2], "interval": r[3], "ease": round(float(r[4]), 2)})
+			)
+		return {"questions": questions, "due_count": due_count, "next_due_at": next_due_at}
+
+	def next(self, user_id: int = 1, now: Optional[float] = None) -> Dict[str, Any]:
+		"""最早到期的一道题（没有到期的题时 question 为 None）。"""
+		page = self.due(user_id=user_id, limit=1, now=now)
+		return {
+			"question": page["questions"][0] if page["questions"] else None,
+			"due_count": page["due_count"],
+			"next_due_at": page["next_due_at"],
+		}
+
+
+review_scheduler = ReviewScheduler()
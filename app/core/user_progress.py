@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+学习进度服务（答题提交、收藏、进度统计的统一入口）
+- 每个用户一份进程内汇总（总数/答对数、按分类/难度/日期的分桶、错题本里的题、收藏的题），
+  答题与收藏变化时在内存里增量更新，进度页、首页不再每次聚合
+- 一致性：user_counters.rev 随答题记录/收藏的任何变化 +1（迁移 v15 的触发器）；读取前只比对这一行，
+  与缓存不一致（其他进程、脚本、后写队列落盘）时从汇总表重建，rebuild() 可显式重建
+- 写入后只有缓存恰好停在写入前的版本时才增量更新，否则丢弃缓存、下次读取时重建，避免并发下重复计数
+- 开启 ATTEMPT_WRITE_BEHIND 时提交只入队，拿不到写入后的版本号，对应用户的缓存直接丢弃
+- 错题本：最近一次答错的题，答对后移出（移出后答错过的题在“已掌握”里）；读 user_question_state 的部分索引，
+  该表由 attempts 上的触发器在答题的同一事务里更新（迁移 v16）
+- 旧库（scripts/init_db.py 建出的 user_records / favorite 结构）没有版本戳，只在进程内维护
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from app.core.question_bank import QuestionBank, question_bank as default_question_bank
+from app.database.attempt_log import ATTEMPT_INSERT, AttemptRow, attempt_log
+from app.database.bank import normalize_answer
+from app.database.db import ConnectionPool, get_pool, run_write
+from app.database.db_manager import DBManager
+from app.database.rollups import local_day
+
+USER_PROGRESS_CACHE_SIZE = int(os.environ.get("USER_PROGRESS_CACHE_SIZE", "1024"))
+
+RECENT_DAYS = 7
+
+LEGACY_RECORD_INSERT = """
+	INSERT INTO user_records(question_id, user_answer, is_correct, answer_time)
+	VALUES(?,?,?,?)
+"""
+
+
+def _accuracy(correct: int, total: int) -> int:
+	return int(round((correct / total) * 100, 0)) if total else 0
+
+
+def _bucket_stats(buckets: Dict[str, List[int]], empty_label: str) -> Dict[str, Dict[str, int]]:
+	out = {}
+	for name, (t, c) in sorted(buckets.items(), key=lambda kv: kv[1][0], reverse=True):
+		if t:
+			out[name or empty_label] = {"total": t, "correct": c, "accuracy": _accuracy(c, t)}
+	return out
+
+
+class UserStats:
+	"""一个用户的进度汇总。分桶值为 [答题数, 答对数]。"""
+
+	__slots__ = ("rev", "total", "correct", "by_category", "by_difficulty", "by_day", "wrong_ids", "favorite_ids")
+
+	def __init__(self, rev: Optional[int] = None) -> None:
+		self.rev = rev
+		self.total = 0
+		self.correct = 0
+		self.by_category: Dict[str, List[int]] = {}
+		self.by_difficulty: Dict[str, List[int]] = {}
+		self.by_day: Dict[str, List[int]] = {}
+		self.wrong_ids: Set[int] = set()
+		self.favorite_ids: Set[int] = set()
+
+	def add(self, category: str, difficulty: str, day: str, total: int, correct: int) -> None:
+		self.total += total
+		self.correct += correct
+		for buckets, key in ((self.by_category, category), (self.by_difficulty, difficulty), (self.by_day, day)):
+			b = buckets.setdefault(key, [0, 0])
+			b[0] += total
+			b[1] += correct
+
+	def apply(self, row: AttemptRow) -> None:
+		_user, qid, _ans, is_correct, category, difficulty, ts = row[:7]
+		self.add(category or "", str(difficulty or ""), local_day(ts), 1, 1 if is_correct else 0)
+		(self.wrong_ids.discard if is_correct else self.wrong_ids.add)(int(qid))
+
+	def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+		since = local_day((time.time() if now is None else now) - (RECENT_DAYS - 1) * 86400)
+		r_total = sum(t for day, (t, _c) in self.by_day.items() if day >= since)
+		r_correct = sum(c for day, (_t, c) in self.by_day.items() if day >= since)
+		return {
+			"total": self.total,
+			"correct": self.correct,
+			"wrong": self.total - self.correct,
+			"accuracy": _accuracy(self.correct, self.total),
+			"category_stats": _bucket_stats(self.by_category, "未分类"),
+			"difficulty_stats": _bucket_stats(self.by_difficulty, "未知"),
+			"recent_7_days": {"total": r_total, "correct": r_correct, "accuracy": _accuracy(r_correct, r_total)},
+			"error_count": len(self.wrong_ids),
+			"favorite_count": len(self.favorite_ids),
+		}
+
+
+class UserProgress:
+	"""学习进度服务。不传 db_manager 时使用 Web 应用的全局连接池（答题记录按 ATTEMPT_WRITE_BEHIND 同步/后写）。"""
+
+	def __init__(
+		self,
+		db_manager: Optional[DBManager] = None,
+		question_bank: Optional[QuestionBank] = None,
+		cache_size: int = USER_PROGRESS_CACHE_SIZE,
+	) -> None:
+		self.db = db_manager
+		self.qb = question_bank or (QuestionBank(db_manager) if db_manager is not None else default_question_bank)
+		self.cache_size = max(0, int(cache_size))
+		self._lock = threading.Lock()
+		self._cache: "OrderedDict[int, UserStats]" = OrderedDict()
+		self._db_path: Optional[str] = None  # 缓存所属的库文件，切库（db.configure）后整体丢弃
+		self._legacy_schema: Optional[bool] = None  # 是否旧库结构，按库文件只检查一次
+		self.hits = 0
+		self.rebuilds = 0
+
+	# ---------------- 内部 ----------------
+
+	def _pool(self) -> ConnectionPool:
+		pool = self.db.pool if self.db is not None else get_pool()
+		if pool.db_path != self._db_path:
+			with self._lock:
+				self._cache.clear()
+				self._legacy_schema = None
+				self._db_path = pool.db_path
+		return pool
+
+	def _conn(self):
+		return self._pool().connection()
+
+	def _legacy(self) -> bool:
+		conn = self._conn()
+		legacy = self._legacy_schema
+		if legacy is None:
+			legacy = conn.execute("PRAGMA table_info(attempts)").fetchone() is None
+			self._legacy_schema = legacy
+		return legacy
+
+	def _stamp(self, conn, user_id: int) -> int:
+		row = conn.execute("SELECT rev FROM user_counters WHERE user_id = ?", (user_id,)).fetchone()
+		return int(row[0]) if row else 0
+
+	def _stats(self, user_id: int) -> UserStats:
+		conn = self._conn()
+		with self._lock:
+			stats = self._cache.get(user_id)
+			if stats is not None:
+				self._cache.move_to_end(user_id)
+		if stats is not None and (stats.rev is None or stats.rev == self._stamp(conn, user_id)):
+			self.hits += 1
+			return stats
+		return self.rebuild(user_id)
+
+	def _forget(self, user_id: int) -> None:
+		with self._lock:
+			self._cache.pop(user_id, None)
+
+	def _remember(self, user_id: int, stats: UserStats) -> None:
+		if not self.cache_size:
+			return
+		with self._lock:
+			self._cache[user_id] = stats
+			self._cache.move_to_end(user_id)
+			while len(self._cache) > self.cache_size:
+				self._cache.popitem(last=False)
+
+	# ---------------- 重建 ----------------
+
+	def rebuild(self, user_id: int = 1) -> UserStats:
+		"""从数据库重建该用户的汇总（汇总表 + 索引查询，不扫全部答题记录）。"""
+		conn = self._conn()
+		stats = self._load_legacy(conn) if self._legacy() else self._load(conn, user_id)
+		self.rebuilds += 1
+		self._remember(user_id, stats)
+		return stats
+
+	def _load(self, conn, user_id: int) -> UserStats:
+		# 版本戳与数据在同一个读事务里读取
+		own_txn = not conn.in_transaction
+		if own_txn:
+			conn.execute("BEGIN")
+		try:
+			stats = UserStats(self._stamp(conn, user_id))
+			for r in conn.execute(
+				"SELECT category, difficulty, day, total, correct FROM progress_daily WHERE user_id = ?", (user_id,)
+			):
+				stats.add(r[0], r[1], r[2], int(r[3]), int(r[4]))
+			stats.wrong_ids = {
+				r[0] for r in conn.execute(
+					"SELECT question_id FROM user_question_state WHERE user_id = ? AND last_correct = 0", (user_id,)
+				)
+			}
+			stats.favorite_ids = {
+				r[0] for r in conn.execute("SELECT question_id FROM favorites WHERE user_id = ?", (user_id,))
+			}
+		finally:
+			if own_txn:
+				conn.commit()
+		return stats
+
+	def _load_legacy(self, conn) -> UserStats:
+		stats = UserStats()
+		for r in conn.execute(
+			"""
+			SELECT q.category, q.difficulty, r.question_id, r.is_correct, r.answer_time
+			FROM user_records r
+			LEFT JOIN questions q ON q.id = r.question_id
+			ORDER BY r.id
+			"""
+		):
+			try:
+				ts = time.mktime(time.strptime(str(r[4])[:19], "%Y-%m-%d %H:%M:%S"))
+			except (TypeError, ValueError):
+				ts = time.time()
+			stats.apply((1, r[2], "", int(r[3] or 0), r[0], r[1], ts))
+		stats.favorite_ids = {r[0] for r in conn.execute("SELECT question_id FROM favorite")}
+		return stats
+
+	# ---------------- 答题 ----------------
+
+	def insert_attempts(self, conn, rows: Sequence[Sequence[Any]], sql: str = ATTEMPT_INSERT) -> Optional[int]:
+		"""在调用方的写事务里写入答题记录（行以 AttemptRow 的 7 列开头），返回写入后的版本戳；
+		提交成功后再调用 note_attempts(rows, rev) 更新缓存。"""
+		conn.executemany(sql, rows)
+		users = {int(r[0]) for r in rows}
+		return self._stamp(conn, users.pop()) if len(users) == 1 else None
+
+	def note_attempts(self, rows: Sequence[Sequence[Any]], rev: Optional[int]) -> None:
+		"""答题记录已提交：缓存恰好停在写入前的版本时增量更新，否则丢弃。"""
+		if not rows:
+			return
+		user_id = int(rows[0][0])
+		with self._lock:
+			stats = self._cache.get(user_id)
+			if stats is None:
+				return
+			if rev is None or stats.rev is None or stats.rev != rev - len(rows):
+				self._cache.pop(user_id, None)
+				return
+			for row in rows:
+				stats.apply(row)
+			stats.rev = rev
+
+	def submit_answer(self, question_id: int, user_answer: Any, user_id: int = 1) -> Optional[Dict[str, Any]]:
+		"""判分并写入答题记录；题目不存在时返回 None。"""
+		q = self.qb.get_record(int(question_id))
+		if q is None:
+			return None
+		answer = normalize_answer(user_answer)
+		correct = q.correct_answer
+		is_correct = 1 if (answer and correct and answer == correct) else 0
+		now = int(time.time())
+		row = (user_id, q.id, answer, is_correct, q.category, q.difficulty, now)
+
+		if self._legacy():
+			run_write(
+				lambda conn: conn.execute(
+					LEGACY_RECORD_INSERT, (q.id, answer, is_correct, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+				),
+				pool=self._pool(),
+			)
+			with self._lock:
+				stats = self._cache.get(user_id)
+				if stats is not None:
+					stats.apply(row)
+		elif self.db is None and attempt_log.enabled:
+			# 后写：只入队，拿不到写入后的版本戳
+			attempt_log.record(row)
+			self._forget(user_id)
+		else:
+			rev = run_write(lambda conn: self.insert_attempts(conn, [row]), pool=self._pool())
+			self.note_attempts([row], rev)
+		return {
+			"question_id": q.id,
+			"user_answer": answer,
+			"correct_answer": correct,
+			"is_correct": bool(is_correct),
+		}
+
+	def save_answer(self, question_id: int, user_answer: Any, user_id: int = 1) -> bool:
+		return self.submit_answer(question_id, user_answer, user_id=user_id) is not None
+
+	# ---------------- 收藏 ----------------
+
+	def _set_favorite(self, question_id: int, on: bool, user_id: int) -> bool:
+		"""写入收藏状态，返回是否有变化。"""
+		legacy = self._legacy()
+
+		def _write(conn):
+			if legacy:
+				exists = conn.execute("SELECT 1 FROM favorite WHERE question_id = ?", (question_id,)).fetchone()
+				if on and not exists:
+					conn.execute(
+						"INSERT INTO favorite(question_id, collect_time) VALUES(?, ?)",
+						(question_id, time.strftime("%Y-%m-%d %H:%M:%S")),
+					)
+				elif not on and exists:
+					conn.execute("DELETE FROM favorite WHERE question_id = ?", (question_id,))
+				return bool(exists) != on, None
+			if on:
+				changed = conn.execute(
+					"INSERT OR IGNORE INTO favorites(user_id, question_id) VALUES(?, ?)", (user_id, question_id)
+				).rowcount
+			else:
+				changed = conn.execute(
+					"DELETE FROM favorites WHERE user_id = ? AND question_id = ?", (user_id, question_id)
+				).rowcount
+			return bool(changed), self._stamp(conn, user_id) if changed else None
+
+		changed, rev = run_write(_write, pool=self._pool())
+		if changed:
+			with self._lock:
+				stats = self._cache.get(user_id)
+				if stats is not None:
+					if legacy or (stats.rev is not None and rev is not None and stats.rev == rev - 1):
+						(stats.favorite_ids.add if on else stats.favorite_ids.discard)(question_id)
+						stats.rev = rev
+					else:
+						self._cache.pop(user_id, None)
+		return changed
+
+	def add_favorite(self, question_id: int, user_id: int = 1) -> bool:
+		"""收藏；题目存在时返回 True（已收藏过也算成功）。"""
+		if self.qb.get_record(int(question_id)) is None:
+			return False
+		self._set_favorite(int(question_id), True, user_id)
+		return True
+
+	def remove_favorite(self, question_id: int, user_id: int = 1) -> bool:
+		"""取消收藏；原本已收藏时返回 True。"""
+		return self._set_favorite(int(question_id), False, user_id)
+
+	def toggle_favorite(self, question_id: int, user_id: int = 1) -> bool:
+		"""切换收藏状态，返回切换后是否已收藏。"""
+		question_id = int(question_id)
+		if self.is_favorite(question_id, user_id=user_id):
+			self._set_favorite(question_id, False, user_id)
+			return False
+		self._set_favorite(question_id, True, user_id)
+		return True
+
+	def is_favorite(self, question_id: int, user_id: int = 1) -> bool:
+		return int(question_id) in self._stats(user_id).favorite_ids
+
+	def get_favorite(self, user_id: int = 1) -> List[Dict[str, Any]]:
+		"""收藏列表（最近收藏的在前）。"""
+		if self._legacy():
+			sql = """
+				SELECT q.id, q.title, q.category, q.difficulty, f.collect_time
+				FROM favorite f
+				JOIN questions q ON q.id = f.question_id
+				ORDER BY f.collect_time DESC
+			"""
+			params: tuple = ()
+		else:
+			sql = """
+				SELECT q.id, q.title, q.category, q.difficulty, f.collect_time
+				FROM favorites f
+				JOIN questions q ON q.id = f.question_id
+				WHERE f.user_id = ?
+				ORDER BY f.collect_time DESC
+			"""
+			params = (user_id,)
+		return [dict(r) for r in self._conn().execute(sql, params)]
+
+	# ---------------- 统计 ----------------
+
+	def get_progress(self, user_id: int = 1, now: Optional[float] = None) -> Dict[str, Any]:
+		"""进度汇总：total/correct/wrong/accuracy、分类/难度分桶、最近 7 天、错题数、收藏数。"""
+		return self._stats(user_id).summary(now)
+
+	def get_error_questions(self, user_id: int = 1, mastered: bool = False) -> List[Dict[str, Any]]:
+		"""错题本（最近答题的在前）；mastered=True 时返回已掌握的题（答错过、最近一次答对）。"""
+		if self._legacy():
+			# 旧库没有状态表，按 user_records 聚合：最后一条记录是否答错
+			last_wrong = "MAX(CASE WHEN is_correct = 0 THEN id END)"
+			having = f"{last_wrong} < MAX(id)" if mastered else f"{last_wrong} = MAX(id)"
+			sql = f"""
+				SELECT q.id, q.title, q.category, q.difficulty, w.last_time, w.attempts, w.wrong
+				FROM (
+					SELECT question_id, MAX(answer_time) AS last_time, COUNT(1) AS attempts,
+						SUM(CASE WHEN is_correct = 0 THEN 1 ELSE 0 END) AS wrong
+					FROM user_records
+					GROUP BY question_id
+					HAVING {having}
+				) w
+				JOIN questions q ON q.id = w.question_id
+				ORDER BY w.last_time DESC
+			"""
+			params: tuple = ()
+		else:
+			# 条件与部分索引 idx_question_state_errors / idx_question_state_mastered 的 WHERE 一致
+			where = "s.last_correct = 1 AND s.wrong > 0" if mastered else "s.last_correct = 0"
+			sql = f"""
+				SELECT q.id, q.title, q.category, q.difficulty, datetime(s.last_ts, 'unixepoch') AS last_time,
+					s.attempts, s.wrong, s.streak
+				FROM user_question_state s
+				JOIN questions q ON q.id = s.question_id
+				WHERE s.user_id = ? AND {where}
+				ORDER BY s.last_ts DESC
+			"""
+			params = (user_id,)
+		return [dict(r) for r in self._conn().execute(sql, params)]
+
+	def invalidate(self, user_id: Optional[int] = None) -> None:
+		"""丢弃缓存（不传 user_id 时全部丢弃），下次读取时从数据库重建。"""
+		with self._lock:
+			if user_id is None:
+				self._cache.clear()
+			else:
+				self._cache.pop(user_id, None)
+
+	def stats(self) -> Dict[str, Any]:
+		return {"cached": len(self._cache), "hits": self.hits, "rebuilds": self.rebuilds}
+
+
+user_progress = UserProgress()
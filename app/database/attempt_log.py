@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+答题记录写入
+- 默认同步：每次提交在自己的写事务里 INSERT 一条 attempts 并提交
+- ATTEMPT_WRITE_BEHIND=1 时改为后写（write-behind）：请求只把记录放进有界队列就返回，
+  由单个写线程按批（最多 ATTEMPT_BATCH_SIZE 条 / 最多等 ATTEMPT_MAX_DELAY_MS 毫秒）在一个事务里写入，
+  多个请求共用一次提交（group commit）
+- 队列满时提交请求会阻塞等待（背压），等待超过 ATTEMPT_ENQUEUE_TIMEOUT 秒则退回同步写入，记录不会丢
+- 批量写入失败时整批重试（最多 ATTEMPT_WRITE_RETRIES 次，退避等待），仍失败则逐条写入，
+  只有单条也写不进去的记录（如违反约束）才放弃，计入 stats()["failed"] 并记错误日志
+- 进程退出（atexit）与工作进程优雅停止时先把队列写完
+- 代价：后写模式下进度页最多晚 ATTEMPT_MAX_DELAY_MS 毫秒看到刚提交的记录；进程被强杀时队列里的记录会丢失
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.database.db import ConnectionPool, get_pool, run_write
+
+WRITE_BEHIND = os.environ.get("ATTEMPT_WRITE_BEHIND", "0") == "1"
+BATCH_SIZE = int(os.environ.get("ATTEMPT_BATCH_SIZE", "200"))
+MAX_DELAY = float(os.environ.get("ATTEMPT_MAX_DELAY_MS", "20")) / 1000.0
+QUEUE_SIZE = int(os.environ.get("ATTEMPT_QUEUE_SIZE", "10000"))
+ENQUEUE_TIMEOUT = float(os.environ.get("ATTEMPT_ENQUEUE_TIMEOUT", "5"))
+WRITE_RETRIES = int(os.environ.get("ATTEMPT_WRITE_RETRIES", "3"))
+RETRY_BACKOFF = 0.05  # 秒，每次重试翻倍
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_INSERT = """
+	INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty, created_ts)
+	VALUES(?,?,?,?,?,?,?)
+"""
+
+# 模拟面试的答题记录带上所属的一场（exams.id）
+EXAM_ATTEMPT_INSERT = """
+	INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty, created_ts, exam_id)
+	VALUES(?,?,?,?,?,?,?,?)
+"""
+
+# (user_id, question_id, user_answer, is_correct, category, difficulty, created_ts)
+AttemptRow = Tuple[int, int, str, int, Optional[str], Any, int]
+
+_STOP = object()
+
+
+def write_attempts(rows: Sequence[AttemptRow], pool: Optional[ConnectionPool] = None) -> None:
+	"""同步写入：一个写事务 + executemany。"""
+	run_write(lambda conn: conn.executemany(ATTEMPT_INSERT, rows), pool=pool)
+
+
+class AttemptLogger:
+	def __init__(
+		self,
+		enabled: bool = WRITE_BEHIND,
+		pool: Optional[ConnectionPool] = None,
+		batch_size: int = BATCH_SIZE,
+		max_delay: float = MAX_DELAY,
+		queue_size: int = QUEUE_SIZE,
+		enqueue_timeout: float = ENQUEUE_TIMEOUT,
+		retries: int = WRITE_RETRIES,
+	) -> None:
+		self.enabled = enabled
+		self._pool = pool
+		self.batch_size = max(1, batch_size)
+		self.max_delay = max_delay
+		self.enqueue_timeout = enqueue_timeout
+		self.retries = max(0, retries)
+		self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+		self._lock = threading.Lock()
+		self._writer: Optional[threading.Thread] = None
+		self._writer_pid = 0
+		self.enqueued = 0
+		self.written = 0
+		self.batches = 0
+		self.max_batch = 0
+		self.sync_fallbacks = 0
+		self.retried = 0
+		self.row_fallbacks = 0
+		self.failed = 0
+		self.last_error: Optional[str] = None
+
+	def record(self, row: AttemptRow) -> None:
+		if not self.enabled:
+			write_attempts([row], pool=self._pool)
+			return
+		self._ensure_writer()
+		try:
+			self._queue.put(row, timeout=self.enqueue_timeout)
+		except queue.Full:
+			# 写线程跟不上：退回同步写入（同样受数据库写锁串行化）
+			self.sync_fallbacks += 1
+			write_attempts([row], pool=self._pool)
+			return
+		self.enqueued += 1
+
+	def flush(self, timeout: Optional[float] = None) -> bool:
+		"""等待队列中已有的记录全部提交；超时返回 False。"""
+		deadline = None if timeout is None else time.monotonic() + timeout
+		q = self._queue
+		with q.all_tasks_done:
+			while q.unfinished_tasks:
+				remaining = None if deadline is None else deadline - time.monotonic()
+				if remaining is not None and remaining <= 0:
+					return False
+				q.all_tasks_done.wait(remaining)
+		return True
+
+	def close(self, timeout: Optional[float] = None) -> None:
+		"""写完队列并停止写线程（进程退出前调用）。"""
+		writer = self._writer
+		if writer is None or not writer.is_alive() or self._writer_pid != os.getpid():
+			return
+		self._queue.put(_STOP)
+		writer.join(timeout)
+
+	def stats(self) -> dict:
+		return {
+			"enabled": self.enabled,
+			"queued": self._queue.qsize(),
+			"enqueued": self.enqueued,
+			"written": self.written,
+			"batches": self.batches,
+			"max_batch": self.max_batch,
+			"sync_fallbacks": self.sync_fallbacks,
+			"retried": self.retried,
+			"row_fallbacks": self.row_fallbacks,
+			"failed": self.failed,
+			"last_error": self.last_error,
+		}
+
+	def _ensure_writer(self) -> None:
+		# fork 出的子进程没有父进程的线程，按 pid 判断
+		pid = os.getpid()
+		if self._writer_pid == pid and self._writer is not None and self._writer.is_alive():
+			return
+		with self._lock:
+			if self._writer_pid == pid and self._writer is not None and self._writer.is_alive():
+				return
+			self._writer_pid = pid
+			self._writer = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+			self._writer.start()
+
+	def _next_batch(self) -> Tuple[List[AttemptRow], bool]:
+		item = self._queue.get()
+		if item is _STOP:
+			self._queue.task_done()
+			return [], True
+		batch = [item]
+		stop = False
+		deadline = time.monotonic() + self.max_delay
+		while len(batch) < self.batch_size:
+			remaining = deadline - time.monotonic()
+			try:
+				item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+			except queue.Empty:
+				break
+			if item is _STOP:
+				self._queue.task_done()
+				stop = True
+				break
+			batch.append(item)
+		return batch, stop
+
+	def _run(self) -> None:
+		stop = False
+		while not stop:
+			batch, stop = self._next_batch()
+			if not batch:
+				continue
+			pool = self._pool or get_pool()
+			try:
+				self._write_batch(batch, pool)
+			finally:
+				# 写线程不经过请求结束的归还逻辑，每批写完就把连接还回池
+				pool.release()
+				for _ in batch:
+					self._queue.task_done()
+
+	def _write_batch(self, batch: List[AttemptRow], pool: ConnectionPool) -> None:
+		for attempt in range(self.retries + 1):
+			if attempt:
+				self.retried += 1
+				time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+			try:
+				write_attempts(batch, pool=pool)
+			except Exception as e:
+				self.last_error = repr(e)
+				logger.warning("writing %d attempts failed (try %d/%d): %r", len(batch), attempt + 1, self.retries + 1, e)
+				continue
+			self.written += len(batch)
+			self.batches += 1
+			self.max_batch = max(self.max_batch, len(batch))
+			return
+
+		# 整批一直失败（多半是其中某条违反约束）：逐条写入，只放弃自身写不进去的记录
+		self.row_fallbacks += 1
+		for row in batch:
+			try:
+				write_attempts([row], pool=pool)
+			except Exception as e:
+				self.failed += 1
+				self.last_error = repr(e)
+				logger.error("dropping attempt %r: %r", row, e)
+				continue
+			self.written += 1
+
+
+attempt_log = AttemptLogger()
+atexit.register(attempt_log.close)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+题库内存快照
+- 启动时把 questions + answers 一次性读入一个只读快照（题目 id -> QuestionRecord）
+- 题库版本号存放在 meta.bank_version，questions/answers 的任何写入都会由触发器递增
+- 每隔 BANK_CHECK_INTERVAL 秒最多查询一次版本号，变化时整体重载；其余时间取题/判分不执行 SQL
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from app.database.categories import category_key_for
+from app.database.db import ConnectionPool, get_pool
+
+BANK_CHECK_INTERVAL = float(os.environ.get("BANK_CHECK_INTERVAL", "1.0"))
+
+OPTION_KEYS = ("A", "B", "C", "D")
+
+# 批量按 id 取题时单条 IN 列表的参数个数上限（远低于 SQLITE_MAX_VARIABLE_NUMBER）
+IN_CHUNK_SIZE = 500
+
+# 题目 + 答案一次 JOIN 取齐（单选/多选需要答案才能判断）
+QUESTION_SELECT = """
+	SELECT q.*, a.correct_answer, a.analysis, a.knowledge_point
+	FROM questions q
+	LEFT JOIN answers a ON a.question_id = q.id
+"""
+
+
+def normalize_answer(ans: Any) -> str:
+	if not ans:
+		return ""
+	ans = str(ans).upper()
+	ans = "".join([c for c in ans if c in "ABCD"])
+	return "".join(sorted(ans))
+
+
+class QuestionRecord(NamedTuple):
+	id: int
+	category: Optional[str]
+	category_key: str
+	title: str
+	options: Tuple[str, str, str, str]
+	difficulty: Any
+	is_high_frequency: int
+	correct_answer: str  # 已规整（如 "AC"）
+	analysis: str
+	knowledge_point: str
+
+	@property
+	def type(self) -> str:
+		return "multi" if len(self.correct_answer) > 1 else "single"
+
+	def to_payload(self) -> Dict[str, Any]:
+		"""答题页/模拟面试使用的题目结构（不含答案）。"""
+		return {
+			"id": self.id,
+			"title": self.title,
+			"category": self.category or "",
+			"difficulty": self.difficulty or "Easy",
+			"type": self.type,
+			"options": [
+				{"option_key": k, "option_content": v} for k, v in zip(OPTION_KEYS, self.options)
+			],
+		}
+
+
+def record_from_row(row: Mapping[str, Any]) -> QuestionRecord:
+	# row 来自 SELECT q.*, a.*，旧库缺少的列按默认值处理
+	keys = row.keys()
+	category = row["category"]
+	return QuestionRecord(
+		id=int(row["id"]),
+		category=category,
+		category_key=(row["category_key"] if "category_key" in keys else None) or category_key_for(category or ""),
+		title=row["title"] or "",
+		options=tuple((row[f"option_{k.lower()}"] or "") for k in OPTION_KEYS),
+		difficulty=row["difficulty"],
+		is_high_frequency=int(row["is_high_frequency"] or 0) if "is_high_frequency" in keys else 0,
+		correct_answer=normalize_answer(row["correct_answer"]),
+		analysis=row["analysis"] or "",
+		knowledge_point=row["knowledge_point"] or "",
+	)
+
+
+class BankSnapshot:
+	"""某一题库版本下的只读快照。"""
+
+	__slots__ = ("version", "questions", "loaded_at", "updated_at", "difficulties")
+
+	def __init__(self, version: int, questions: Dict[int, QuestionRecord], updated_at: Optional[int] = None) -> None:
+		self.version = version
+		self.questions: Mapping[int, QuestionRecord] = MappingProxyType(questions)
+		self.loaded_at = time.time()
+		# 题库最后变更时间（epoch 秒）；旧库没有记录时退化为加载时间
+		self.updated_at = int(updated_at or self.loaded_at)
+		# 库里实际出现过的难度取值（筛选参数按它校验，不写死枚举）
+		self.difficulties = frozenset(q.difficulty for q in questions.values() if q.difficulty)
+
+	def get(self, question_id: int) -> Optional[QuestionRecord]:
+		return self.questions.get(question_id)
+
+	def __len__(self) -> int:
+		return len(self.questions)
+
+
+def read_bank_version(conn) -> int:
+	row = conn.execute("SELECT value FROM meta WHERE key='bank_version'").fetchone()
+	return int(row[0]) if row else 0
+
+
+def load_snapshot(conn) -> BankSnapshot:
+	# 版本号与题目在同一个读事务里读取，保证快照与版本一致
+	own_txn = not conn.in_transaction
+	if own_txn:
+		conn.execute("BEGIN")
+	try:
+		version = read_bank_version(conn)
+		row = conn.execute("SELECT value FROM meta WHERE key='bank_updated_at'").fetchone()
+		rows = conn.execute(QUESTION_SELECT + " ORDER BY q.id").fetchall()
+	finally:
+		if own_txn:
+			conn.commit()
+	return BankSnapshot(
+		version,
+		{int(r["id"]): record_from_row(r) for r in rows},
+		updated_at=row[0] if row else None,
+	)
+
+
+def load_question(conn, question_id: int) -> Optional[QuestionRecord]:
+	row = conn.execute(QUESTION_SELECT + " WHERE q.id = ?", (int(question_id),)).fetchone()
+	return record_from_row(row) if row else None
+
+
+def load_questions(conn, ids: Iterable[int], chunk_size: int = IN_CHUNK_SIZE) -> Dict[int, QuestionRecord]:
+	"""按 id 批量取题：去重后按 chunk_size 分批走 IN 列表，返回 id -> QuestionRecord（不存在的 id 不出现）。"""
+	unique = list(dict.fromkeys(int(i) for i in ids))
+	out: Dict[int, QuestionRecord] = {}
+	for start in range(0, len(unique), chunk_size):
+		chunk = unique[start:start + chunk_size]
+		rows = conn.execute(
+			QUESTION_SELECT + f" WHERE q.id IN ({','.join('?' * len(chunk))})",
+			chunk,
+		).fetchall()
+		for r in rows:
+			out[int(r["id"])] = record_from_row(r)
+	return out
+
+
+class BankCache:
+	"""进程级题库缓存：按版本号失效的只读快照。"""
+
+	def __init__(self, pool: Optional[ConnectionPool] = None, check_interval: Optional[float] = None) -> None:
+		self._pool = pool
+		self.check_interval = BANK_CHECK_INTERVAL if check_interval is None else check_interval
+		self._lock = threading.Lock()
+		self._snapshot: Optional[BankSnapshot] = None
+		self._db_path: Optional[str] = None
+		self._checked_at = 0.0
+		self.hits = 0
+		self.misses = 0
+		self.reloads = 0
+		self.version_checks = 0
+		self.fallback_loads = 0
+
+	def _connection(self):
+		return (self._pool or get_pool()).connection()
+
+	def snapshot(self) -> BankSnapshot:
+		snap = self._snapshot
+		pool = self._pool or get_pool()
+		if (
+			snap is not None
+			and self._db_path == pool.db_path
+			and time.monotonic() - self._checked_at < self.check_interval
+		):
+			self.hits += 1
+			return snap
+		return self._refresh(pool)
+
+	def get(self, question_id: int) -> Optional[QuestionRecord]:
+		q = self.snapshot().get(int(question_id))
+		if q is None:
+			# 快照最多落后 check_interval 秒：刚导入的题直接按主键回源
+			self.fallback_loads += 1
+			q = load_question(self._connection(), int(question_id))
+		return q
+
+	def get_many(self, ids: Iterable[int]) -> List[QuestionRecord]:
+		"""按传入顺序返回存在的题目（重复 id 只保留一次）；快照里没有的 id 一次批量回源。"""
+		snap = self.snapshot()
+		wanted = list(dict.fromkeys(int(i) for i in ids))
+		absent = [qid for qid in wanted if snap.get(qid) is None]
+		loaded: Dict[int, QuestionRecord] = {}
+		if absent:
+			self.fallback_loads += 1
+			loaded = load_questions(self._connection(), absent)
+		out = []
+		for qid in wanted:
+			q = snap.get(qid) or loaded.get(qid)
+			if q is not None:
+				out.append(q)
+		return out
+
+	@property
+	def version(self) -> int:
+		return self.snapshot().version
+
+	def invalidate(self) -> None:
+		"""同进程内改了题库时调用：下次访问立即检查版本号。"""
+		self._checked_at = 0.0
+
+	def stats(self) -> Dict[str, Any]:
+		snap = self._snapshot
+		return {
+			"version": snap.version if snap else None,
+			"questions": len(snap) if snap else 0,
+			"hits": self.hits,
+			"misses": self.misses,
+			"reloads": self.reloads,
+			"version_checks": self.version_checks,
+			"fallback_loads": self.fallback_loads,
+		}
+
+	def _refresh(self, pool: ConnectionPool) -> BankSnapshot:
+		with self._lock:
+			snap = self._snapshot
+			if (
+				snap is not None
+				and self._db_path == pool.db_path
+				and time.monotonic() - self._checked_at < self.check_interval
+			):
+				# 其他线程刚刚检查/重载过
+				self.hits += 1
+				return snap
+
+			self.misses += 1
+			conn = pool.connection()
+			self.version_checks += 1
+			if snap is None or self._db_path != pool.db_path or read_bank_version(conn) != snap.version:
+				snap = load_snapshot(conn)
+				self.reloads += 1
+				self._snapshot = snap
+				self._db_path = pool.db_path
+			self._checked_at = time.monotonic()
+			return snap
+
+
+bank_cache = BankCache()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+题目分类归一化
+- 前端使用 basic/framework/project 三个分类键；题库里的 category 是自由文本（中英文都有）
+- 分类键在导入时计算并持久化到 questions.category_key（带索引），查询时只做等值匹配
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+# 按顺序匹配，命中第一条即为该题的分类键（匹配方式与 SQL LIKE '%...%' 一致：子串、ASCII 不区分大小写）
+CATEGORY_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+	("basic", ("Basics", "基础")),
+	("framework", ("Flask", "框架")),
+	("project", ("Project", "项目")),
+)
+OTHER_KEY = "other"
+
+# 题库页/模拟面试可见的分类
+VISIBLE_KEYS: Tuple[str, ...] = tuple(key for key, _ in CATEGORY_RULES)
+
+
+def category_key_for(category: str) -> str:
+	text = (category or "").lower()
+	for key, needles in CATEGORY_RULES:
+		if any(n.lower() in text for n in needles):
+			return key
+	return OTHER_KEY
+
+
+def category_key_sql(column: str = "category") -> str:
+	"""与 category_key_for 等价的 SQL 表达式（迁移回填、触发器使用）。"""
+	whens = []
+	for key, needles in CATEGORY_RULES:
+		cond = " OR ".join(f"{column} LIKE '%{n}%'" for n in needles)
+		whens.append(f"WHEN {cond} THEN '{key}'")
+	return f"CASE {' '.join(whens)} ELSE '{OTHER_KEY}' END"
+
+
+def normalize_key(category_key: str) -> str:
+	"""把前端传来的分类参数规整为可见分类键；无法识别时返回空串（由调用方决定范围）。"""
+	key = (category_key or "").lower().strip()
+	return key if key in VISIBLE_KEYS else ""
@@ -1,103 +1,352 @@
+# -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import atexit
 import os
+import random
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.database.migrations import migrate
+
+T = TypeVar("T")
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-DB_PATH = os.path.join(BASE_DIR, "database", "interview.db")
+# DB_PATH 环境变量可指定其他库文件（压测/多实例用）
+DB_PATH = os.path.abspath(os.environ.get("DB_PATH") or os.path.join(BASE_DIR, "database", "interview.db"))
+
+# 连接池大小：0 表示不复用连接（每次借出都新建、归还即关闭，即旧行为）
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+# 连接全部借出时等待空闲连接的最长秒数；超时抛 PoolTimeout（Web 层返回 503）
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+
+class PoolTimeout(RuntimeError):
+	"""连接池已满，等待空闲连接超时。"""
+
+
+class PoolClosed(RuntimeError):
+	"""连接池已关闭。"""
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+	"""连接级 SQLite 调优参数（每条新连接建立时应用一次）。"""
+
+	journal_mode: str = "WAL"  # WAL 下读写互不阻塞
+	synchronous: str = "NORMAL"  # WAL + NORMAL：提交不再每次 fsync，断电最多丢最后几个事务
+	busy_timeout_ms: int = 5000  # 遇到锁时在 SQLite 内部等待的时长
+	cache_size: int = -16000  # 负数单位为 KiB，即每条连接约 16MB 页缓存
+	mmap_size: int = 128 * 1024 * 1024
+	foreign_keys: bool = True
+
+	@classmethod
+	def from_env(cls) -> "SQLiteProfile":
+		return cls(
+			journal_mode=os.environ.get("DB_JOURNAL_MODE", cls.journal_mode).upper(),
+			synchronous=os.environ.get("DB_SYNCHRONOUS", cls.synchronous).upper(),
+			busy_timeout_ms=int(os.environ.get("DB_BUSY_TIMEOUT_MS", cls.busy_timeout_ms)),
+			cache_size=int(os.environ.get("DB_CACHE_SIZE", cls.cache_size)),
+			mmap_size=int(os.environ.get("DB_MMAP_SIZE", cls.mmap_size)),
+		)
+
+	def apply(self, conn: sqlite3.Connection) -> None:
+		conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+		conn.execute(f"PRAGMA journal_mode = {self.journal_mode};")
+		conn.execute(f"PRAGMA synchronous = {self.synchronous};")
+		conn.execute(f"PRAGMA cache_size = {int(self.cache_size)};")
+		conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+		if self.foreign_keys:
+			conn.execute("PRAGMA foreign_keys = ON;")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+	"""写事务遇到锁冲突（database is locked/busy）时的有界重试：指数退避 + 抖动。"""
 
+	attempts: int = 5
+	base_delay: float = 0.02
+	max_delay: float = 0.5
 
-def _connect() -> sqlite3.Connection:
-	os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-	conn = sqlite3.connect(DB_PATH)
+	def delay(self, attempt: int) -> float:
+		return min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+PROFILE = SQLiteProfile.from_env()
+RETRY_POLICY = RetryPolicy(attempts=int(os.environ.get("DB_WRITE_RETRIES", "5")))
+
+
+def _connect(db_path: Optional[str] = None, profile: Optional[SQLiteProfile] = None) -> sqlite3.Connection:
+	profile = profile or PROFILE
+	# 连接会在不同请求线程之间复用（同一时刻只归一个线程），因此关闭 check_same_thread
+	conn = sqlite3.connect(
+		db_path or DB_PATH,
+		timeout=profile.busy_timeout_ms / 1000.0,
+		check_same_thread=False,
+	)
 	conn.row_factory = sqlite3.Row
-	conn.execute("PRAGMA foreign_keys = ON;")
+	profile.apply(conn)
 	return conn
 
 
+def is_lock_error(exc: BaseException) -> bool:
+	if not isinstance(exc, sqlite3.OperationalError):
+		return False
+	msg = str(exc).lower()
+	return "locked" in msg or "busy" in msg
+
+
+class ConnectionPool:
+	"""SQLite 连接池。
+
+	每个线程第一次访问时借出一条连接并独占，直到 release() 归还；
+	归还的连接放回空闲队列供后续请求复用，空闲过久的连接在借出前做健康检查。
+	"""
+
+	def __init__(
+		self,
+		db_path: str,
+		max_size: int = 8,
+		timeout: float = 10.0,
+		health_check_interval: float = 30.0,
+		profile: Optional[SQLiteProfile] = None,
+	) -> None:
+		self.db_path = db_path
+		self.max_size = max(0, int(max_size))
+		self.timeout = timeout
+		self.health_check_interval = health_check_interval
+		self.profile = profile or PROFILE
+
+		self._cond = threading.Condition()
+		self._local = threading.local()
+		self._idle: List[Tuple[sqlite3.Connection, float]] = []
+		self._in_use = 0
+		self._closed = False
+		self._created = 0
+		self._reused = 0
+		self._discarded = 0
+
+		# 目录检查只在建池时做一次，而不是每条语句一次
+		os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+	def connection(self) -> sqlite3.Connection:
+		"""返回当前线程持有的连接；没有则从池中借出一条。"""
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			conn = self._checkout()
+			self._local.conn = conn
+		return conn
+
+	def release(self) -> None:
+		"""归还当前线程持有的连接（未提交的事务会被回滚）。"""
+		conn = getattr(self._local, "conn", None)
+		if conn is None:
+			return
+		self._local.conn = None
+
+		healthy = True
+		try:
+			if conn.in_transaction:
+				conn.rollback()
+		except sqlite3.Error:
+			healthy = False
+
+		with self._cond:
+			self._in_use -= 1
+			if healthy and not self._closed and len(self._idle) < self.max_size:
+				self._idle.append((conn, time.monotonic()))
+				conn = None
+			self._cond.notify()
+		if conn is not None:
+			self._discard(conn)
+
+	def close(self) -> None:
+		"""关闭池：立即关闭空闲连接，借出中的连接在归还时关闭。"""
+		self.release()
+		with self._cond:
+			self._closed = True
+			idle, self._idle = self._idle, []
+			self._cond.notify_all()
+		for conn, _ in idle:
+			self._discard(conn)
+
+	def stats(self) -> Dict[str, int]:
+		with self._cond:
+			return {
+				"max_size": self.max_size,
+				"in_use": self._in_use,
+				"idle": len(self._idle),
+				"created": self._created,
+				"reused": self._reused,
+				"discarded": self._discarded,
+			}
+
+	def _checkout(self) -> sqlite3.Connection:
+		deadline = time.monotonic() + self.timeout
+		with self._cond:
+			while True:
+				if self._closed:
+					raise PoolClosed("连接池已关闭")
+				while self._idle:
+					conn, last_used = self._idle.pop()
+					if self._healthy(conn, last_used):
+						self._in_use += 1
+						self._reused += 1
+						return conn
+					self._discard(conn)
+				if self.max_size == 0 or self._in_use < self.max_size:
+					self._in_use += 1
+					break
+				remaining = deadline - time.monotonic()
+				if remaining <= 0:
+					raise PoolTimeout(f"等待数据库连接超时（max_size={self.max_size}）")
+				self._cond.wait(remaining)
+
+		try:
+			conn = _connect(self.db_path, self.profile)
+		except Exception:
+			with self._cond:
+				self._in_use -= 1
+				self._cond.notify()
+			raise
+		with self._cond:
+			self._created += 1
+		return conn
+
+	def _healthy(self, conn: sqlite3.Connection, last_used: float) -> bool:
+		if time.monotonic() - last_used < self.health_check_interval:
+			return True
+		try:
+			conn.execute("SELECT 1").fetchone()
+			return True
+		except sqlite3.Error:
+			return False
+
+	def _discard(self, conn: sqlite3.Connection) -> None:
+		# _cond 是可重入锁：_checkout 持锁时调用也没问题
+		with self._cond:
+			self._discarded += 1
+		try:
+			conn.close()
+		except sqlite3.Error:
+			pass
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+	global _pool
+	pool = _pool
+	if pool is None:
+		with _pool_lock:
+			if _pool is None:
+				_pool = ConnectionPool(DB_PATH, max_size=POOL_SIZE, timeout=POOL_TIMEOUT)
+			pool = _pool
+	return pool
+
+
+def configure(db_path: Optional[str] = None, pool_size: Optional[int] = None) -> None:
+	"""切换数据库文件或池大小（测试、基准脚本用）；旧池会被关闭。"""
+	global DB_PATH, POOL_SIZE, _schema_ready
+	close_pool()
+	_schema_ready = False
+	if db_path is not None:
+		DB_PATH = os.path.abspath(db_path)
+	if pool_size is not None:
+		POOL_SIZE = int(pool_size)
+
+
+def release_connection() -> None:
+	"""请求结束时调用：把当前线程的连接还给连接池。"""
+	pool = _pool
+	if pool is not None:
+		pool.release()
+
+
+def close_pool() -> None:
+	global _pool
+	with _pool_lock:
+		pool, _pool = _pool, None
+	if pool is not None:
+		pool.close()
+
+
+atexit.register(close_pool)
+
+
 def init_schema() -> None:
-	conn = _connect()
-	try:
-		conn.executescript(
-			"""
-			CREATE TABLE IF NOT EXISTS users (
-				id INTEGER PRIMARY KEY AUTOINCREMENT,
-				username TEXT UNIQUE,
-				created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-			);
-
-			CREATE TABLE IF NOT EXISTS questions (
-				id INTEGER PRIMARY KEY AUTOINCREMENT,
-				category TEXT NOT NULL,
-				title TEXT NOT NULL,
-				option_a TEXT,
-				option_b TEXT,
-				option_c TEXT,
-				option_d TEXT,
-				difficulty TEXT DEFAULT 'Easy',
-				is_high_frequency INTEGER DEFAULT 0
-			);
-
-			CREATE TABLE IF NOT EXISTS answers (
-				question_id INTEGER PRIMARY KEY,
-				correct_answer TEXT NOT NULL,
-				analysis TEXT,
-				knowledge_point TEXT,
-				FOREIGN KEY(question_id) REFERENCES questions(id) ON DELETE CASCADE
-			);
-
-			CREATE TABLE IF NOT EXISTS attempts (
-				id INTEGER PRIMARY KEY AUTOINCREMENT,
-				user_id INTEGER NOT NULL DEFAULT 1,
-				question_id INTEGER NOT NULL,
-				user_answer TEXT NOT NULL,
-				is_correct INTEGER NOT NULL,
-				category TEXT,
-				difficulty TEXT,
-				created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-				FOREIGN KEY(user_id) REFERENCES users(id),
-				FOREIGN KEY(question_id) REFERENCES questions(id)
-			);
-
-			CREATE TABLE IF NOT EXISTS favorites (
-				id INTEGER PRIMARY KEY AUTOINCREMENT,
-				user_id INTEGER NOT NULL DEFAULT 1,
-				question_id INTEGER NOT NULL,
-				collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-				UNIQUE(user_id, question_id),
-				FOREIGN KEY(user_id) REFERENCES users(id),
-				FOREIGN KEY(question_id) REFERENCES questions(id)
-			);
-			"""
-		)
-		conn.execute("INSERT OR IGNORE INTO users(id, username) VALUES(1, 'local_user');")
-		conn.commit()
-	finally:
-		conn.close()
+	"""执行全部待执行的迁移（启动时调用一次）。"""
+	global _schema_ready
+	with _schema_lock:
+		with get_conn() as conn:
+			migrate(conn)
+		_schema_ready = True
+
+
+def schema_ready() -> bool:
+	return _schema_ready
+
+
+def ensure_schema() -> None:
+	"""请求入口用的廉价检查：迁移已完成时只读一个模块级标志。"""
+	if not _schema_ready:
+		init_schema()
 
 
 @contextmanager
 def get_conn() -> Iterator[sqlite3.Connection]:
-	conn = _connect()
+	conn = get_pool().connection()
 	try:
 		yield conn
 		conn.commit()
 	except Exception:
 		conn.rollback()
 		raise
-	finally:
-		conn.close()
 
 
 def fetch_one(sql: str, params: Tuple[Any, ...] = ()) -> Optional[Dict[str, Any]]:
-	with get_conn() as conn:
-		row = conn.execute(sql, params).fetchone()
-		return dict(row) if row else None
+	row = get_pool().connection().execute(sql, params).fetchone()
+	return dict(row) if row else None
 
 
 def fetch_all(sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
-	with get_conn() as conn:
-		rows = conn.execute(sql, params).fetchall()
-		return [dict(r) for r in rows]
+	rows = get_pool().connection().execute(sql, params).fetchall()
+	return [dict(r) for r in rows]
+
+
+def run_write(
+	fn: Callable[[sqlite3.Connection], T],
+	policy: Optional[RetryPolicy] = None,
+	pool: Optional[ConnectionPool] = None,
+) -> T:
+	"""在一个 BEGIN IMMEDIATE 写事务里执行 fn(conn) 并提交。
+
+	先拿写锁可以避免“读事务升级为写事务”时的死锁；仍然遇到锁冲突时按 policy 退避重试，
+	因此 fn 必须可以安全地重复执行（失败的那次已整体回滚）。
+	"""
+	policy = policy or RETRY_POLICY
+	pool = pool or get_pool()
+	attempt = 0
+	while True:
+		conn = pool.connection()
+		try:
+			conn.execute("BEGIN IMMEDIATE")
+			result = fn(conn)
+			conn.commit()
+			return result
+		except Exception as e:
+			if conn.in_transaction:
+				conn.rollback()
+			attempt += 1
+			if not is_lock_error(e) or attempt >= policy.attempts:
+				raise
+			time.sleep(policy.delay(attempt - 1))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import replace
+from typing import Any, Iterable, Optional, Sequence
+
+from app.database.db import PROFILE, ConnectionPool, get_pool
+
+
+class DBManager:
+	"""面向服务层/脚本/测试的数据库句柄。
+
+	不传 db_path 时复用 Web 应用的全局连接池；传入 db_path 时为该库文件单独建池。
+	与 get_conn() 不同，这里不自动提交，由调用方显式 commit()/rollback()。
+
+	独立库文件（测试库、scripts/init_db.py 建出的旧库）使用同样的调优参数，
+	但不强制外键约束；外键策略属于 Web 应用自己的连接池。
+	"""
+
+	def __init__(self, db_path: Optional[str] = None, pool: Optional[ConnectionPool] = None) -> None:
+		self._owns_pool = pool is None and db_path is not None
+		if pool is None:
+			pool = (
+				ConnectionPool(db_path, profile=replace(PROFILE, foreign_keys=False))
+				if db_path is not None
+				else get_pool()
+			)
+		self.pool = pool
+		self.db_path = pool.db_path
+
+	@property
+	def conn(self) -> sqlite3.Connection:
+		return self.pool.connection()
+
+	def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+		return self.conn.execute(sql, params)
+
+	def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> sqlite3.Cursor:
+		return self.conn.executemany(sql, seq_of_params)
+
+	def query(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+		return self.conn.execute(sql, params)
+
+	def commit(self) -> None:
+		self.conn.commit()
+
+	def rollback(self) -> None:
+		self.conn.rollback()
+
+	def close(self) -> None:
+		if self._owns_pool:
+			self.pool.close()
+		else:
+			self.pool.release()
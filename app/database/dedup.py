@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+近似重复题目检测（MinHash + LSH）
+- 每道题取题干与各选项的字符 3-gram 作为 shingle 集合（选项分别切分后取并集，选项换序不影响结果；
+  切分前去掉空白与标点，只差标点/空格的改写视为相同）
+- 签名用单次哈希的 MinHash（one permutation hashing + optimal densification 补齐空桶）：
+  每个 shingle 只算一次哈希，代价与 shingle 数线性相关，不需要对每个排列重复计算
+- LSH：签名按 BANDS 段切分，同一段取值相同的题进入同一个桶，只有同桶的题成为候选对；
+  逐段建桶、建完即丢，峰值内存只有一段的桶
+- 候选对再按真实 Jaccard 相似度复核，>= 阈值的用并查集合并成簇
+- 对簇可以“标记”（questions.duplicate_of 指向保留的题）或“合并”（答题记录/收藏改挂到保留的题后删除重复题）
+"""
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from array import array
+from typing import Dict, FrozenSet, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from app.database.fingerprint import normalize_text
+from app.database.review_schedule import rebuild_review_schedule
+from app.database.rollups import rebuild_counters
+
+SHINGLE_SIZE = 3
+BANDS = 25
+ROWS = 6  # 每段 6 个值：相似度 0.7 的两题成为候选的概率约 96%，0.2 的约 0.16%
+NUM_BINS = BANDS * ROWS
+DEFAULT_THRESHOLD = 0.7
+
+_NON_WORD = re.compile(r"[\W_]+")
+_BIN_SEED = 0x5BD1E995
+_VALUE_MASK = 0xFFFFFFFF
+# 空桶的探查顺序（所有题共用同一套）：空桶 j 依次看 _PROBES[j] 里的桶，取第一个非空桶的值。
+# 各空桶独立随机探查，相邻空桶不会都抄同一个值（轮转补齐会让同一段里的值高度相关，误报大增）
+_PROBES = [
+	[rng.randrange(NUM_BINS) for _ in range(4 * NUM_BINS)]
+	for rng in (random.Random(j) for j in range(NUM_BINS))
+]
+
+
+def _text_shingles(text: str, k: int = SHINGLE_SIZE) -> Iterator[str]:
+	text = _NON_WORD.sub("", normalize_text(text))
+	if not text:
+		return
+	if len(text) <= k:
+		yield text
+		return
+	for i in range(len(text) - k + 1):
+		yield text[i : i + k]
+
+
+def shingle_set(title: Optional[str], options: Iterable[Optional[str]] = ()) -> FrozenSet[int]:
+	"""题干 + 各选项的 3-gram 哈希集合。"""
+	out: Set[int] = set()
+	for part in (title, *options):
+		for s in _text_shingles(part or ""):
+			data = s.encode("utf-8")
+			# 高 32 位决定落在哪个桶，低 32 位是桶内比较的值
+			out.add((zlib.crc32(data, _BIN_SEED) << 32) | zlib.crc32(data))
+	return frozenset(out)
+
+
+def signature(shingles: Iterable[int]) -> Optional[array]:
+	"""NUM_BINS 个值的 MinHash 签名；没有任何 shingle 时返回 None。"""
+	sig = [-1] * NUM_BINS
+	for h in shingles:
+		b = (h >> 32) % NUM_BINS
+		v = h & _VALUE_MASK
+		if sig[b] < 0 or v < sig[b]:
+			sig[b] = v
+	if max(sig) < 0:
+		return None
+	if min(sig) < 0:
+		filled = list(sig)
+		for j in range(NUM_BINS):
+			if filled[j] >= 0:
+				continue
+			for attempt, k in enumerate(_PROBES[j]):
+				if filled[k] >= 0:
+					# 附带探查次数，来源不同的补齐值不会相等
+					sig[j] = filled[k] | ((attempt + 1) << 32)
+					break
+			else:
+				sig[j] = next(v for v in filled if v >= 0) | (1 << 40)
+	return array("Q", sig)
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+	if not a and not b:
+		return 1.0
+	inter = len(a & b)
+	return inter / (len(a) + len(b) - inter)
+
+
+class _UnionFind:
+	def __init__(self) -> None:
+		self.parent: Dict[int, int] = {}
+
+	def find(self, x: int) -> int:
+		parent = self.parent
+		root = x
+		while parent.get(root, root) != root:
+			root = parent[root]
+		while parent.get(x, x) != root:
+			parent[x], x = root, parent[x]
+		return root
+
+	def union(self, a: int, b: int) -> None:
+		ra, rb = self.find(a), self.find(b)
+		if ra != rb:
+			# 较小的下标作为根：簇内第一个加入的（题库里即 id 最小的）成为代表
+			self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class Cluster(NamedTuple):
+	keys: List[Hashable]  # 按加入顺序；keys[0] 为保留的题
+	similarity: float  # 簇内已确认的相似对中最低的相似度
+
+
+class NearDuplicateIndex:
+	"""收集若干道题，找出近似重复的簇。key 为题目 id 或任意可哈希的标识（如导入文件的行号）。"""
+
+	def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+		self.threshold = threshold
+		self.keys: List[Hashable] = []
+		self.texts: List[Tuple[str, Tuple[str, ...]]] = []
+		self._sigs = array("Q")
+		self.candidates = 0
+
+	def __len__(self) -> int:
+		return len(self.keys)
+
+	def add(self, key: Hashable, title: Optional[str], options: Sequence[Optional[str]] = ()) -> bool:
+		opts = tuple(o or "" for o in options)
+		sig = signature(shingle_set(title, opts))
+		if sig is None:
+			return False
+		self.keys.append(key)
+		self.texts.append((title or "", opts))
+		self._sigs.extend(sig)
+		return True
+
+	def _candidate_pairs(self) -> Set[Tuple[int, int]]:
+		pairs: Set[Tuple[int, int]] = set()
+		sigs = self._sigs
+		n = len(self.keys)
+		for band in range(BANDS):
+			buckets: Dict[Tuple[int, ...], List[int]] = {}
+			lo = band * ROWS
+			for i in range(n):
+				base = i * NUM_BINS + lo
+				buckets.setdefault(tuple(sigs[base : base + ROWS]), []).append(i)
+			for members in buckets.values():
+				if len(members) < 2:
+					continue
+				for x in range(len(members)):
+					for y in range(x + 1, len(members)):
+						pairs.add((members[x], members[y]))
+		return pairs
+
+	def similar_pairs(self) -> List[Tuple[int, int, float]]:
+		"""复核后的相似对 (下标, 下标, Jaccard)。"""
+		candidates = self._candidate_pairs()
+		self.candidates = len(candidates)
+		cache: Dict[int, FrozenSet[int]] = {}
+
+		def shingles(i: int) -> FrozenSet[int]:
+			s = cache.get(i)
+			if s is None:
+				s = cache[i] = shingle_set(*self.texts[i])
+			return s
+
+		out = []
+		for a, b in sorted(candidates):
+			sim = jaccard(shingles(a), shingles(b))
+			if sim >= self.threshold:
+				out.append((a, b, sim))
+		return out
+
+	def clusters(self) -> List[Cluster]:
+		uf = _UnionFind()
+		lowest: Dict[int, float] = {}
+		pairs = self.similar_pairs()
+		for a, b, _sim in pairs:
+			uf.union(a, b)
+		members: Dict[int, List[int]] = {}
+		for a, b, sim in pairs:
+			root = uf.find(a)
+			lowest[root] = min(sim, lowest.get(root, 1.0))
+			for i in (a, b):
+				group = members.setdefault(root, [])
+				if i not in group:
+					group.append(i)
+		return [
+			Cluster([self.keys[i] for i in sorted(group)], lowest[root])
+			for root, group in sorted(members.items())
+		]
+
+
+# ---------------- 题库 ----------------
+
+def bank_index(conn, threshold: float = DEFAULT_THRESHOLD) -> NearDuplicateIndex:
+	"""把 questions 全部放进索引（按 id 升序，簇里 id 最小的题为保留题）。"""
+	index = NearDuplicateIndex(threshold)
+	for row in conn.execute("SELECT id, title, option_a, option_b, option_c, option_d FROM questions ORDER BY id"):
+		index.add(int(row[0]), row[1], row[2:6])
+	return index
+
+
+def flag_clusters(conn, clusters: Iterable[Cluster]) -> int:
+	"""标记：重复题的 duplicate_of 指向保留的题（调用方负责事务），返回标记的题数。
+
+	先清掉旧标记，标记结果始终与最近一次检测一致。
+	"""
+	rows = [(c.keys[0], qid) for c in clusters for qid in c.keys[1:]]
+	conn.execute("UPDATE questions SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL")
+	conn.executemany("UPDATE questions SET duplicate_of = ? WHERE id = ?", rows)
+	return len(rows)
+
+
+def merge_clusters(conn, clusters: Iterable[Cluster]) -> int:
+	"""合并：答题记录与收藏改挂到保留的题，再删除重复题（调用方负责事务），返回删除的题数。
+
+	答题记录按题目 id 改挂，错题数计数器与复习排期随后整体重算；同一用户已收藏保留题时，重复题的收藏直接删除。
+	"""
+	moves = [(c.keys[0], qid) for c in clusters for qid in c.keys[1:]]
+	if not moves:
+		return 0
+	conn.executemany("UPDATE attempts SET question_id = ? WHERE question_id = ?", moves)
+	conn.executemany("UPDATE OR IGNORE favorites SET question_id = ? WHERE question_id = ?", moves)
+	dropped = [(qid,) for _keep, qid in moves]
+	conn.executemany("DELETE FROM favorites WHERE question_id = ?", dropped)
+	conn.executemany("UPDATE questions SET duplicate_of = NULL WHERE duplicate_of = ?", dropped)
+	conn.executemany("DELETE FROM answers WHERE question_id = ?", dropped)
+	conn.executemany("DELETE FROM questions WHERE id = ?", dropped)
+	rebuild_counters(conn)
+	if conn.execute("PRAGMA table_info(review_schedule)").fetchone() is not None:
+		rebuild_review_schedule(conn)
+	return len(dropped)
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+模拟面试会话（服务端存储）
+- 进行中的模拟面试保存在 exam_sessions 表，浏览器 cookie 里只有一个不透明的会话 id
+- 进程内有一个小的 LRU 前置缓存，单进程时命中即可直接使用；多进程（prefork）时读取前先比对 rev
+- 写入按 rev 做乐观并发控制：rev 不一致说明别的请求/进程已经改过，本次写入不生效
+- 过期会话由后台线程定期清理；页面刷新、工作进程重启后都能从表里恢复
+"""
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.database.db import ConnectionPool, get_pool, run_write
+
+EXAM_SESSION_CACHE_SIZE = int(os.environ.get("EXAM_SESSION_CACHE_SIZE", "1024"))
+EXAM_SWEEP_INTERVAL = float(os.environ.get("EXAM_SWEEP_INTERVAL", "60"))
+# 到时后会话再保留多久（秒）：允许稍晚到达的交卷请求与查看结果
+EXAM_SESSION_GRACE = int(os.environ.get("EXAM_SESSION_GRACE", "600"))
+
+_COLUMNS = "id, user_id, category, question_ids, idx, answers, start_ts, time_limit, expires_ts, rev, mode, record_id"
+
+MODE_STEP = "step"  # 逐题取题、逐题提交
+MODE_BUNDLE = "bundle"  # 开始时下发整卷，交卷时一次性提交全部答案
+MODES = (MODE_STEP, MODE_BUNDLE)
+
+
+class ExamSession:
+	"""一场进行中的模拟面试。answers: 题目 id（字符串）-> {user_answer, is_correct}"""
+
+	__slots__ = (
+		"id", "user_id", "category", "question_ids", "idx", "answers",
+		"start_ts", "time_limit", "expires_ts", "rev", "mode", "record_id",
+	)
+
+	def __init__(
+		self,
+		id: str,
+		user_id: int,
+		category: str,
+		question_ids: List[int],
+		start_ts: int,
+		time_limit: int,
+		expires_ts: int,
+		idx: int = 0,
+		answers: Optional[Dict[str, Dict[str, Any]]] = None,
+		rev: int = 0,
+		mode: str = MODE_STEP,
+		record_id: Optional[int] = None,
+	) -> None:
+		self.id = id
+		self.user_id = user_id
+		self.category = category
+		self.question_ids = question_ids
+		self.idx = idx
+		self.answers = answers if answers is not None else {}
+		self.start_ts = start_ts
+		self.time_limit = time_limit
+		self.expires_ts = expires_ts
+		self.rev = rev
+		self.mode = mode
+		self.record_id = record_id  # exams 表里对应的模拟面试记录
+
+	@property
+	def deadline(self) -> int:
+		return self.start_ts + self.time_limit
+
+	@property
+	def finished(self) -> bool:
+		return self.idx >= len(self.question_ids)
+
+	def copy(self) -> "ExamSession":
+		# 调用方会就地修改 idx/answers，缓存里保存的那份不能被改到
+		return ExamSession(
+			self.id, self.user_id, self.category, list(self.question_ids), self.start_ts,
+			self.time_limit, self.expires_ts, self.idx, {k: dict(v) for k, v in self.answers.items()}, self.rev,
+			self.mode, self.record_id,
+		)
+
+
+def _from_row(row) -> ExamSession:
+	return ExamSession(
+		id=row["id"],
+		user_id=int(row["user_id"]),
+		category=row["category"] or "",
+		question_ids=[int(i) for i in json.loads(row["question_ids"])],
+		idx=int(row["idx"]),
+		answers=json.loads(row["answers"] or "{}"),
+		start_ts=int(row["start_ts"]),
+		time_limit=int(row["time_limit"]),
+		expires_ts=int(row["expires_ts"]),
+		rev=int(row["rev"]),
+		mode=row["mode"] or MODE_STEP,
+		record_id=row["record_id"],
+	)
+
+
+class ExamSessionStore:
+	def __init__(
+		self,
+		pool: Optional[ConnectionPool] = None,
+		cache_size: int = EXAM_SESSION_CACHE_SIZE,
+		sweep_interval: float = EXAM_SWEEP_INTERVAL,
+	) -> None:
+		self._pool = pool
+		self.cache_size = cache_size
+		self.sweep_interval = sweep_interval
+		# 多进程部署时置为 True（见 app/server.py）：其他进程可能已改过同一会话
+		self.revalidate = False
+		self._lock = threading.Lock()
+		self._cache: "OrderedDict[str, ExamSession]" = OrderedDict()
+		self._sweeper: Optional[threading.Thread] = None
+		self._sweeper_pid = 0
+		self.hits = 0
+		self.misses = 0
+		self.conflicts = 0
+		self.swept = 0
+
+	def _get_pool(self) -> ConnectionPool:
+		return self._pool or get_pool()
+
+	# ---------------- 读写 ----------------
+
+	def create(
+		self,
+		question_ids: List[int],
+		time_limit: int,
+		category: str = "",
+		user_id: int = 1,
+		now: Optional[int] = None,
+		mode: str = MODE_STEP,
+		record_id: Optional[int] = None,
+	) -> ExamSession:
+		self.start_sweeper()
+		now = int(time.time()) if now is None else int(now)
+		sess = ExamSession(
+			id=secrets.token_urlsafe(18),
+			user_id=user_id,
+			category=category,
+			question_ids=[int(i) for i in question_ids],
+			start_ts=now,
+			time_limit=int(time_limit),
+			expires_ts=now + int(time_limit) + EXAM_SESSION_GRACE,
+			mode=mode,
+			record_id=record_id,
+		)
+		run_write(
+			lambda conn: conn.execute(
+				f"INSERT INTO exam_sessions({_COLUMNS}) VALUES(?,?,?,?,?,?,?,?,?,?,?,?)",
+				(
+					sess.id, sess.user_id, sess.category, json.dumps(sess.question_ids), sess.idx,
+					json.dumps(sess.answers), sess.start_ts, sess.time_limit, sess.expires_ts, sess.rev,
+					sess.mode, sess.record_id,
+				),
+			),
+			pool=self._pool,
+		)
+		self._remember(sess)
+		return sess.copy()
+
+	def get(self, exam_id: Optional[str], now: Optional[int] = None) -> Optional[ExamSession]:
+		"""返回会话副本；不存在或已过期时返回 None。"""
+		if not exam_id:
+			return None
+		self.start_sweeper()
+		now = int(time.time()) if now is None else int(now)
+		with self._lock:
+			sess = self._cache.get(exam_id)
+			if sess is not None:
+				self._cache.move_to_end(exam_id)
+		if sess is not None and self.revalidate:
+			row = self._get_pool().connection().execute(
+				"SELECT rev FROM exam_sessions WHERE id = ?", (exam_id,)
+			).fetchone()
+			if row is None or int(row["rev"]) != sess.rev:
+				sess = None
+		if sess is not None:
+			self.hits += 1
+		else:
+			self.misses += 1
+			row = self._get_pool().connection().execute(
+				f"SELECT {_COLUMNS} FROM exam_sessions WHERE id = ?", (exam_id,)
+			).fetchone()
+			if row is None:
+				self._forget(exam_id)
+				return None
+			sess = _from_row(row)
+			self._remember(sess)
+		if sess.expires_ts <= now:
+			return None
+		return sess.copy()
+
+	def save(self, sess: ExamSession, also: Optional[Callable[[Any], None]] = None) -> bool:
+		"""写回 idx/answers；also(conn) 在同一事务里执行（如写答题记录）。rev 冲突时什么都不写，返回 False。"""
+
+		def _write(conn) -> bool:
+			cur = conn.execute(
+				"UPDATE exam_sessions SET idx = ?, answers = ?, rev = rev + 1 WHERE id = ? AND rev = ?",
+				(sess.idx, json.dumps(sess.answers), sess.id, sess.rev),
+			)
+			if cur.rowcount != 1:
+				return False
+			if also is not None:
+				also(conn)
+			return True
+
+		if not run_write(_write, pool=self._pool):
+			self.conflicts += 1
+			self._forget(sess.id)
+			return False
+		sess.rev += 1
+		self._remember(sess.copy())
+		return True
+
+	def close(self, sess: ExamSession, also: Optional[Callable[[Any], None]] = None) -> bool:
+		"""结束会话：按 rev 删除，also(conn) 在同一事务里执行。"""
+
+		def _write(conn) -> bool:
+			cur = conn.execute("DELETE FROM exam_sessions WHERE id = ? AND rev = ?", (sess.id, sess.rev))
+			if cur.rowcount != 1:
+				return False
+			if also is not None:
+				also(conn)
+			return True
+
+		ok = run_write(_write, pool=self._pool)
+		if not ok:
+			self.conflicts += 1
+		self._forget(sess.id)
+		return ok
+
+	# ---------------- 缓存 ----------------
+
+	def _remember(self, sess: ExamSession) -> None:
+		with self._lock:
+			self._cache[sess.id] = sess
+			self._cache.move_to_end(sess.id)
+			while len(self._cache) > self.cache_size:
+				self._cache.popitem(last=False)
+
+	def _forget(self, exam_id: str) -> None:
+		with self._lock:
+			self._cache.pop(exam_id, None)
+
+	def clear_cache(self) -> None:
+		with self._lock:
+			self._cache.clear()
+
+	def stats(self) -> Dict[str, Any]:
+		return {
+			"cached": len(self._cache),
+			"hits": self.hits,
+			"misses": self.misses,
+			"conflicts": self.conflicts,
+			"swept": self.swept,
+		}
+
+	# ---------------- 过期清理 ----------------
+
+	def sweep(self, now: Optional[int] = None, pool: Optional[ConnectionPool] = None) -> int:
+		"""删除已过期的会话（走 idx_exam_sessions_expires），返回删除条数。"""
+		now = int(time.time()) if now is None else int(now)
+		deleted = run_write(
+			lambda conn: conn.execute("DELETE FROM exam_sessions WHERE expires_ts <= ?", (now,)).rowcount,
+			pool=pool or self._pool,
+		)
+		with self._lock:
+			for key in [k for k, s in self._cache.items() if s.expires_ts <= now]:
+				del self._cache[key]
+		self.swept += deleted
+		return deleted
+
+	def start_sweeper(self) -> None:
+		"""按需启动后台清理线程；fork 出的子进程里线程不存在，按 pid 判断后重新启动。"""
+		if self.sweep_interval <= 0:
+			return
+		pid = os.getpid()
+		if self._sweeper_pid == pid and self._sweeper is not None and self._sweeper.is_alive():
+			return
+		with self._lock:
+			if self._sweeper_pid == pid and self._sweeper is not None and self._sweeper.is_alive():
+				return
+			self._sweeper_pid = pid
+			self._sweeper = threading.Thread(target=self._sweep_loop, name="exam-session-sweeper", daemon=True)
+			self._sweeper.start()
+
+	def _sweep_loop(self) -> None:
+		while True:
+			time.sleep(self.sweep_interval)
+			pool = self._get_pool()
+			try:
+				self.sweep(pool=pool)
+			except Exception as e:  # 清理失败不影响服务，下一轮再试
+				print(f"[exam_sessions] sweep failed: {e}", file=sys.stderr, flush=True)
+			finally:
+				# 后台线程不经过请求结束的归还逻辑，每轮用完就还
+				pool.release()
+
+
+exam_store = ExamSessionStore()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+题目内容指纹
+- content_hash = 规整后的题干 + 四个选项的 sha1；规整：NFKC、忽略大小写、空白折叠
+- 持久化到 questions.content_hash（唯一索引），作为导入时的自然键：同一道题重复导入只会更新、不会新增
+- 不经过导入脚本写入的题目（init_db/seed_questions 等）指纹为空，由 backfill_content_hashes 补算
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, Optional
+
+_SPACES = re.compile(r"\s+")
+_SEP = "\x1f"
+
+
+def normalize_text(text: Optional[str]) -> str:
+	text = unicodedata.normalize("NFKC", text or "")
+	return _SPACES.sub(" ", text).strip().casefold()
+
+
+def content_hash(title: Optional[str], options: Iterable[Optional[str]]) -> str:
+	parts = [normalize_text(title)] + [normalize_text(o) for o in options]
+	return hashlib.sha1(_SEP.join(parts).encode("utf-8")).hexdigest()
+
+
+def backfill_content_hashes(conn: sqlite3.Connection) -> int:
+	"""给 content_hash 为空的题目补算指纹（需在写事务内调用），返回补上的条数。
+
+	与已有题目内容相同的重复题保持为空（唯一索引允许多个 NULL），留给去重工具处理。
+	"""
+	rows = conn.execute(
+		"SELECT id, title, option_a, option_b, option_c, option_d FROM questions WHERE content_hash IS NULL ORDER BY id"
+	).fetchall()
+	if not rows:
+		return 0
+	taken = {r[0] for r in conn.execute("SELECT content_hash FROM questions WHERE content_hash IS NOT NULL")}
+	updates = []
+	for r in rows:
+		h = content_hash(r[1], r[2:6])
+		if h in taken:
+			continue
+		taken.add(h)
+		updates.append((h, r[0]))
+	conn.executemany("UPDATE questions SET content_hash = ? WHERE id = ?", updates)
+	return len(updates)
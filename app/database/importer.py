@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+题目批量导入引擎（scripts/batch_import_questions.py 使用）
+- 流式读取：JSON Lines（.jsonl/.ndjson）、CSV、JSON 数组（逐个对象解析，不整体 json.load）
+- 兼容两种题目结构：平铺的 option_a..option_d，以及 scripts/seed_questions.py 生成的嵌套 options
+- 按块校验、按块写入：每块一个写事务，questions/answers 各一次 executemany
+- 幂等：以内容指纹 content_hash（题干+选项）为自然键，已有的题只在答案/解析/分类等变化时更新，
+  没有变化的整块不开写事务，重复导入基本只有读的开销
+- 统计新增/更新/跳过/失败行数与 rows/sec
+- 报告模式（near_duplicates）：不写库，用 MinHash/LSH 找出文件内部及与题库已有题目近似重复的题
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from app.database.bank import IN_CHUNK_SIZE, OPTION_KEYS, normalize_answer
+from app.database.categories import category_key_for
+from app.database.dedup import DEFAULT_THRESHOLD, Cluster, bank_index
+from app.database.fingerprint import backfill_content_hashes, content_hash
+
+DEFAULT_BATCH_SIZE = 1000
+JSON_READ_SIZE = 1 << 16
+FORMATS = ("json", "jsonl", "csv")
+# 失败明细最多保留的条数（其余只计数）
+MAX_ERRORS = 20
+
+_TRUE_TEXT = ("1", "true", "yes", "y", "是")
+
+
+class InvalidQuestion(ValueError):
+	"""单条题目无法导入（缺字段、答案不合法等）。"""
+
+
+class QuestionRow(NamedTuple):
+	category: str
+	category_key: str
+	title: str
+	options: Tuple[str, str, str, str]
+	difficulty: str
+	is_high_frequency: int
+	correct_answer: str
+	analysis: str
+	knowledge_point: str
+	content_hash: str
+
+
+class ImportStats:
+	def __init__(self) -> None:
+		self.read = 0
+		self.added = 0
+		self.updated = 0
+		self.skipped = 0
+		self.failed = 0
+		self.batches = 0
+		self.errors: List[str] = []
+		self.started = time.perf_counter()
+		self.seconds = 0.0
+
+	def fail(self, line: int, msg: str) -> None:
+		self.failed += 1
+		if len(self.errors) < MAX_ERRORS:
+			self.errors.append(f"第 {line} 条: {msg}")
+
+	@property
+	def imported(self) -> int:
+		return self.added + self.updated
+
+	@property
+	def rows_per_sec(self) -> float:
+		return self.read / self.seconds if self.seconds else 0.0
+
+	def finish(self) -> "ImportStats":
+		self.seconds = time.perf_counter() - self.started
+		return self
+
+
+# ---------------- 读取 ----------------
+
+def detect_format(path: str) -> str:
+	ext = os.path.splitext(path)[1].lower()
+	if ext in (".jsonl", ".ndjson"):
+		return "jsonl"
+	if ext == ".csv":
+		return "csv"
+	return "json"
+
+
+def _iter_json_array(f: io.TextIOBase, read_size: int = JSON_READ_SIZE) -> Iterator[Any]:
+	"""逐个解析顶层 JSON 数组里的元素，内存占用与单个元素大小相关而不是整个文件。"""
+	decoder = json.JSONDecoder()
+	buf = ""
+	pos = 0
+	started = False
+	eof = False
+	while True:
+		# 跳过空白与分隔符
+		while True:
+			while pos < len(buf) and buf[pos] in " \t\r\n,":
+				pos += 1
+			if pos < len(buf) or eof:
+				break
+			chunk = f.read(read_size)
+			eof = not chunk
+			buf, pos = buf[pos:] + chunk, 0
+		if pos >= len(buf):
+			if not started:
+				raise json.JSONDecodeError("文件为空", buf, pos)
+			raise json.JSONDecodeError("JSON 数组没有结束", buf, pos)
+		if not started:
+			if buf[pos] != "[":
+				raise json.JSONDecodeError("JSON 文件应该包含一个题目数组", buf, pos)
+			started = True
+			pos += 1
+			continue
+		if buf[pos] == "]":
+			return
+		try:
+			item, end = decoder.raw_decode(buf, pos)
+		except json.JSONDecodeError:
+			if eof:
+				raise
+			# 元素跨越了读取边界：再读一块
+			chunk = f.read(read_size)
+			eof = not chunk
+			buf, pos = buf[pos:] + chunk, 0
+			continue
+		# 数字等元素可能恰好截断在边界上（如 12|3），没读完文件前要确认后面是分隔符
+		if end >= len(buf) and not eof:
+			chunk = f.read(read_size)
+			eof = not chunk
+			buf, pos = buf[pos:] + chunk, 0
+			continue
+		yield item
+		pos = end
+		if pos > read_size:
+			buf, pos = buf[pos:], 0
+
+
+def _iter_jsonl(f: io.TextIOBase) -> Iterator[Any]:
+	for n, line in enumerate(f, 1):
+		line = line.strip()
+		if not line:
+			continue
+		try:
+			yield json.loads(line)
+		except json.JSONDecodeError as e:
+			# 单行损坏不影响其余行：交给校验环节计入失败
+			yield InvalidQuestion(f"不是合法 JSON（第 {n} 行：{e.msg}）")
+
+
+def iter_records(path: str, fmt: Optional[str] = None) -> Iterator[Any]:
+	"""按格式流式产出原始记录（dict；解析失败的行产出 InvalidQuestion 实例）。"""
+	fmt = fmt or detect_format(path)
+	if fmt not in FORMATS:
+		raise ValueError(f"不支持的格式: {fmt}")
+	# utf-8-sig：兼容 Excel 导出的带 BOM 的 CSV
+	with open(path, "r", encoding="utf-8-sig", newline="" if fmt == "csv" else None) as f:
+		if fmt == "jsonl":
+			yield from _iter_jsonl(f)
+		elif fmt == "csv":
+			yield from csv.DictReader(f)
+		else:
+			yield from _iter_json_array(f)
+
+
+# ---------------- 校验 ----------------
+
+def _text(value: Any) -> str:
+	return "" if value is None else str(value).strip()
+
+
+def _options(raw: Mapping[str, Any]) -> Tuple[str, str, str, str]:
+	nested = raw.get("options")
+	if nested is None:
+		missing = [f"option_{k.lower()}" for k in OPTION_KEYS if f"option_{k.lower()}" not in raw]
+		if missing:
+			raise InvalidQuestion(f"缺少必需字段 {missing}")
+		return tuple(_text(raw.get(f"option_{k.lower()}")) for k in OPTION_KEYS)  # type: ignore[return-value]
+	if isinstance(nested, dict):
+		# {"A": "...", "B": "..."}（seed_questions.py / data/initial_questions.json）
+		upper = {str(k).strip().upper(): v for k, v in nested.items()}
+		return tuple(_text(upper.get(k)) for k in OPTION_KEYS)  # type: ignore[return-value]
+	if isinstance(nested, list):
+		values: List[str] = []
+		for item in nested[: len(OPTION_KEYS)]:
+			if isinstance(item, dict):
+				item = item.get("option_content", item.get("content", ""))
+			values.append(_text(item))
+		values += [""] * (len(OPTION_KEYS) - len(values))
+		return tuple(values)  # type: ignore[return-value]
+	raise InvalidQuestion("options 应为对象或数组")
+
+
+def _flag(value: Any) -> int:
+	if isinstance(value, str):
+		return 1 if value.strip().lower() in _TRUE_TEXT else 0
+	return 1 if value else 0
+
+
+def validate(raw: Any) -> QuestionRow:
+	if isinstance(raw, InvalidQuestion):
+		raise raw
+	if not isinstance(raw, dict):
+		raise InvalidQuestion("每条题目应为一个对象")
+	title = _text(raw.get("title"))
+	if not title:
+		raise InvalidQuestion("缺少必需字段 ['title']")
+	options = _options(raw)
+	if sum(1 for o in options if o) < 2:
+		raise InvalidQuestion("至少需要两个非空选项")
+	if "correct_answer" not in raw:
+		raise InvalidQuestion("缺少必需字段 ['correct_answer']")
+	answer = normalize_answer(raw.get("correct_answer"))
+	if not answer:
+		raise InvalidQuestion(f"correct_answer 无效: {raw.get('correct_answer')!r}")
+	if any(not options[OPTION_KEYS.index(k)] for k in answer):
+		raise InvalidQuestion(f"正确答案 {answer} 指向空选项")
+
+	category = _text(raw.get("category")) or "Python Basics"
+	if "is_high_frequency" in raw:
+		high_frequency = _flag(raw.get("is_high_frequency"))
+	else:
+		# 嵌套格式用 frequency（出现次数）表示，大于 0 视为高频
+		try:
+			high_frequency = 1 if float(raw.get("frequency") or 0) > 0 else 0
+		except (TypeError, ValueError):
+			high_frequency = 0
+	return QuestionRow(
+		category=category,
+		category_key=category_key_for(category),
+		title=title,
+		options=options,
+		difficulty=_text(raw.get("difficulty")) or "Easy",
+		is_high_frequency=high_frequency,
+		correct_answer=answer,
+		analysis=_text(raw.get("analysis")),
+		knowledge_point=_text(raw.get("knowledge_point")),
+		content_hash=content_hash(title, options),
+	)
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+	chunk: List[Any] = []
+	for item in items:
+		chunk.append(item)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+# ---------------- 写入 ----------------
+
+_QUESTION_INSERT = """
+	INSERT INTO questions(id,category,category_key,title,option_a,option_b,option_c,option_d,difficulty,is_high_frequency,content_hash)
+	VALUES(?,?,?,?,?,?,?,?,?,?,?)
+"""
+_ANSWER_INSERT = "INSERT INTO answers(question_id, correct_answer, analysis, knowledge_point) VALUES(?,?,?,?)"
+_QUESTION_UPDATE = "UPDATE questions SET category = ?, category_key = ?, difficulty = ?, is_high_frequency = ? WHERE id = ?"
+_ANSWER_UPSERT = """
+	INSERT INTO answers(question_id, correct_answer, analysis, knowledge_point) VALUES(?,?,?,?)
+	ON CONFLICT(question_id) DO UPDATE SET
+		correct_answer = excluded.correct_answer, analysis = excluded.analysis, knowledge_point = excluded.knowledge_point
+"""
+_EXISTING_SELECT = """
+	SELECT q.content_hash, q.id, q.category, q.difficulty, q.is_high_frequency,
+		a.question_id, a.correct_answer, a.analysis, a.knowledge_point
+	FROM questions q
+	LEFT JOIN answers a ON a.question_id = q.id
+	WHERE q.content_hash IN ({marks})
+"""
+
+
+class _Plan(NamedTuple):
+	inserts: List[QuestionRow]
+	question_updates: List[Tuple[Any, ...]]
+	answer_upserts: List[Tuple[Any, ...]]
+	updated: int
+	skipped: int
+
+	@property
+	def empty(self) -> bool:
+		return not (self.inserts or self.question_updates or self.answer_upserts)
+
+
+def _existing(conn: sqlite3.Connection, hashes: List[str]) -> Dict[str, Tuple[Any, ...]]:
+	found: Dict[str, Tuple[Any, ...]] = {}
+	for i in range(0, len(hashes), IN_CHUNK_SIZE):
+		part = hashes[i : i + IN_CHUNK_SIZE]
+		for r in conn.execute(_EXISTING_SELECT.format(marks=",".join("?" * len(part))), part):
+			found[r[0]] = tuple(r)
+	return found
+
+
+def _plan(conn: sqlite3.Connection, rows: Dict[str, QuestionRow]) -> _Plan:
+	"""和库里已有的同指纹题目比对，得出要新增/更新的行；内容相同的不写。"""
+	existing = _existing(conn, list(rows))
+	inserts: List[QuestionRow] = []
+	question_updates: List[Tuple[Any, ...]] = []
+	answer_upserts: List[Tuple[Any, ...]] = []
+	updated = skipped = 0
+	for h, r in rows.items():
+		old = existing.get(h)
+		if old is None:
+			inserts.append(r)
+			continue
+		_, qid, category, difficulty, high_frequency, answer_id, answer, analysis, knowledge_point = old
+		changed = False
+		if (category, difficulty or "Easy", int(high_frequency or 0)) != (r.category, r.difficulty, r.is_high_frequency):
+			question_updates.append((r.category, r.category_key, r.difficulty, r.is_high_frequency, qid))
+			changed = True
+		if answer_id is None or (normalize_answer(answer), analysis or "", knowledge_point or "") != (
+			r.correct_answer, r.analysis, r.knowledge_point
+		):
+			answer_upserts.append((qid, r.correct_answer, r.analysis, r.knowledge_point))
+			changed = True
+		if changed:
+			updated += 1
+		else:
+			skipped += 1
+	return _Plan(inserts, question_updates, answer_upserts, updated, skipped)
+
+
+def _next_question_id(conn: sqlite3.Connection) -> int:
+	# 写事务内读取：AUTOINCREMENT 表不复用已删除的 id，取 max(id) 与 sqlite_sequence 的较大者
+	max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM questions").fetchone()[0]
+	row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'questions'").fetchone()
+	return max(int(max_id), int(row[0]) if row else 0) + 1
+
+
+def _apply(conn: sqlite3.Connection, plan: _Plan) -> None:
+	if plan.inserts:
+		first = _next_question_id(conn)
+		conn.executemany(
+			_QUESTION_INSERT,
+			[
+				(first + i, r.category, r.category_key, r.title, *r.options, r.difficulty, r.is_high_frequency, r.content_hash)
+				for i, r in enumerate(plan.inserts)
+			],
+		)
+		conn.executemany(
+			_ANSWER_INSERT,
+			[(first + i, r.correct_answer, r.analysis, r.knowledge_point) for i, r in enumerate(plan.inserts)],
+		)
+	if plan.question_updates:
+		conn.executemany(_QUESTION_UPDATE, plan.question_updates)
+	if plan.answer_upserts:
+		conn.executemany(_ANSWER_UPSERT, plan.answer_upserts)
+
+
+def _dedupe(rows: List[QuestionRow], stats: ImportStats) -> Dict[str, QuestionRow]:
+	# 同一块里重复的题：按出现顺序处理的结果等价于“后者覆盖前者”
+	unique: Dict[str, QuestionRow] = {}
+	for r in rows:
+		prev = unique.get(r.content_hash)
+		if prev is None:
+			unique[r.content_hash] = r
+		elif prev == r:
+			stats.skipped += 1
+		else:
+			unique[r.content_hash] = r
+			stats.updated += 1
+	return unique
+
+
+def _write_batch(conn: sqlite3.Connection, rows: Dict[str, QuestionRow]) -> _Plan:
+	plan = _plan(conn, rows)
+	if plan.empty:
+		return plan
+	conn.execute("BEGIN IMMEDIATE")
+	try:
+		# 拿到写锁后重新比对：读到的结果可能已被别的写入者改过
+		plan = _plan(conn, rows)
+		_apply(conn, plan)
+		conn.commit()
+	except Exception:
+		conn.rollback()
+		raise
+	return plan
+
+
+def _backfill(conn: sqlite3.Connection) -> None:
+	# 不经过导入写入的题目没有指纹，先补上，否则会被当作新题再导入一遍
+	if conn.execute("SELECT 1 FROM questions WHERE content_hash IS NULL LIMIT 1").fetchone() is None:
+		return
+	conn.execute("BEGIN IMMEDIATE")
+	try:
+		backfill_content_hashes(conn)
+		conn.commit()
+	except Exception:
+		conn.rollback()
+		raise
+
+
+def import_records(
+	conn: sqlite3.Connection,
+	records: Iterable[Any],
+	batch_size: int = DEFAULT_BATCH_SIZE,
+	progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+	"""按块校验并写入；有变化的块一个 BEGIN IMMEDIATE 事务，坏行只影响自己。"""
+	stats = ImportStats()
+	_backfill(conn)
+	line = 0
+	for chunk in _chunks(records, max(1, batch_size)):
+		rows: List[QuestionRow] = []
+		for raw in chunk:
+			line += 1
+			stats.read += 1
+			try:
+				rows.append(validate(raw))
+			except InvalidQuestion as e:
+				stats.fail(line, str(e))
+		if rows:
+			plan = _write_batch(conn, _dedupe(rows, stats))
+			stats.added += len(plan.inserts)
+			stats.updated += plan.updated
+			stats.skipped += plan.skipped
+		stats.batches += 1
+		if progress is not None:
+			stats.seconds = time.perf_counter() - stats.started
+			progress(stats)
+	return stats.finish()
+
+
+def import_file(
+	conn: sqlite3.Connection,
+	path: str,
+	fmt: Optional[str] = None,
+	batch_size: int = DEFAULT_BATCH_SIZE,
+	progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+	return import_records(conn, iter_records(path, fmt), batch_size=batch_size, progress=progress)
+
+
+# ---------------- 近似重复报告 ----------------
+
+class SourceLine(NamedTuple):
+	"""近似重复簇里来自导入文件的题（按记录序号标识），区别于题库里的题目 id。"""
+	line: int
+
+
+def near_duplicates(
+	conn: sqlite3.Connection, records: Iterable[Any], threshold: float = DEFAULT_THRESHOLD
+) -> Tuple[List[Cluster], ImportStats]:
+	"""报告模式，不写库：返回包含导入文件中题目的近似重复簇（题库里的题排在簇的前面）。"""
+	stats = ImportStats()
+	index = bank_index(conn, threshold)
+	for line, raw in enumerate(records, 1):
+		stats.read += 1
+		try:
+			row = validate(raw)
+		except InvalidQuestion as e:
+			stats.fail(line, str(e))
+			continue
+		index.add(SourceLine(line), row.title, row.options)
+	clusters = [c for c in index.clusters() if any(isinstance(k, SourceLine) for k in c.keys)]
+	return clusters, stats.finish()
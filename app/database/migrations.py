@@ -0,0 +1,869 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移
+- 版本号记录在 PRAGMA user_version 中
+- MIGRATIONS 按版本号升序排列，每一步在单独的写事务里执行并同步更新版本号
+- 只在启动时运行一次；请求处理过程中不再执行任何 DDL
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Callable, Iterator, List, Tuple
+
+from app.database import rollups
+from app.database.categories import category_key_sql
+from app.database.fingerprint import backfill_content_hashes
+from app.database.review_schedule import (
+	EASE_PENALTY,
+	INITIAL_EASE,
+	MIN_EASE,
+	RELEARN_SECONDS,
+	REVIEW_COLUMNS,
+	next_interval_sql,
+	rebuild_review_schedule,
+)
+from app.database.rollups import (
+	QUESTION_STATE_COLUMNS,
+	attempt_day_sql,
+	question_state_sql,
+	rebuild_counters,
+	rebuild_daily,
+	rebuild_question_state,
+	rebuild_rollups,
+)
+
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+
+def _statements(script: str) -> Iterator[str]:
+	"""把多语句 SQL 拆成单条语句（按 sqlite3.complete_statement 判断，触发器体内的分号不受影响）。"""
+	buf = ""
+	for line in script.splitlines(keepends=True):
+		buf += line
+		if sqlite3.complete_statement(buf):
+			stmt = buf.strip()
+			buf = ""
+			if stmt.rstrip(";").strip():
+				yield stmt
+	if buf.strip():
+		yield buf.strip()
+
+
+def _run_script(conn: sqlite3.Connection, script: str) -> None:
+	# 不用 executescript：它会先隐式提交，破坏“一步迁移一个事务”
+	for stmt in _statements(script):
+		conn.execute(stmt)
+
+
+def _v1_baseline(conn: sqlite3.Connection) -> None:
+	# 与旧版 init_schema() 完全一致，已有库执行时不会改变任何东西
+	_run_script(
+		conn,
+		"""
+		CREATE TABLE IF NOT EXISTS users (
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			username TEXT UNIQUE,
+			created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+		);
+
+		CREATE TABLE IF NOT EXISTS questions (
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			category TEXT NOT NULL,
+			title TEXT NOT NULL,
+			option_a TEXT,
+			option_b TEXT,
+			option_c TEXT,
+			option_d TEXT,
+			difficulty TEXT DEFAULT 'Easy',
+			is_high_frequency INTEGER DEFAULT 0
+		);
+
+		CREATE TABLE IF NOT EXISTS answers (
+			question_id INTEGER PRIMARY KEY,
+			correct_answer TEXT NOT NULL,
+			analysis TEXT,
+			knowledge_point TEXT,
+			FOREIGN KEY(question_id) REFERENCES questions(id) ON DELETE CASCADE
+		);
+
+		CREATE TABLE IF NOT EXISTS attempts (
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			user_id INTEGER NOT NULL DEFAULT 1,
+			question_id INTEGER NOT NULL,
+			user_answer TEXT NOT NULL,
+			is_correct INTEGER NOT NULL,
+			category TEXT,
+			difficulty TEXT,
+			created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+			FOREIGN KEY(user_id) REFERENCES users(id),
+			FOREIGN KEY(question_id) REFERENCES questions(id)
+		);
+
+		CREATE TABLE IF NOT EXISTS favorites (
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			user_id INTEGER NOT NULL DEFAULT 1,
+			question_id INTEGER NOT NULL,
+			collect_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+			UNIQUE(user_id, question_id),
+			FOREIGN KEY(user_id) REFERENCES users(id),
+			FOREIGN KEY(question_id) REFERENCES questions(id)
+		);
+
+		INSERT OR IGNORE INTO users(id, username) VALUES(1, 'local_user');
+		"""
+	)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+	return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _v2_attempt_indexes(conn: sqlite3.Connection) -> None:
+	# created_ts：整数秒（UTC epoch），时间窗口查询可以直接走索引范围扫描
+	if "created_ts" not in _columns(conn, "attempts"):
+		conn.execute("ALTER TABLE attempts ADD COLUMN created_ts INTEGER")
+	conn.execute(
+		"UPDATE attempts SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) "
+		"WHERE created_ts IS NULL"
+	)
+	_run_script(
+		conn,
+		"""
+		-- 写入方未显式提供 created_ts 时兜底补上
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_created_ts
+		AFTER INSERT ON attempts
+		WHEN NEW.created_ts IS NULL
+		BEGIN
+			UPDATE attempts SET created_ts = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = NEW.id;
+		END;
+
+		-- 总体/错题统计、错题本（覆盖索引）
+		CREATE INDEX IF NOT EXISTS idx_attempts_user_correct_question
+			ON attempts(user_id, is_correct, question_id, created_ts);
+		-- 最近 N 天
+		CREATE INDEX IF NOT EXISTS idx_attempts_user_created
+			ON attempts(user_id, created_ts, is_correct);
+		-- 分类 / 难度统计
+		CREATE INDEX IF NOT EXISTS idx_attempts_user_category
+			ON attempts(user_id, category, is_correct);
+		CREATE INDEX IF NOT EXISTS idx_attempts_user_difficulty
+			ON attempts(user_id, difficulty, is_correct);
+
+		CREATE INDEX IF NOT EXISTS idx_favorites_user_collect
+			ON favorites(user_id, collect_time);
+		"""
+	)
+
+
+def _v3_category_key(conn: sqlite3.Connection) -> None:
+	if "category_key" not in _columns(conn, "questions"):
+		conn.execute("ALTER TABLE questions ADD COLUMN category_key TEXT")
+	conn.execute(f"UPDATE questions SET category_key = {category_key_sql('category')}")
+	_run_script(
+		conn,
+		f"""
+		-- 导入脚本会直接写入 category_key；其他途径写入/修改分类时由触发器补算
+		CREATE TRIGGER IF NOT EXISTS trg_questions_category_key_insert
+		AFTER INSERT ON questions
+		WHEN NEW.category_key IS NULL
+		BEGIN
+			UPDATE questions SET category_key = {category_key_sql('NEW.category')} WHERE id = NEW.id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_questions_category_key_update
+		AFTER UPDATE OF category ON questions
+		BEGIN
+			UPDATE questions SET category_key = {category_key_sql('NEW.category')} WHERE id = NEW.id;
+		END;
+
+		CREATE INDEX IF NOT EXISTS idx_questions_category_key ON questions(category_key, id);
+		"""
+	)
+
+
+def _v4_progress_rollups(conn: sqlite3.Connection) -> None:
+	day_expr = "date(COALESCE({row}.created_ts, CAST(strftime('%s', {row}.created_at) AS INTEGER)), 'unixepoch')"
+	_run_script(
+		conn,
+		f"""
+		CREATE TABLE IF NOT EXISTS progress_daily (
+			user_id INTEGER NOT NULL,
+			category TEXT NOT NULL,
+			difficulty TEXT NOT NULL,
+			day TEXT NOT NULL,
+			total INTEGER NOT NULL DEFAULT 0,
+			correct INTEGER NOT NULL DEFAULT 0,
+			PRIMARY KEY(user_id, category, difficulty, day)
+		) WITHOUT ROWID;
+
+		CREATE INDEX IF NOT EXISTS idx_progress_daily_user_day ON progress_daily(user_id, day);
+
+		-- 分类/难度统计改读汇总表，attempts 上对应的索引只剩写入开销
+		DROP INDEX IF EXISTS idx_attempts_user_category;
+		DROP INDEX IF EXISTS idx_attempts_user_difficulty;
+
+		-- 与 attempts 的写入处于同一事务，任何写入方都会同步更新汇总
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_rollup_insert
+		AFTER INSERT ON attempts
+		BEGIN
+			INSERT INTO progress_daily(user_id, category, difficulty, day, total, correct)
+			VALUES(
+				NEW.user_id,
+				COALESCE(NEW.category, ''),
+				COALESCE(NEW.difficulty, ''),
+				{day_expr.format(row="NEW")},
+				1,
+				CASE WHEN NEW.is_correct=1 THEN 1 ELSE 0 END
+			)
+			ON CONFLICT(user_id, category, difficulty, day) DO UPDATE SET
+				total = total + 1,
+				correct = correct + excluded.correct;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_rollup_delete
+		AFTER DELETE ON attempts
+		BEGIN
+			UPDATE progress_daily SET
+				total = total - 1,
+				correct = correct - CASE WHEN OLD.is_correct=1 THEN 1 ELSE 0 END
+			WHERE user_id = OLD.user_id
+				AND category = COALESCE(OLD.category, '')
+				AND difficulty = COALESCE(OLD.difficulty, '')
+				AND day = {day_expr.format(row="OLD")};
+		END;
+		"""
+	)
+	rebuild_daily(conn)
+
+
+def _bank_version_triggers(body: str) -> str:
+	return "\n".join(
+		f"""
+		CREATE TRIGGER IF NOT EXISTS trg_{table}_bank_version_{event.lower()}
+		AFTER {event} ON {table}
+		BEGIN
+			{body}
+		END;
+		"""
+		for table in ("questions", "answers")
+		for event in ("INSERT", "UPDATE", "DELETE")
+	)
+
+
+def _drop_bank_version_triggers(conn: sqlite3.Connection) -> None:
+	for table in ("questions", "answers"):
+		for event in ("insert", "update", "delete"):
+			conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_bank_version_{event}")
+
+
+def _v5_bank_version(conn: sqlite3.Connection) -> None:
+	_run_script(
+		conn,
+		f"""
+		CREATE TABLE IF NOT EXISTS meta (
+			key TEXT PRIMARY KEY,
+			value INTEGER NOT NULL DEFAULT 0
+		);
+
+		INSERT OR IGNORE INTO meta(key, value) VALUES('bank_version', 1);
+
+		-- 题库（题目/答案）的任何变更都会递增版本号，内存快照据此失效
+		{_bank_version_triggers("UPDATE meta SET value = value + 1 WHERE key = 'bank_version';")}
+		"""
+	)
+
+
+def _v6_question_list_indexes(conn: sqlite3.Connection) -> None:
+	# 题目列表按 id 游标分页：筛选列在前、id 在后，WHERE ... AND id > ? ORDER BY id 直接走索引范围
+	cols = _columns(conn, "questions")
+	for col in ("difficulty", "is_high_frequency"):
+		if col not in cols:
+			continue  # 极旧的库可能没有该列
+		name = col.replace("is_", "")
+		conn.execute(f"CREATE INDEX IF NOT EXISTS idx_questions_category_{name} ON questions(category_key, {col}, id)")
+		conn.execute(f"CREATE INDEX IF NOT EXISTS idx_questions_{name} ON questions({col}, id)")
+
+
+def _v7_bank_updated_at(conn: sqlite3.Connection) -> None:
+	# 记录题库最后变更时间（epoch 秒），作为 HTTP Last-Modified；与版本号在同一触发器里更新
+	_drop_bank_version_triggers(conn)
+	_run_script(
+		conn,
+		f"""
+		INSERT OR IGNORE INTO meta(key, value) VALUES('bank_updated_at', CAST(strftime('%s', 'now') AS INTEGER));
+
+		{_bank_version_triggers(
+			"UPDATE meta SET value = value + 1 WHERE key = 'bank_version';"
+			" UPDATE meta SET value = CAST(strftime('%s', 'now') AS INTEGER) WHERE key = 'bank_updated_at';"
+		)}
+		"""
+	)
+
+
+def _daily_rollup_triggers() -> str:
+	# 日期边界（rollups.DAY_OFFSET_SECONDS）写死在触发器里，配置变化时由 sync_day_offset 重建
+	return f"""
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_rollup_insert
+		AFTER INSERT ON attempts
+		BEGIN
+			INSERT INTO progress_daily(user_id, category, difficulty, day, total, correct)
+			VALUES(
+				NEW.user_id,
+				COALESCE(NEW.category, ''),
+				COALESCE(NEW.difficulty, ''),
+				{attempt_day_sql("NEW")},
+				1,
+				CASE WHEN NEW.is_correct=1 THEN 1 ELSE 0 END
+			)
+			ON CONFLICT(user_id, category, difficulty, day) DO UPDATE SET
+				total = total + 1,
+				correct = correct + excluded.correct;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_rollup_delete
+		AFTER DELETE ON attempts
+		BEGIN
+			UPDATE progress_daily SET
+				total = total - 1,
+				correct = correct - CASE WHEN OLD.is_correct=1 THEN 1 ELSE 0 END
+			WHERE user_id = OLD.user_id
+				AND category = COALESCE(OLD.category, '')
+				AND difficulty = COALESCE(OLD.difficulty, '')
+				AND day = {attempt_day_sql("OLD")};
+		END;
+	"""
+
+
+def _v8_local_day_rollups_and_counters(conn: sqlite3.Connection) -> None:
+	# progress_daily 改按本地自然日分桶；新增 user_counters（错题数/收藏数），同样由触发器维护
+	for name in ("trg_attempts_rollup_insert", "trg_attempts_rollup_delete"):
+		conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+	_run_script(
+		conn,
+		f"""
+		{_daily_rollup_triggers()}
+
+		CREATE TABLE IF NOT EXISTS user_counters (
+			user_id INTEGER PRIMARY KEY,
+			error_questions INTEGER NOT NULL DEFAULT 0,
+			favorites INTEGER NOT NULL DEFAULT 0
+		);
+
+		-- 第一次答错某题时 +1；删掉该题最后一条错误记录时 -1（判断走 idx_attempts_user_correct_question）
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_error_counter_insert
+		AFTER INSERT ON attempts
+		WHEN NEW.is_correct = 0 AND NOT EXISTS (
+			SELECT 1 FROM attempts
+			WHERE user_id = NEW.user_id AND is_correct = 0 AND question_id = NEW.question_id AND id != NEW.id
+		)
+		BEGIN
+			INSERT INTO user_counters(user_id, error_questions) VALUES(NEW.user_id, 1)
+			ON CONFLICT(user_id) DO UPDATE SET error_questions = error_questions + 1;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_error_counter_delete
+		AFTER DELETE ON attempts
+		WHEN OLD.is_correct = 0 AND NOT EXISTS (
+			SELECT 1 FROM attempts
+			WHERE user_id = OLD.user_id AND is_correct = 0 AND question_id = OLD.question_id
+		)
+		BEGIN
+			UPDATE user_counters SET error_questions = error_questions - 1 WHERE user_id = OLD.user_id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_favorites_counter_insert
+		AFTER INSERT ON favorites
+		BEGIN
+			INSERT INTO user_counters(user_id, favorites) VALUES(NEW.user_id, 1)
+			ON CONFLICT(user_id) DO UPDATE SET favorites = favorites + 1;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_favorites_counter_delete
+		AFTER DELETE ON favorites
+		BEGIN
+			UPDATE user_counters SET favorites = favorites - 1 WHERE user_id = OLD.user_id;
+		END;
+		"""
+	)
+	rebuild_rollups(conn)
+	_record_day_offset(conn)
+
+
+def _v9_exam_sessions(conn: sqlite3.Connection) -> None:
+	# 模拟面试进行中的状态放在服务端（cookie 里只存会话 id）；rev 用于多进程下的乐观并发更新
+	_run_script(
+		conn,
+		"""
+		CREATE TABLE IF NOT EXISTS exam_sessions (
+			id TEXT PRIMARY KEY,
+			user_id INTEGER NOT NULL DEFAULT 1,
+			category TEXT,
+			question_ids TEXT NOT NULL,
+			idx INTEGER NOT NULL DEFAULT 0,
+			answers TEXT NOT NULL DEFAULT '{}',
+			start_ts INTEGER NOT NULL,
+			time_limit INTEGER NOT NULL,
+			expires_ts INTEGER NOT NULL,
+			rev INTEGER NOT NULL DEFAULT 0
+		);
+
+		CREATE INDEX IF NOT EXISTS idx_exam_sessions_expires ON exam_sessions(expires_ts);
+		"""
+	)
+
+
+def _v10_exam_session_mode(conn: sqlite3.Connection) -> None:
+	# step：逐题提交；bundle：开始时下发整卷，交卷时一次性判分
+	if "mode" not in _columns(conn, "exam_sessions"):
+		conn.execute("ALTER TABLE exam_sessions ADD COLUMN mode TEXT NOT NULL DEFAULT 'step'")
+
+
+def _v11_question_content_hash(conn: sqlite3.Connection) -> None:
+	# 题目内容指纹（题干+选项）作为导入的自然键；已存在的完全重复题保持为空，不阻止建唯一索引
+	cols = _columns(conn, "questions")
+	if "content_hash" not in cols:
+		conn.execute("ALTER TABLE questions ADD COLUMN content_hash TEXT")
+	if all(f"option_{k}" in cols for k in "abcd"):  # 极旧的库可能没有选项列
+		backfill_content_hashes(conn)
+	conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_content_hash ON questions(content_hash)")
+
+
+def _v12_question_duplicate_of(conn: sqlite3.Connection) -> None:
+	# 近似重复检测（scripts/find_near_duplicates.py --flag）的标记：指向同簇里保留的题
+	if "duplicate_of" not in _columns(conn, "questions"):
+		conn.execute("ALTER TABLE questions ADD COLUMN duplicate_of INTEGER")
+	conn.execute(
+		"CREATE INDEX IF NOT EXISTS idx_questions_duplicate_of ON questions(duplicate_of) WHERE duplicate_of IS NOT NULL"
+	)
+
+
+_FTS_OPTIONS = "COALESCE({r}.option_a, '') || char(10) || COALESCE({r}.option_b, '') || char(10) || COALESCE({r}.option_c, '') || char(10) || COALESCE({r}.option_d, '')"
+
+
+def _fts5_trigram_available(conn: sqlite3.Connection) -> bool:
+	# trigram 分词需要 SQLite 3.34+ 且编译了 FTS5；在临时库里试建一张表
+	try:
+		conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize = 'trigram')")
+	except sqlite3.OperationalError:
+		return False
+	conn.execute("DROP TABLE temp.fts5_probe")
+	return True
+
+
+def _v13_questions_fts(conn: sqlite3.Connection) -> None:
+	# 全文检索：trigram 分词（中文无需分词词典，任意 3 个字符以上的子串都能命中），rowid 即题目 id；
+	# 题干/选项来自 questions，解析/考点来自 answers，由触发器同步
+	cols = _columns(conn, "questions")
+	for col in ("option_a", "option_b", "option_c", "option_d"):
+		if col not in cols:
+			conn.execute(f"ALTER TABLE questions ADD COLUMN {col} TEXT")  # 极旧的库没有选项列，补成基线结构
+	if not _fts5_trigram_available(conn):
+		# 不建全文表与触发器，检索退回 LIKE（见 app/database/search.py 的 has_fts）；换用新版 SQLite 后不会自动补建
+		return
+	new_options = _FTS_OPTIONS.format(r="NEW")
+	_run_script(
+		conn,
+		f"""
+		CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+			title, options, analysis, knowledge_point,
+			tokenize = 'trigram'
+		);
+
+		DELETE FROM questions_fts;
+		INSERT INTO questions_fts(rowid, title, options, analysis, knowledge_point)
+		SELECT q.id, q.title, {_FTS_OPTIONS.format(r="q")}, a.analysis, a.knowledge_point
+		FROM questions q
+		LEFT JOIN answers a ON a.question_id = q.id;
+
+		CREATE TRIGGER IF NOT EXISTS trg_questions_fts_insert
+		AFTER INSERT ON questions
+		BEGIN
+			INSERT INTO questions_fts(rowid, title, options, analysis, knowledge_point)
+			SELECT NEW.id, NEW.title, {new_options}, a.analysis, a.knowledge_point
+			FROM (SELECT 1) LEFT JOIN answers a ON a.question_id = NEW.id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_questions_fts_update
+		AFTER UPDATE OF title, option_a, option_b, option_c, option_d ON questions
+		BEGIN
+			UPDATE questions_fts SET title = NEW.title, options = {new_options} WHERE rowid = NEW.id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_questions_fts_delete
+		AFTER DELETE ON questions
+		BEGIN
+			DELETE FROM questions_fts WHERE rowid = OLD.id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_answers_fts_insert
+		AFTER INSERT ON answers
+		BEGIN
+			UPDATE questions_fts SET analysis = NEW.analysis, knowledge_point = NEW.knowledge_point
+			WHERE rowid = NEW.question_id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_answers_fts_update
+		AFTER UPDATE OF analysis, knowledge_point ON answers
+		BEGIN
+			UPDATE questions_fts SET analysis = NEW.analysis, knowledge_point = NEW.knowledge_point
+			WHERE rowid = NEW.question_id;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_answers_fts_delete
+		AFTER DELETE ON answers
+		BEGIN
+			UPDATE questions_fts SET analysis = NULL, knowledge_point = NULL WHERE rowid = OLD.question_id;
+		END;
+		"""
+	)
+
+
+def _v14_exams(conn: sqlite3.Connection) -> None:
+	# 模拟面试记录：exam_sessions 只保存进行中的状态、交卷即删，这里保留每一场的题目与成绩；
+	# 答题记录通过 attempts.exam_id 关联到所属的一场（普通练习为空）
+	_run_script(
+		conn,
+		"""
+		CREATE TABLE IF NOT EXISTS exams (
+			id INTEGER PRIMARY KEY AUTOINCREMENT,
+			user_id INTEGER NOT NULL DEFAULT 1,
+			category TEXT,
+			mode TEXT NOT NULL DEFAULT 'step',
+			question_ids TEXT NOT NULL DEFAULT '[]',
+			time_limit INTEGER,
+			started_ts INTEGER NOT NULL,
+			finished_ts INTEGER,
+			answered INTEGER NOT NULL DEFAULT 0,
+			correct INTEGER NOT NULL DEFAULT 0,
+			timed_out INTEGER NOT NULL DEFAULT 0
+		);
+
+		-- 首页“模拟面试次数”：按用户数已交卷的场次
+		CREATE INDEX IF NOT EXISTS idx_exams_user_finished ON exams(user_id, finished_ts);
+		"""
+	)
+	if "exam_id" not in _columns(conn, "attempts"):
+		conn.execute("ALTER TABLE attempts ADD COLUMN exam_id INTEGER")
+	conn.execute("CREATE INDEX IF NOT EXISTS idx_attempts_exam ON attempts(exam_id) WHERE exam_id IS NOT NULL")
+	if "record_id" not in _columns(conn, "exam_sessions"):
+		conn.execute("ALTER TABLE exam_sessions ADD COLUMN record_id INTEGER")
+
+
+def _bump_rev(user: str) -> str:
+	return (
+		f"INSERT INTO user_counters(user_id, rev) VALUES({user}, 1) "
+		"ON CONFLICT(user_id) DO UPDATE SET rev = rev + 1;"
+	)
+
+
+def _v15_user_counters_rev(conn: sqlite3.Connection) -> None:
+	# 每个用户的进度版本戳：答题记录/收藏的任何变化都 +1，进程内的进度缓存（app/core/user_progress.py）
+	# 读取前只比对这一行，不一致再从汇总表重建
+	if "rev" not in _columns(conn, "user_counters"):
+		conn.execute("ALTER TABLE user_counters ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+	body = []
+	for table in ("attempts", "favorites"):
+		body.append(
+			f"""
+			CREATE TRIGGER IF NOT EXISTS trg_{table}_rev_insert
+			AFTER INSERT ON {table}
+			BEGIN
+				{_bump_rev("NEW.user_id")}
+			END;
+
+			CREATE TRIGGER IF NOT EXISTS trg_{table}_rev_update
+			AFTER UPDATE ON {table}
+			BEGIN
+				{_bump_rev("OLD.user_id")}
+				{_bump_rev("NEW.user_id")}
+			END;
+
+			CREATE TRIGGER IF NOT EXISTS trg_{table}_rev_delete
+			AFTER DELETE ON {table}
+			BEGIN
+				{_bump_rev("OLD.user_id")}
+			END;
+			"""
+		)
+	_run_script(conn, "".join(body))
+
+
+def _refresh_question_state(row: str) -> str:
+	# 删除/改动答题记录后按 attempts 重算该 用户 × 题目 一行（没有记录了就不再插入）
+	pair = f"user_id = {row}.user_id AND question_id = {row}.question_id"
+	return f"""
+				DELETE FROM user_question_state WHERE {pair};
+				INSERT INTO user_question_state({QUESTION_STATE_COLUMNS})
+				{question_state_sql("WHERE " + pair)};"""
+
+
+def _v16_user_question_state(conn: sqlite3.Connection) -> None:
+	# 每个用户 × 题目的答题状态，答题时由触发器 upsert；错题本 = 最近一次答错的题（答对后移出），
+	# 已掌握 = 答错过、最近一次答对的题，两者各有部分索引按最近答题时间排序；
+	# 错题数计数器改由状态表维护，口径随之变为错题本里的题目数
+	_run_script(
+		conn,
+		f"""
+		DROP TRIGGER IF EXISTS trg_attempts_error_counter_insert;
+		DROP TRIGGER IF EXISTS trg_attempts_error_counter_delete;
+
+		CREATE TABLE IF NOT EXISTS user_question_state (
+			user_id INTEGER NOT NULL,
+			question_id INTEGER NOT NULL,
+			attempts INTEGER NOT NULL DEFAULT 0,
+			wrong INTEGER NOT NULL DEFAULT 0,
+			last_correct INTEGER NOT NULL DEFAULT 0,
+			last_ts INTEGER,
+			streak INTEGER NOT NULL DEFAULT 0,
+			PRIMARY KEY(user_id, question_id)
+		) WITHOUT ROWID;
+
+		CREATE INDEX IF NOT EXISTS idx_question_state_errors
+			ON user_question_state(user_id, last_ts) WHERE last_correct = 0;
+		CREATE INDEX IF NOT EXISTS idx_question_state_mastered
+			ON user_question_state(user_id, last_ts) WHERE last_correct = 1 AND wrong > 0;
+
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_question_state_insert
+		AFTER INSERT ON attempts
+		BEGIN
+			INSERT INTO user_question_state({QUESTION_STATE_COLUMNS})
+			VALUES(
+				NEW.user_id,
+				NEW.question_id,
+				1,
+				CASE WHEN NEW.is_correct=1 THEN 0 ELSE 1 END,
+				CASE WHEN NEW.is_correct=1 THEN 1 ELSE 0 END,
+				COALESCE(NEW.created_ts, CAST(strftime('%s', 'now') AS INTEGER)),
+				CASE WHEN NEW.is_correct=1 THEN 1 ELSE 0 END
+			)
+			ON CONFLICT(user_id, question_id) DO UPDATE SET
+				attempts = attempts + 1,
+				wrong = wrong + excluded.wrong,
+				last_correct = excluded.last_correct,
+				last_ts = MAX(COALESCE(last_ts, 0), excluded.last_ts),
+				streak = CASE WHEN excluded.last_correct=1 THEN streak + 1 ELSE 0 END;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_question_state_delete
+		AFTER DELETE ON attempts
+		BEGIN{_refresh_question_state("OLD")}
+		END;
+
+		-- created_ts 的兜底补写不影响状态，不在监听列里
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_question_state_update
+		AFTER UPDATE OF user_id, question_id, is_correct ON attempts
+		BEGIN{_refresh_question_state("OLD")}{_refresh_question_state("NEW")}
+		END;
+
+		-- 错题数：进出错题本时 ±1
+		CREATE TRIGGER IF NOT EXISTS trg_question_state_counter_insert
+		AFTER INSERT ON user_question_state
+		WHEN NEW.last_correct = 0
+		BEGIN
+			INSERT INTO user_counters(user_id, error_questions) VALUES(NEW.user_id, 1)
+			ON CONFLICT(user_id) DO UPDATE SET error_questions = error_questions + 1;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_question_state_counter_update
+		AFTER UPDATE OF last_correct ON user_question_state
+		WHEN OLD.last_correct != NEW.last_correct
+		BEGIN
+			INSERT INTO user_counters(user_id, error_questions) VALUES(NEW.user_id, 0)
+			ON CONFLICT(user_id) DO UPDATE SET
+				error_questions = error_questions + CASE WHEN NEW.last_correct = 0 THEN 1 ELSE -1 END;
+		END;
+
+		CREATE TRIGGER IF NOT EXISTS trg_question_state_counter_delete
+		AFTER DELETE ON user_question_state
+		WHEN OLD.last_correct = 0
+		BEGIN
+			UPDATE user_counters SET error_questions = error_questions - 1 WHERE user_id = OLD.user_id;
+		END;
+		"""
+	)
+	rebuild_question_state(conn)
+	rebuild_counters(conn)
+
+
+def _v17_review_schedule(conn: sqlite3.Connection) -> None:
+	# 间隔复习排期（见 app/database/review_schedule.py）：答错的题、收藏的题进入复习队列，
+	# 每次答题在同一事务里重算下次复习时间；到期题目按 (user_id, due_at) 范围扫描
+	now = "CAST(strftime('%s', 'now') AS INTEGER)"
+	attempt_ts = f"COALESCE(NEW.created_ts, {now})"
+	_run_script(
+		conn,
+		f"""
+		CREATE TABLE IF NOT EXISTS review_schedule (
+			user_id INTEGER NOT NULL,
+			question_id INTEGER NOT NULL,
+			reps INTEGER NOT NULL DEFAULT 0,
+			ease REAL NOT NULL DEFAULT {INITIAL_EASE},
+			interval INTEGER NOT NULL DEFAULT 0,
+			due_at INTEGER NOT NULL,
+			PRIMARY KEY(user_id, question_id)
+		) WITHOUT ROWID;
+
+		CREATE INDEX IF NOT EXISTS idx_review_schedule_due ON review_schedule(user_id, due_at);
+
+		-- 答错：进入（或重新进入）复习队列，短间隔后重来
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_review_wrong
+		AFTER INSERT ON attempts
+		WHEN NEW.is_correct != 1
+		BEGIN
+			INSERT INTO review_schedule({REVIEW_COLUMNS})
+			VALUES(
+				NEW.user_id, NEW.question_id, 0, {INITIAL_EASE - EASE_PENALTY},
+				{RELEARN_SECONDS}, {attempt_ts} + {RELEARN_SECONDS}
+			)
+			ON CONFLICT(user_id, question_id) DO UPDATE SET
+				reps = 0,
+				ease = MAX({MIN_EASE}, ease - {EASE_PENALTY}),
+				interval = {RELEARN_SECONDS},
+				due_at = excluded.due_at;
+		END;
+
+		-- 答对：只推后已在队列里的题
+		CREATE TRIGGER IF NOT EXISTS trg_attempts_review_correct
+		AFTER INSERT ON attempts
+		WHEN NEW.is_correct = 1
+		BEGIN
+			UPDATE review_schedule SET
+				reps = reps + 1,
+				interval = {next_interval_sql()},
+				due_at = {attempt_ts} + {next_interval_sql()}
+			WHERE user_id = NEW.user_id AND question_id = NEW.question_id;
+		END;
+
+		-- 收藏：立即到期；已在队列里的题保持原排期
+		CREATE TRIGGER IF NOT EXISTS trg_favorites_review_insert
+		AFTER INSERT ON favorites
+		BEGIN
+			INSERT OR IGNORE INTO review_schedule({REVIEW_COLUMNS})
+			VALUES(
+				NEW.user_id, NEW.question_id, 0, {INITIAL_EASE}, 0,
+				COALESCE(CAST(strftime('%s', NEW.collect_time) AS INTEGER), {now})
+			);
+		END;
+
+		-- 取消收藏：没答错过的题移出队列
+		CREATE TRIGGER IF NOT EXISTS trg_favorites_review_delete
+		AFTER DELETE ON favorites
+		WHEN NOT EXISTS (
+			SELECT 1 FROM user_question_state
+			WHERE user_id = OLD.user_id AND question_id = OLD.question_id AND wrong > 0
+		)
+		BEGIN
+			DELETE FROM review_schedule WHERE user_id = OLD.user_id AND question_id = OLD.question_id;
+		END;
+		"""
+	)
+	rebuild_review_schedule(conn)
+
+
+def _v18_review_schedule_cleanup(conn: sqlite3.Connection) -> None:
+	# 删除题目（合并重复题、手工删除）时一并移出复习队列，否则到期查询会一直卡在不存在的题上
+	_run_script(
+		conn,
+		"""
+		CREATE TRIGGER IF NOT EXISTS trg_questions_review_delete
+		AFTER DELETE ON questions
+		BEGIN
+			DELETE FROM review_schedule WHERE question_id = OLD.id;
+		END;
+
+		DELETE FROM review_schedule WHERE NOT EXISTS (SELECT 1 FROM questions q WHERE q.id = review_schedule.question_id);
+		"""
+	)
+
+
+MIGRATIONS: List[Migration] = [
+	(1, "baseline", _v1_baseline),
+	(2, "attempt_indexes", _v2_attempt_indexes),
+	(3, "category_key", _v3_category_key),
+	(4, "progress_rollups", _v4_progress_rollups),
+	(5, "bank_version", _v5_bank_version),
+	(6, "question_list_indexes", _v6_question_list_indexes),
+	(7, "bank_updated_at", _v7_bank_updated_at),
+	(8, "local_day_rollups_and_counters", _v8_local_day_rollups_and_counters),
+	(9, "exam_sessions", _v9_exam_sessions),
+	(10, "exam_session_mode", _v10_exam_session_mode),
+	(11, "question_content_hash", _v11_question_content_hash),
+	(12, "question_duplicate_of", _v12_question_duplicate_of),
+	(13, "questions_fts", _v13_questions_fts),
+	(14, "exams", _v14_exams),
+	(15, "user_counters_rev", _v15_user_counters_rev),
+	(16, "user_question_state", _v16_user_question_state),
+	(17, "review_schedule", _v17_review_schedule),
+	(18, "review_schedule_cleanup", _v18_review_schedule_cleanup),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+	return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+	"""把数据库升级到 LATEST_VERSION，返回本次执行的迁移步数。"""
+	if conn.in_transaction:
+		conn.commit()
+
+	applied = 0
+	for version, _name, step in MIGRATIONS:
+		if current_version(conn) >= version:
+			continue
+		# BEGIN IMMEDIATE 先拿写锁再复查版本，多进程同时启动时每步只会执行一次
+		conn.execute("BEGIN IMMEDIATE")
+		try:
+			if current_version(conn) >= version:
+				conn.rollback()
+				continue
+			step(conn)
+			conn.execute(f"PRAGMA user_version = {int(version)}")
+			conn.commit()
+		except Exception:
+			conn.rollback()
+			raise
+		applied += 1
+	sync_day_offset(conn)
+	return applied
+
+
+# 没有 day_offset 记录的库：触发器是按北京时间（+8 小时）建的
+_LEGACY_DAY_OFFSET = 8 * 3600
+
+
+def _stored_day_offset(conn: sqlite3.Connection) -> int:
+	row = conn.execute("SELECT value FROM meta WHERE key = 'day_offset'").fetchone()
+	return int(row[0]) if row else _LEGACY_DAY_OFFSET
+
+
+def _record_day_offset(conn: sqlite3.Connection) -> None:
+	conn.execute(
+		"INSERT INTO meta(key, value) VALUES('day_offset', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+		(rollups.DAY_OFFSET_SECONDS,),
+	)
+
+
+def sync_day_offset(conn: sqlite3.Connection) -> bool:
+	"""配置的日期偏移与库里建触发器时用的（meta.day_offset）不同时，重建 progress_daily 的触发器并重算，返回是否重建。"""
+	if current_version(conn) < 8 or _stored_day_offset(conn) == rollups.DAY_OFFSET_SECONDS:
+		return False
+	conn.execute("BEGIN IMMEDIATE")
+	try:
+		if _stored_day_offset(conn) == rollups.DAY_OFFSET_SECONDS:
+			conn.rollback()
+			return False
+		for name in ("trg_attempts_rollup_insert", "trg_attempts_rollup_delete"):
+			conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+		_run_script(conn, _daily_rollup_triggers())
+		rebuild_daily(conn)
+		if "rev" in _columns(conn, "user_counters"):
+			conn.execute("UPDATE user_counters SET rev = rev + 1")  # 进程内的进度缓存随之重建
+		_record_day_offset(conn)
+		conn.commit()
+	except Exception:
+		conn.rollback()
+		raise
+	return True
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+间隔复习排期（SM-2 的简化版，答对/答错两档）
+- review_schedule：用户 × 题目一行，复习队列里的题才有：答错过的题（错题本）与收藏的题
+- 答错：连续答对次数清零、易度 -0.2（不低于 1.3），10 分钟后再复习
+- 答对：已在队列里的题按 1 天、6 天、之后“上次间隔 × 易度”推后
+- 排期由 attempts / favorites 上的触发器在答题/收藏的同一事务里增量更新（迁移 v17），
+  取到期题目只在 (user_id, due_at) 索引上做范围扫描
+- rebuild_review_schedule() 按答题记录与收藏时间重放出排期（同一秒内的收藏与答题先算收藏）
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Optional, Tuple
+
+RELEARN_SECONDS = 600
+FIRST_INTERVAL = 86400
+SECOND_INTERVAL = 6 * 86400
+INITIAL_EASE = 2.5
+EASE_PENALTY = 0.2
+MIN_EASE = 1.3
+
+REVIEW_COLUMNS = "user_id, question_id, reps, ease, interval, due_at"
+
+# (reps, ease, interval, due_at)
+Schedule = Tuple[int, float, int, int]
+
+
+def new_schedule(ts: int) -> Schedule:
+	"""刚收藏的题：立即到期。"""
+	return 0, INITIAL_EASE, 0, int(ts)
+
+
+def next_interval(reps: int, ease: float, interval: int) -> int:
+	if reps == 0:
+		return FIRST_INTERVAL
+	if reps == 1:
+		return SECOND_INTERVAL
+	return int(interval * ease + 0.5)
+
+
+def review(schedule: Optional[Schedule], correct: bool, ts: int) -> Optional[Schedule]:
+	"""答一次题后的排期；不在队列里的题答对后仍不在队列里（返回 None）。"""
+	ts = int(ts)
+	if not correct:
+		ease = INITIAL_EASE if schedule is None else schedule[1]
+		return 0, max(MIN_EASE, ease - EASE_PENALTY), RELEARN_SECONDS, ts + RELEARN_SECONDS
+	if schedule is None:
+		return None
+	reps, ease, interval, _due = schedule
+	interval = next_interval(reps, ease, interval)
+	return reps + 1, ease, interval, ts + interval
+
+
+def next_interval_sql() -> str:
+	"""与 next_interval 一致的 SQL 片段（UPDATE 里引用的是更新前的列值）。"""
+	return (
+		f"CASE WHEN reps = 0 THEN {FIRST_INTERVAL} WHEN reps = 1 THEN {SECOND_INTERVAL} "
+		"ELSE CAST(ROUND(interval * ease) AS INTEGER) END"
+	)
+
+
+def rebuild_review_schedule(conn: sqlite3.Connection, user_id: Optional[int] = None) -> int:
+	"""从 attempts 与 favorites 重放出 review_schedule（调用方负责事务），返回写入的行数。"""
+	and_user, params = ("AND user_id = ?", (user_id,)) if user_id is not None else ("", ())
+	conn.execute(f"DELETE FROM review_schedule WHERE 1=1 {and_user}", params)
+
+	favorites: Dict[Tuple[int, int], int] = {
+		(int(r[0]), int(r[1])): int(r[2])
+		for r in conn.execute(
+			f"""
+			SELECT user_id, question_id, COALESCE(CAST(strftime('%s', collect_time) AS INTEGER), 0)
+			FROM favorites WHERE 1=1 {and_user}
+			""",
+			params,
+		)
+	}
+	schedules: Dict[Tuple[int, int], Optional[Schedule]] = {}
+	for u, q, is_correct, ts in conn.execute(
+		f"""
+		SELECT user_id, question_id, is_correct, COALESCE(created_ts, CAST(strftime('%s', created_at) AS INTEGER), 0)
+		FROM attempts WHERE 1=1 {and_user}
+		ORDER BY id
+		""",
+		params,
+	):
+		key = (int(u), int(q))
+		current = schedules.get(key)
+		fav_ts = favorites.get(key)
+		if current is None and fav_ts is not None and fav_ts <= ts:
+			current = new_schedule(fav_ts)
+		schedules[key] = review(current, is_correct == 1, int(ts))
+	for key, fav_ts in favorites.items():
+		if schedules.get(key) is None:
+			schedules[key] = new_schedule(fav_ts)
+
+	rows = [(u, q, *s) for (u, q), s in schedules.items() if s is not None]
+	conn.executemany(f"INSERT INTO review_schedule({REVIEW_COLUMNS}) VALUES(?,?,?,?,?,?)", rows)
+	return len(rows)
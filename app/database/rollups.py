@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+学习进度汇总
+- progress_daily：用户 × 分类 × 难度 × 日期（本地自然日，时区偏移见 DAY_OFFSET_SECONDS），记录答题数与答对数
+- user_counters：每个用户一行，错题本里的题目数、收藏数，以及每次答题/收藏变化都会 +1 的 rev
+- user_question_state（v16 起）：用户 × 题目一行，答题次数、答错次数、最近一次对错与时间、末尾连续答对次数；
+  最近一次答错的题即在错题本里，user_counters.error_questions 由它上面的触发器维护
+- 以上都由 attempts / favorites 上的触发器在同一事务内增量维护，进度页/首页/错题本只读这些小表
+- review_schedule（v17 起）的间隔复习排期也随 rebuild_rollups() 从答题记录重放，见 app/database/review_schedule.py
+- rebuild_rollups() 从原始数据全量重算；check_rollups() 对比两者找出不一致
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from app.database.review_schedule import rebuild_review_schedule
+
+
+def _day_offset_seconds() -> int:
+	raw = os.environ.get("PROGRESS_DAY_OFFSET_HOURS", "").strip()
+	if raw:
+		return int(round(float(raw) * 3600))
+	return int(time.localtime().tm_gmtoff)
+
+
+# 按本地自然日分桶：日期边界是本地 0 点而不是 UTC 0 点。偏移（秒）取 PROGRESS_DAY_OFFSET_HOURS（如 8 即北京时间），
+# 未设置时为服务器时区当前的 UTC 偏移；progress_daily 的触发器里写的是迁移时的值，启动时若与配置不同会重建
+# （见 migrations.sync_day_offset）
+DAY_OFFSET_SECONDS = _day_offset_seconds()
+
+
+def day_sql(ts_expr: str) -> str:
+	"""epoch 秒表达式 -> 本地日期字符串（YYYY-MM-DD）的 SQL 片段。"""
+	return f"date({ts_expr}, 'unixepoch', '{DAY_OFFSET_SECONDS:+d} seconds')"
+
+
+def attempt_day_sql(row: str = "") -> str:
+	prefix = f"{row}." if row else ""
+	return day_sql(f"COALESCE({prefix}created_ts, CAST(strftime('%s', {prefix}created_at) AS INTEGER))")
+
+
+def local_day(ts: float) -> str:
+	"""与 day_sql 一致的 Python 版本。"""
+	return time.strftime("%Y-%m-%d", time.gmtime(ts + DAY_OFFSET_SECONDS))
+
+
+def _aggregate_sql(where: str = "") -> str:
+	"""attempts 原始数据按汇总粒度聚合（重算与校验共用）。"""
+	return f"""
+	SELECT
+		user_id,
+		COALESCE(category, '') AS category,
+		COALESCE(difficulty, '') AS difficulty,
+		{attempt_day_sql()} AS day,
+		COUNT(1) AS total,
+		SUM(CASE WHEN is_correct=1 THEN 1 ELSE 0 END) AS correct
+	FROM attempts
+	{where}
+	GROUP BY 1, 2, 3, 4
+	"""
+
+# 每个用户 × 题目的答题状态（按 attempts.id 先后）：最近一次是否答对、最后一次答错之后连续答对的次数
+QUESTION_STATE_COLUMNS = "user_id, question_id, attempts, wrong, last_correct, last_ts, streak"
+
+
+def question_state_sql(where: str = "") -> str:
+	"""attempts 聚合成 user_question_state 行的 SELECT（重算、校验与迁移里的触发器共用）。"""
+	return f"""
+	SELECT g.user_id, g.question_id, g.attempts, g.wrong,
+		CASE WHEN g.last_wrong_id = g.last_id THEN 0 ELSE 1 END,
+		g.last_ts,
+		(
+			SELECT COUNT(1) FROM attempts s
+			WHERE s.user_id = g.user_id AND s.is_correct = 1 AND s.question_id = g.question_id AND s.id > g.last_wrong_id
+		)
+	FROM (
+		SELECT user_id, question_id, COUNT(1) AS attempts,
+			SUM(CASE WHEN is_correct=1 THEN 0 ELSE 1 END) AS wrong,
+			MAX(id) AS last_id,
+			MAX(CASE WHEN is_correct=1 THEN 0 ELSE id END) AS last_wrong_id,
+			MAX(COALESCE(created_ts, CAST(strftime('%s', created_at) AS INTEGER))) AS last_ts
+		FROM attempts
+		{where}
+		GROUP BY user_id, question_id
+	) g
+	"""
+
+
+# 每个用户的计数器实际值；错题数在 v16 之前是“答错过的不同题目数”，之后是错题本（最近一次答错）的题目数
+_COUNTERS_SQL = """
+	SELECT user_id, SUM(error_questions) AS error_questions, SUM(favorites) AS favorites
+	FROM (
+		{errors}
+		UNION ALL
+		SELECT user_id, 0, COUNT(1) FROM favorites WHERE 1=1 {and_user} GROUP BY user_id
+	)
+	GROUP BY user_id
+"""
+_ERRORS_FROM_ATTEMPTS = """
+		SELECT user_id, COUNT(DISTINCT question_id) AS error_questions, 0 AS favorites
+		FROM attempts WHERE is_correct=0 {and_user} GROUP BY user_id
+"""
+_ERRORS_FROM_STATE = """
+		SELECT user_id, COUNT(1) AS error_questions, 0 AS favorites
+		FROM user_question_state WHERE last_correct=0 {and_user} GROUP BY user_id
+"""
+
+
+def has_question_state(conn: sqlite3.Connection) -> bool:
+	return conn.execute("PRAGMA table_info(user_question_state)").fetchone() is not None
+
+
+def _counters_sql(conn: sqlite3.Connection, and_user: str) -> str:
+	errors = _ERRORS_FROM_STATE if has_question_state(conn) else _ERRORS_FROM_ATTEMPTS
+	return _COUNTERS_SQL.format(errors=errors.format(and_user=and_user), and_user=and_user)
+
+
+def rebuild_rollups(conn: sqlite3.Connection, user_id: Optional[int] = None) -> int:
+	"""从 attempts/favorites 重算汇总表、答题状态与计数器（调用方负责事务），返回写入的 progress_daily 行数。"""
+	rows = rebuild_daily(conn, user_id=user_id)
+	if has_question_state(conn):
+		rebuild_question_state(conn, user_id=user_id)
+	if conn.execute("PRAGMA table_info(review_schedule)").fetchone() is not None:
+		rebuild_review_schedule(conn, user_id=user_id)
+	rebuild_counters(conn, user_id=user_id)
+	return rows
+
+
+def rebuild_daily(conn: sqlite3.Connection, user_id: Optional[int] = None) -> int:
+	if user_id is None:
+		conn.execute("DELETE FROM progress_daily")
+		where, params = "", ()
+	else:
+		conn.execute("DELETE FROM progress_daily WHERE user_id=?", (user_id,))
+		where, params = "WHERE user_id=?", (user_id,)
+	cur = conn.execute(
+		"INSERT INTO progress_daily(user_id, category, difficulty, day, total, correct) "
+		+ _aggregate_sql(where),
+		params,
+	)
+	return cur.rowcount
+
+
+def rebuild_question_state(conn: sqlite3.Connection, user_id: Optional[int] = None) -> int:
+	if user_id is None:
+		conn.execute("DELETE FROM user_question_state")
+		where, params = "", ()
+	else:
+		conn.execute("DELETE FROM user_question_state WHERE user_id=?", (user_id,))
+		where, params = "WHERE user_id=?", (user_id,)
+	cur = conn.execute(
+		f"INSERT INTO user_question_state({QUESTION_STATE_COLUMNS}) " + question_state_sql(where), params
+	)
+	return cur.rowcount
+
+
+def rebuild_counters(conn: sqlite3.Connection, user_id: Optional[int] = None) -> None:
+	# 行保留、只改计数：rev（v15 起，进程内进度缓存的版本戳）顺带 +1，各进程的缓存据此重建
+	has_rev = any(r[1] == "rev" for r in conn.execute("PRAGMA table_info(user_counters)"))
+	reset = "error_questions = 0, favorites = 0" + (", rev = rev + 1" if has_rev else "")
+	if user_id is None:
+		conn.execute(f"UPDATE user_counters SET {reset}")
+		and_user, params = "", ()
+	else:
+		conn.execute(f"UPDATE user_counters SET {reset} WHERE user_id=?", (user_id,))
+		and_user, params = "AND user_id=?", (user_id, user_id)
+	conn.execute(
+		"INSERT INTO user_counters(user_id, error_questions, favorites) "
+		+ _counters_sql(conn, and_user)
+		+ " ON CONFLICT(user_id) DO UPDATE SET error_questions = excluded.error_questions, favorites = excluded.favorites",
+		params,
+	)
+
+
+def check_rollups(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+	"""返回汇总表与 attempts 实际聚合结果不一致的行（为空表示一致）。"""
+	rows = conn.execute(
+		f"""
+		WITH actual AS ({_aggregate_sql()}),
+		stored AS (
+			SELECT user_id, category, difficulty, day, total, correct
+			FROM progress_daily
+			WHERE total != 0 OR correct != 0
+		)
+		SELECT 'missing' AS problem, * FROM (SELECT * FROM actual EXCEPT SELECT * FROM stored)
+		UNION ALL
+		SELECT 'unexpected' AS problem, * FROM (SELECT * FROM stored EXCEPT SELECT * FROM actual)
+		ORDER BY user_id, day, category, difficulty
+		"""
+	).fetchall()
+	problems = [dict(zip(("problem", "user_id", "category", "difficulty", "day", "total", "correct"), r)) for r in rows]
+
+	# 计数器：与实际值不同的用户（problem="counter"）
+	counter_rows = conn.execute(
+		f"""
+		WITH actual AS ({_counters_sql(conn, "")})
+		SELECT user_id, SUM(err_actual), SUM(err_stored), SUM(fav_actual), SUM(fav_stored)
+		FROM (
+			SELECT user_id, error_questions AS err_actual, 0 AS err_stored, favorites AS fav_actual, 0 AS fav_stored
+			FROM actual
+			UNION ALL
+			SELECT user_id, 0, error_questions, 0, favorites FROM user_counters
+		)
+		GROUP BY user_id
+		HAVING SUM(err_actual) != SUM(err_stored) OR SUM(fav_actual) != SUM(fav_stored)
+		ORDER BY 1
+		"""
+	).fetchall()
+	for user, err_actual, err_stored, fav_actual, fav_stored in counter_rows:
+		problems.append(
+			{
+				"problem": "counter",
+				"user_id": user,
+				"error_questions": (err_stored, err_actual),
+				"favorites": (fav_stored, fav_actual),
+			}
+		)
+
+	# 答题状态：与 attempts 实际聚合不同的 用户 × 题目（problem="state"）
+	if has_question_state(conn):
+		state_rows = conn.execute(
+			f"""
+			WITH actual AS ({question_state_sql()}),
+			stored AS (SELECT {QUESTION_STATE_COLUMNS} FROM user_question_state)
+			SELECT DISTINCT user_id, question_id FROM (
+				SELECT * FROM (SELECT * FROM actual EXCEPT SELECT * FROM stored)
+				UNION ALL
+				SELECT * FROM (SELECT * FROM stored EXCEPT SELECT * FROM actual)
+			)
+			ORDER BY 1, 2
+			"""
+		).fetchall()
+		problems.extend({"problem": "state", "user_id": u, "question_id": q} for u, q in state_rows)
+	return problems
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+模拟面试抽题
+- 在题库快照上按 (分类键, 难度) 建 id 索引，每个桶再分成高频/普通两组；题库版本变化时随快照重建
+- 抽 k 道题只做 O(k) 次随机选择：多个桶看作一个虚拟拼接的序列，在下标区间上无放回抽样，
+  不再每次把全部 id 读出来再 random.sample
+- 支持按难度分层（如 Easy 40% / Medium 40% / Hard 20%）与高频题加权（每道高频题的权重是普通题的 w 倍）
+"""
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.database.bank import BankSnapshot, bank_cache
+
+DEFAULT_DIFFICULTY = "Easy"  # 与 QuestionRecord.to_payload 的缺省值一致
+
+Bucket = Tuple[Tuple[int, ...], Tuple[int, ...]]  # (高频 id, 普通 id)
+
+
+class _Pool:
+	"""若干个 id 元组的虚拟拼接：按全局下标取值，不复制。"""
+
+	def __init__(self, parts: Iterable[Sequence[int]]) -> None:
+		self.parts = [p for p in parts if p]
+		self.offsets: List[int] = []
+		total = 0
+		for p in self.parts:
+			self.offsets.append(total)
+			total += len(p)
+		self.size = total
+
+	def take(self, k: int, rng: random.Random) -> List[int]:
+		# random.sample(range(n), k) 对大 n 走集合去重分支，代价 O(k)
+		out = []
+		for i in rng.sample(range(self.size), min(k, self.size)):
+			j = bisect.bisect_right(self.offsets, i) - 1
+			out.append(self.parts[j][i - self.offsets[j]])
+		return out
+
+
+class SamplingIndex:
+	def __init__(self, snapshot: BankSnapshot) -> None:
+		self.version = snapshot.version
+		groups: Dict[Tuple[str, str], Tuple[List[int], List[int]]] = {}
+		for q in snapshot.questions.values():
+			key = (q.category_key, str(q.difficulty or DEFAULT_DIFFICULTY))
+			hf, normal = groups.setdefault(key, ([], []))
+			(hf if q.is_high_frequency else normal).append(q.id)
+		self.buckets: Dict[Tuple[str, str], Bucket] = {k: (tuple(hf), tuple(n)) for k, (hf, n) in groups.items()}
+
+	def _buckets(self, category_keys: Sequence[str], difficulty: Optional[str] = None) -> List[Bucket]:
+		return [
+			b for (ck, diff), b in self.buckets.items()
+			if ck in category_keys and (difficulty is None or diff == difficulty)
+		]
+
+	def count(self, category_keys: Sequence[str], difficulty: Optional[str] = None) -> int:
+		return sum(len(hf) + len(n) for hf, n in self._buckets(category_keys, difficulty))
+
+	def _sample_stratum(
+		self, buckets: List[Bucket], k: int, hf_weight: float, rng: random.Random
+	) -> List[int]:
+		hf = _Pool(b[0] for b in buckets)
+		normal = _Pool(b[1] for b in buckets)
+		k = min(k, hf.size + normal.size)
+		# 逐次加权无放回：每一次抽中高频组的概率 = w*剩余高频数 / (w*剩余高频数 + 剩余普通数)
+		n_hf, h_left, n_left = 0, hf.size, normal.size
+		for _ in range(k):
+			w = hf_weight * h_left
+			if n_left == 0 or (h_left and rng.random() * (w + n_left) < w):
+				n_hf += 1
+				h_left -= 1
+			else:
+				n_left -= 1
+		return hf.take(n_hf, rng) + normal.take(k - n_hf, rng)
+
+	def sample(
+		self,
+		k: int,
+		category_keys: Sequence[str],
+		difficulty_mix: Optional[Mapping[str, float]] = None,
+		hf_weight: float = 1.0,
+		rng: Optional[random.Random] = None,
+	) -> List[int]:
+		"""抽 k 道不重复的题。difficulty_mix 给出各难度占比；某难度题数不够时差额由其他难度补足。"""
+		rng = rng or random
+		mix = {d: float(w) for d, w in (difficulty_mix or {}).items() if float(w) > 0}
+		if not mix:
+			picked = self._sample_stratum(self._buckets(category_keys), k, hf_weight, rng)
+			rng.shuffle(picked)
+			return picked
+
+		total_w = sum(mix.values())
+		available = {d: self.count(category_keys, d) for d in mix}
+		k = min(k, sum(available.values()))
+		# 最大余数法分配名额，再把缺额依次挪给还有余量的难度
+		exact = {d: k * w / total_w for d, w in mix.items()}
+		quota = {d: int(x) for d, x in exact.items()}
+		for d in sorted(mix, key=lambda d: exact[d] - quota[d], reverse=True)[: k - sum(quota.values())]:
+			quota[d] += 1
+		short = 0
+		for d in mix:
+			if quota[d] > available[d]:
+				short += quota[d] - available[d]
+				quota[d] = available[d]
+		for d in sorted(mix, key=lambda d: mix[d], reverse=True):
+			extra = min(short, available[d] - quota[d])
+			quota[d] += extra
+			short -= extra
+
+		picked: List[int] = []
+		for d, n in quota.items():
+			if n:
+				picked += self._sample_stratum(self._buckets(category_keys, d), n, hf_weight, rng)
+		rng.shuffle(picked)
+		return picked
+
+
+_lock = threading.Lock()
+_index: Optional[SamplingIndex] = None
+_index_snapshot: Optional[BankSnapshot] = None
+
+
+def sampling_index() -> SamplingIndex:
+	"""当前题库快照对应的抽题索引；快照换了（版本变化/换库）才重建。"""
+	global _index, _index_snapshot
+	snap = bank_cache.snapshot()
+	if _index_snapshot is snap and _index is not None:
+		return _index
+	with _lock:
+		if _index_snapshot is not snap or _index is None:
+			_index = SamplingIndex(snap)
+			_index_snapshot = snap
+		return _index
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+题目全文检索
+- 基于 questions_fts（FTS5 + trigram 分词，见迁移 v13）：题干、选项、解析、考点，bm25 排序，题干权重最高
+- 查询按空白切成若干词，全部命中才算匹配；trigram 至少要 3 个字符，不足 3 个字符的词（如“列表”）
+  改为对全文表做 LIKE 过滤；所有词都不足 3 个字符时没有相关度可用，按高频优先、id 升序返回
+- 摘要里命中的部分用 <mark> 包裹，其余文本已做 HTML 转义，前端可以直接插入
+- 没有 questions_fts 的旧库（未执行迁移）退化为对 questions/answers 的 LIKE 查询
+"""
+from __future__ import annotations
+
+import html
+import sqlite3
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.database.categories import category_key_sql
+
+MAX_QUERY_LENGTH = 200
+MAX_TERMS = 8
+MIN_FTS_TERM = 3  # trigram 分词能索引的最短词
+SNIPPET_TOKENS = 24
+SNIPPET_CHARS = 48
+# bm25 列权重：题干、选项、解析、考点
+BM25_WEIGHTS = (10.0, 2.0, 1.0, 5.0)
+
+_OPEN, _CLOSE = "\x02", "\x03"  # 摘要里的高亮标记，转义后再换成 <mark>
+_ELLIPSIS = "…"
+_COLUMNS = ("title", "options", "analysis", "knowledge_point")
+_LEGACY_OPTIONS = (
+	"COALESCE(q.option_a, '') || char(10) || COALESCE(q.option_b, '') || char(10) || "
+	"COALESCE(q.option_c, '') || char(10) || COALESCE(q.option_d, '')"
+)
+
+
+class SearchPage(NamedTuple):
+	items: List[Dict[str, Any]]
+	has_more: bool
+	ranked: bool  # False 表示没有可用的相关度（只有短词/旧库），结果按高频、id 排序
+
+
+def parse_terms(query: str) -> List[str]:
+	terms = []
+	for term in (query or "")[:MAX_QUERY_LENGTH].split():
+		if term not in terms:
+			terms.append(term)
+	return terms[:MAX_TERMS]
+
+
+def _fts_phrase(term: str) -> str:
+	return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+	escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+	return f"%{escaped}%"
+
+
+def _render_snippet(raw: Optional[str]) -> str:
+	text = html.escape(raw or "")
+	return text.replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def _highlight(texts: Sequence[Optional[str]], terms: Sequence[str]) -> str:
+	"""LIKE 模式下自己截取摘要：取第一个包含某个词的列，在命中位置附近截 SNIPPET_CHARS 个字符。"""
+	lowered = [t.lower() for t in terms]
+	for text in texts:
+		if not text:
+			continue
+		low = text.lower()
+		hits = [(low.find(t), t) for t in lowered if t and low.find(t) >= 0]
+		if not hits:
+			continue
+		first = min(pos for pos, _ in hits)
+		start = max(0, first - SNIPPET_CHARS // 4)
+		end = min(len(text), start + SNIPPET_CHARS)
+		window = text[start:end]
+		marked = []
+		i = 0
+		low_window = window.lower()
+		while i < len(window):
+			match = next((t for t in lowered if t and low_window.startswith(t, i)), None)
+			if match:
+				marked.append(_OPEN + window[i : i + len(match)] + _CLOSE)
+				i += len(match)
+			else:
+				marked.append(window[i])
+				i += 1
+		prefix = _ELLIPSIS if start > 0 else ""
+		suffix = _ELLIPSIS if end < len(text) else ""
+		return _render_snippet(prefix + "".join(marked) + suffix)
+	return html.escape((texts[0] or "")[:SNIPPET_CHARS])
+
+
+def _cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+	# 按列名取值，不依赖调用方连接的 row_factory
+	cur = conn.cursor()
+	cur.row_factory = sqlite3.Row
+	return cur
+
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+	# 全文表和同步触发器都在才可用：questions 表被重建过（触发器随之删除）时全文表里的内容已不可信
+	row = conn.execute(
+		"SELECT COUNT(*) FROM sqlite_master WHERE (type = 'table' AND name = 'questions_fts') "
+		"OR (type = 'trigger' AND name = 'trg_questions_fts_insert')"
+	).fetchone()
+	return row[0] == 2
+
+
+def _like_conditions(columns: Sequence[str], terms: Sequence[str]) -> Tuple[List[str], List[Any]]:
+	conds, params = [], []
+	for term in terms:
+		conds.append("(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in columns) + ")")
+		params += [_like_pattern(term)] * len(columns)
+	return conds, params
+
+
+def search_questions(
+	conn: sqlite3.Connection,
+	query: str,
+	category_key: Optional[str] = None,
+	limit: int = 20,
+	offset: int = 0,
+) -> SearchPage:
+	"""检索题目；多取一条判断是否还有下一页。"""
+	terms = parse_terms(query)
+	if not terms:
+		return SearchPage([], False, False)
+	if not has_fts(conn):
+		return _legacy_search(conn, terms, category_key, limit, offset)
+
+	long_terms = [t for t in terms if len(t) >= MIN_FTS_TERM]
+	short_terms = [t for t in terms if len(t) < MIN_FTS_TERM]
+	conds: List[str] = []
+	params: List[Any] = []
+	if long_terms:
+		conds.append("questions_fts MATCH ?")
+		params.append(" AND ".join(_fts_phrase(t) for t in long_terms))
+	like_conds, like_params = _like_conditions([f"questions_fts.{c}" for c in _COLUMNS], short_terms)
+	conds += like_conds
+	params += like_params
+	if category_key:
+		conds.append("q.category_key = ?")
+		params.append(category_key)
+
+	if long_terms:
+		select = (
+			f"snippet(questions_fts, -1, '{_OPEN}', '{_CLOSE}', '{_ELLIPSIS}', {SNIPPET_TOKENS}) AS snippet, "
+			f"bm25(questions_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score"
+		)
+		order = "score, q.id"
+	else:
+		select = ", ".join(f"questions_fts.{c} AS {c}" for c in _COLUMNS)
+		order = "q.is_high_frequency DESC, q.id"
+	rows = _cursor(conn).execute(
+		f"""
+		SELECT q.id, q.title, q.category, q.category_key, q.difficulty, q.is_high_frequency, {select}
+		FROM questions_fts
+		JOIN questions q ON q.id = questions_fts.rowid
+		WHERE {' AND '.join(conds)}
+		ORDER BY {order}
+		LIMIT ? OFFSET ?
+		""",
+		(*params, limit + 1, offset),
+	).fetchall()
+	items = []
+	for r in rows[:limit]:
+		item = {
+			"id": r["id"],
+			"title": r["title"],
+			"category": r["category"] or "",
+			"category_key": r["category_key"],
+			"difficulty": r["difficulty"] or "Easy",
+			"is_high_frequency": r["is_high_frequency"] or 0,
+		}
+		if long_terms:
+			item["snippet"] = _render_snippet(r["snippet"])
+			item["score"] = round(-r["score"], 4)  # bm25 越小越相关，对外给正数
+		else:
+			item["snippet"] = _highlight([r[c] for c in _COLUMNS], short_terms)
+		items.append(item)
+	return SearchPage(items, len(rows) > limit, bool(long_terms))
+
+
+def _legacy_search(
+	conn: sqlite3.Connection, terms: Sequence[str], category_key: Optional[str], limit: int, offset: int
+) -> SearchPage:
+	# 旧库：没有全文表，也可能没有 category_key 列，分类键现算
+	columns = ["q.title", _LEGACY_OPTIONS, "a.analysis", "a.knowledge_point"]
+	conds, params = _like_conditions(columns, terms)
+	key_expr = category_key_sql("q.category")
+	if category_key:
+		conds.append(f"{key_expr} = ?")
+		params.append(category_key)
+	rows = _cursor(conn).execute(
+		f"""
+		SELECT q.id, q.title, q.category, {key_expr} AS category_key, q.difficulty, q.is_high_frequency,
+			{_LEGACY_OPTIONS} AS options, a.analysis, a.knowledge_point
+		FROM questions q
+		LEFT JOIN answers a ON a.question_id = q.id
+		WHERE {' AND '.join(conds)}
+		GROUP BY q.id
+		ORDER BY q.is_high_frequency DESC, q.id
+		LIMIT ? OFFSET ?
+		""",
+		(*params, limit + 1, offset),
+	).fetchall()
+	items = [
+		{
+			"id": r["id"],
+			"title": r["title"],
+			"category": r["category"] or "",
+			"category_key": r["category_key"],
+			"difficulty": r["difficulty"] or "Easy",
+			"is_high_frequency": r["is_high_frequency"] or 0,
+			"snippet": _highlight([r["title"], r["options"], r["analysis"], r["knowledge_point"]], terms),
+		}
+		for r in rows[:limit]
+	]
+	return SearchPage(items, len(rows) > limit, False)
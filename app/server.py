@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+生产模式多进程服务（预派生 / prefork）
+- 主进程：加载应用、预热题库快照与模板后绑定端口，再 fork 出 N 个工作进程共享同一个监听 socket
+- 工作进程：各自运行多线程 WSGI 服务，连接池在 fork 之后按需新建（SQLite 连接不能跨进程共享）
+- 信号：SIGHUP 逐个滚动重启工作进程（先起新进程再优雅停旧进程）；SIGTERM/SIGINT 优雅退出；
+  工作进程意外退出时自动补上
+- 仅支持有 os.fork 的平台；Windows 上退化为单进程多线程服务
+"""
+from __future__ import annotations
+
+import errno
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from werkzeug.serving import ThreadedWSGIServer
+
+from app.database import db
+from app.database.attempt_log import attempt_log
+from app.database.exam_sessions import exam_store
+
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "0")) or (os.cpu_count() or 1)
+GRACEFUL_TIMEOUT = float(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+
+# 工作进程存活不足 MIN_WORKER_UPTIME 秒就退出视为启动即崩溃：按指数退避延迟补进程，
+# 连续 MAX_QUICK_CRASHES 次后主进程放弃并退出，避免无限 fork
+MIN_WORKER_UPTIME = 5.0
+RESPAWN_BACKOFF_MAX = 30.0
+MAX_QUICK_CRASHES = 10
+
+
+class _WorkerServer(ThreadedWSGIServer):
+	# 非守护线程 + server_close 时等待：停止时先处理完已接收的请求
+	daemon_threads = False
+	block_on_close = True
+
+
+def _log(msg: str) -> None:
+	print(f"[server:{os.getpid()}] {msg}", file=sys.stderr, flush=True)
+
+
+class PreforkServer:
+	def __init__(
+		self,
+		app,
+		host: str = "127.0.0.1",
+		port: int = 5000,
+		workers: Optional[int] = None,
+		graceful_timeout: Optional[float] = None,
+	) -> None:
+		self.app = app
+		self.host = host
+		self.port = port
+		self.workers = max(1, workers or WEB_CONCURRENCY)
+		self.graceful_timeout = GRACEFUL_TIMEOUT if graceful_timeout is None else graceful_timeout
+		self.sock: Optional[socket.socket] = None
+		self.children: Dict[int, float] = {}  # pid -> 启动时间（monotonic）
+		self._respawn_at: List[float] = []  # 待补的工作进程及其最早启动时间
+		self._quick_crashes = 0
+		self._gave_up = False
+		self._stopping = False
+		self._reload = False
+
+	# ---------------- 主进程 ----------------
+
+	def bind(self) -> socket.socket:
+		family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+		sock = socket.socket(family, socket.SOCK_STREAM)
+		sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		sock.bind((self.host, self.port))
+		sock.listen(128)
+		# 非阻塞：多个工作进程同时被唤醒时，没抢到连接的一方 accept 直接返回，不会卡住优雅退出
+		sock.setblocking(False)
+		self.sock = sock
+		self.port = sock.getsockname()[1]
+		return sock
+
+	def serve_forever(self) -> None:
+		if self.sock is None:
+			self.bind()
+		# fork 之前关掉预热时建立的连接，子进程各自新建
+		db.close_pool()
+
+		signal.signal(signal.SIGTERM, self._on_stop)
+		signal.signal(signal.SIGINT, self._on_stop)
+		signal.signal(signal.SIGHUP, self._on_reload)
+
+		_log(f"listening on http://{self.host}:{self.port} with {self.workers} workers")
+		try:
+			for _ in range(self.workers):
+				self._spawn()
+			while not self._stopping:
+				if self._reload:
+					self._reload = False
+					self._rolling_restart()
+				self._reap(respawn=True)
+				self._respawn_due()
+				time.sleep(0.2)
+		finally:
+			self._stop_all()
+			self.sock.close()
+			_log("stopped")
+		if self._gave_up:
+			raise SystemExit(1)
+
+	def _on_stop(self, signum, frame) -> None:
+		self._stopping = True
+
+	def _on_reload(self, signum, frame) -> None:
+		self._reload = True
+
+	def _spawn(self) -> int:
+		pid = os.fork()
+		if pid == 0:
+			code = 0
+			try:
+				self._worker()
+			except BaseException:
+				code = 1
+				import traceback
+
+				traceback.print_exc()
+			finally:
+				os._exit(code)
+		self.children[pid] = time.monotonic()
+		return pid
+
+	def _reap(self, respawn: bool) -> None:
+		while self.children:
+			try:
+				pid, status = os.waitpid(-1, os.WNOHANG)
+			except ChildProcessError:
+				return
+			if pid == 0:
+				return
+			started = self.children.pop(pid, None)
+			if started is None:
+				continue
+			if respawn and not self._stopping:
+				self._schedule_respawn(pid, status, time.monotonic() - started)
+
+	def _schedule_respawn(self, pid: int, status: int, uptime: float) -> None:
+		code = os.waitstatus_to_exitcode(status)
+		if uptime >= MIN_WORKER_UPTIME:
+			self._quick_crashes = 0
+			_log(f"worker {pid} exited ({code}), respawning")
+			self._respawn_at.append(time.monotonic())
+			return
+
+		self._quick_crashes += 1
+		if self._quick_crashes >= MAX_QUICK_CRASHES:
+			_log(f"worker {pid} exited ({code}) after {uptime:.1f}s; {self._quick_crashes} quick crashes in a row, giving up")
+			self._gave_up = True
+			self._stopping = True
+			return
+		delay = min(RESPAWN_BACKOFF_MAX, 0.5 * 2 ** (self._quick_crashes - 1))
+		_log(f"worker {pid} exited ({code}) after {uptime:.1f}s, respawning in {delay:.1f}s")
+		self._respawn_at.append(time.monotonic() + delay)
+
+	def _respawn_due(self) -> None:
+		now = time.monotonic()
+		due = [t for t in self._respawn_at if t <= now]
+		self._respawn_at = [t for t in self._respawn_at if t > now]
+		for _ in due:
+			self._spawn()
+
+	def _rolling_restart(self) -> None:
+		_log("graceful restart")
+		for old in list(self.children):
+			self._spawn()
+			self._terminate(old)
+
+	def _terminate(self, pid: int) -> None:
+		try:
+			os.kill(pid, signal.SIGTERM)
+		except ProcessLookupError:
+			self.children.pop(pid, None)
+			return
+		deadline = time.monotonic() + self.graceful_timeout
+		while time.monotonic() < deadline:
+			try:
+				done, _status = os.waitpid(pid, os.WNOHANG)
+			except ChildProcessError:
+				done = pid
+			if done == pid:
+				self.children.pop(pid, None)
+				return
+			time.sleep(0.05)
+		_log(f"worker {pid} did not stop in {self.graceful_timeout}s, killing")
+		os.kill(pid, signal.SIGKILL)
+		os.waitpid(pid, 0)
+		self.children.pop(pid, None)
+
+	def _stop_all(self) -> None:
+		for pid in list(self.children):
+			try:
+				os.kill(pid, signal.SIGTERM)
+			except ProcessLookupError:
+				self.children.pop(pid, None)
+		deadline = time.monotonic() + self.graceful_timeout
+		while self.children and time.monotonic() < deadline:
+			self._reap(respawn=False)
+			time.sleep(0.05)
+		for pid in list(self.children):
+			os.kill(pid, signal.SIGKILL)
+			try:
+				os.waitpid(pid, 0)
+			except ChildProcessError:
+				pass
+			self.children.pop(pid, None)
+
+	# ---------------- 工作进程 ----------------
+
+	def _worker(self) -> None:
+		# 多个工作进程轮流处理同一场模拟面试：进程内缓存的会话读取前要先核对版本
+		exam_store.revalidate = self.workers > 1
+		server = _WorkerServer(self.host, self.port, self.app, fd=self.sock.fileno())
+
+		def _graceful(signum, frame) -> None:
+			# shutdown() 会等待 serve_forever 退出，必须在另一个线程里调用
+			threading.Thread(target=server.shutdown, daemon=True).start()
+
+		signal.signal(signal.SIGTERM, _graceful)
+		# Ctrl+C / 重启由主进程统一处理
+		signal.signal(signal.SIGINT, signal.SIG_IGN)
+		signal.signal(signal.SIGHUP, signal.SIG_IGN)
+		try:
+			server.serve_forever()
+		except OSError as e:
+			if e.errno != errno.EBADF:
+				raise
+		finally:
+			server.server_close()
+			# 后写队列里的答题记录先落盘再关连接池
+			attempt_log.close(self.graceful_timeout)
+			db.close_pool()
+
+
+def serve(app, host: str = "127.0.0.1", port: int = 5000, workers: Optional[int] = None) -> None:
+	"""生产模式入口：有 fork 时多进程，否则单进程多线程。"""
+	if not hasattr(os, "fork"):
+		_log("os.fork unavailable, falling back to a single threaded process")
+		app.run(host=host, port=port, threaded=True)
+		return
+	PreforkServer(app, host=host, port=port, workers=workers).serve_forever()
@@ -4,13 +4,16 @@ from __future__ import annotations
 import os
 import uuid
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 
+from app.assets import init_assets
 from app.blueprints.interview import bp as interview_bp
 from app.blueprints.main import bp as main_bp
 from app.blueprints.progress import bp as progress_bp
 from app.blueprints.question import bp as question_bp
-from app.database.db import init_schema
+from app.database.attempt_log import attempt_log
+from app.database.bank import bank_cache
+from app.database.db import PoolTimeout, ensure_schema, init_schema, release_connection
 
 
 def create_app() -> Flask:
@@ -21,15 +24,29 @@ def create_app() -> Flask:
         static_folder=os.path.join(base_dir, "static"),
     )
 
-    # 关键：即使 debug=False，也尽量让模板变更可生效（开发排查期）
-    app.config["TEMPLATES_AUTO_RELOAD"] = True
-    app.jinja_env.auto_reload = True
+    # APP_ENV=production：模板只编译一次、关闭 /__debug 路由、静态资源改用构建产物
+    production = os.environ.get("APP_ENV", "").lower() == "production"
+    app.config["PRODUCTION"] = production
 
-    # 可选：开发期尽量不要缓存静态文件
-    app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+    if not production:
+        # 关键：即使 debug=False，也尽量让模板变更可生效（开发排查期）
+        app.config["TEMPLATES_AUTO_RELOAD"] = True
+        app.jinja_env.auto_reload = True
 
-    # 单机：启动即确保建库
+        # 可选：开发期尽量不要缓存静态文件
+        app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+    else:
+        app.config["TEMPLATES_AUTO_RELOAD"] = False
+        app.jinja_env.auto_reload = False
+
+    init_assets(app, production=production)
+
+    # 单机：启动时执行一次迁移；请求里只检查“已就绪”标志，不再跑 DDL
     init_schema()
+    # 预热题库快照，首个请求不再承担整库读取
+    bank_cache.snapshot()
+    release_connection()
+    app.before_request(ensure_schema)
 
     # 实例标识：用来确认你浏览器连到的到底是不是这份 run.py
     app.config["APP_INSTANCE_ID"] = os.environ.get("APP_INSTANCE_ID") or uuid.uuid4().hex
@@ -39,28 +56,54 @@ def create_app() -> Flask:
         resp.headers["X-App-Instance"] = app.config["APP_INSTANCE_ID"]
         return resp
 
-    # 调试：确认“当前运行的是哪份工程/模板目录”
-    @app.get("/__debug/info")
-    def __debug_info():
-        searchpath = []
-        try:
-            searchpath = list(getattr(app.jinja_loader, "searchpath", []) or [])
-        except Exception:
+    # 每个请求结束后把线程持有的数据库连接还回连接池
+    @app.teardown_appcontext
+    def _release_db_connection(exc):
+        release_connection()
+
+    # 并发请求超过 DB_POOL_SIZE 且等待空闲连接超时：返回 503 让客户端稍后重试，而不是 500
+    @app.errorhandler(PoolTimeout)
+    def _pool_timeout(exc):
+        if "/api/" in request.path:
+            resp = jsonify({"success": False, "msg": "服务繁忙，请稍后重试"})
+        else:
+            resp = app.response_class("服务繁忙，请稍后重试", mimetype="text/plain")
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "1"
+        return resp
+
+    if not production:
+        # 调试：确认“当前运行的是哪份工程/模板目录”
+        @app.get("/__debug/info")
+        def __debug_info():
             searchpath = []
-        return jsonify(
-            {
-                "instance_id": app.config["APP_INSTANCE_ID"],
-                "base_dir": base_dir,
-                "template_folder": app.template_folder,
-                "static_folder": app.static_folder,
-                "jinja_searchpath": searchpath,
-                "cwd": os.getcwd(),
-            }
-        )
-
-    @app.get("/__debug/ping")
-    def __debug_ping():
-        return "pong"
+            try:
+                searchpath = list(getattr(app.jinja_loader, "searchpath", []) or [])
+            except Exception:
+                searchpath = []
+            return jsonify(
+                {
+                    "instance_id": app.config["APP_INSTANCE_ID"],
+                    "base_dir": base_dir,
+                    "template_folder": app.template_folder,
+                    "static_folder": app.static_folder,
+                    "jinja_searchpath": searchpath,
+                    "cwd": os.getcwd(),
+                }
+            )
+
+        @app.get("/__debug/ping")
+        def __debug_ping():
+            return "pong"
+
+        # 调试：题库快照命中/重载统计
+        @app.get("/__debug/bank")
+        def __debug_bank():
+            return jsonify(bank_cache.stats())
+
+        @app.get("/__debug/attempts")
+        def __debug_attempts():
+            return jsonify(attempt_log.stats())
 
     app.register_blueprint(main_bp)
     app.register_blueprint(question_bp, url_prefix="/question")
@@ -70,6 +113,11 @@ def create_app() -> Flask:
     # 关键：启用 session（模拟面试需要）
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "local-dev-secret-key")
 
+    if production:
+        # 预编译全部模板：多进程模式下在 fork 之前完成，工作进程直接共享
+        for name in app.jinja_env.list_templates(extensions=["html"]):
+            app.jinja_env.get_template(name)
+
     return app
 
 
@@ -80,9 +128,15 @@ if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5000"))
     debug = os.environ.get("DEBUG", "0") == "1"
 
-    print("[run.py] instance_id =", app.config.get("APP_INSTANCE_ID"))
-    print("[run.py] base_dir     =", os.path.dirname(os.path.abspath(__file__)))
-    print("[run.py] url_map      =")
-    print(app.url_map)
+    if app.config["PRODUCTION"]:
+        # 应用与题库快照已在上面的 create_app() 中加载，之后再 fork 工作进程
+        from app.server import serve
+
+        serve(app, host=host, port=port)
+    else:
+        print("[run.py] instance_id =", app.config.get("APP_INSTANCE_ID"))
+        print("[run.py] base_dir     =", os.path.dirname(os.path.abspath(__file__)))
+        print("[run.py] url_map      =")
+        print(app.url_map)
 
-    app.run(host=host, port=port, debug=debug, threaded=True)
+        app.run(host=host, port=port, debug=debug, threaded=True)
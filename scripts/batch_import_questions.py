@@ -1,20 +1,36 @@
 # -*- coding: utf-8 -*-
 """
 批量导入题目脚本（单机版）
-- 从 JSON 导入到 database/interview.db
-- 自动创建所需表：questions / answers
-JSON格式：[{category,title,option_a..d,correct_answer,difficulty,is_high_frequency,analysis,knowledge_point}, ...]
+- 导入到 database/interview.db（设置 DB_PATH 环境变量时导入到该库，与 Web 应用一致）
+- 自动执行数据库迁移（与 Web 应用同一套表结构）
+- 流式读取 JSON 数组 / JSON Lines（.jsonl）/ CSV，按块校验、每块一个事务批量写入，结束时输出 rows/sec
+- 可重复执行：按题干+选项的内容指纹去重，已有题目只更新变化的答案/解析，未变化的跳过
+- --near-dups：只输出近似重复报告（改写过的题干、换序的选项等），不导入
+- 导入时计算分类键 category_key（basic/framework/project/other）
+题目格式：{category,title,option_a..d,correct_answer,difficulty,is_high_frequency,analysis,knowledge_point}
+也接受 seed_questions.py 生成的嵌套格式：{title,options:{A..D},correct_answer,category,difficulty,frequency}
 """
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import sqlite3
 import sys
-from typing import Any, Dict, List, Tuple
+from typing import Optional
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-DB_PATH = os.path.join(PROJECT_ROOT, "database", "interview.db")
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# 与 Web 应用同一个库（同样读取 DB_PATH 环境变量），导入后运行中的服务据题库版本号感知变化
+from app.database.db import DB_PATH  # noqa: E402
+from app.database.dedup import DEFAULT_THRESHOLD  # noqa: E402
+from app.database.importer import (  # noqa: E402
+    DEFAULT_BATCH_SIZE, FORMATS, ImportStats, SourceLine, import_file, iter_records, near_duplicates,
+)
+from app.database.migrations import migrate  # noqa: E402
 
 
 def _connect() -> sqlite3.Connection:
@@ -26,118 +42,59 @@ def _connect() -> sqlite3.Connection:
 
 
 def _init_schema(conn: sqlite3.Connection) -> None:
-    conn.executescript(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
+    # 与 Web 应用共用同一套迁移，保证 category_key 等列/索引/默认用户都已就绪
+    migrate(conn)
 
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category TEXT NOT NULL,
-            title TEXT NOT NULL,
-            option_a TEXT,
-            option_b TEXT,
-            option_c TEXT,
-            option_d TEXT,
-            difficulty TEXT DEFAULT 'Easy',
-            is_high_frequency INTEGER DEFAULT 0
-        );
 
-        CREATE TABLE IF NOT EXISTS answers (
-            question_id INTEGER PRIMARY KEY,
-            correct_answer TEXT NOT NULL,
-            analysis TEXT,
-            knowledge_point TEXT,
-            FOREIGN KEY(question_id) REFERENCES questions(id) ON DELETE CASCADE
-        );
-        """
-    )
-    # 单机默认用户（便于统计 total_users）
-    conn.execute("INSERT OR IGNORE INTO users(id, username) VALUES(1, 'local_user');")
+def _print_progress(stats: ImportStats) -> None:
+    print(f"已处理 {stats.read} 道题目（{stats.rows_per_sec:.0f} rows/sec）...")
 
 
-def import_from_json(json_file: str) -> bool:
-    """从JSON文件导入题目"""
+def import_file_to_db(path: str, fmt: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> bool:
+    """从 JSON / JSON Lines / CSV 文件导入题目"""
+    if not os.path.exists(path):
+        print(f"错误：文件不存在 - {path}")
+        return False
     try:
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if not isinstance(data, list):
-            print("错误：JSON文件应该包含一个题目数组")
-            return False
-
         conn = _connect()
         try:
             _init_schema(conn)
-            success_count = 0
-            fail_count = 0
-
-            print(f"\n开始导入 {len(data)} 道题目到 {DB_PATH}\n")
-
-            for idx, q in enumerate(data, 1):
-                try:
-                    required = ["title", "option_a", "option_b", "option_c", "option_d", "correct_answer"]
-                    missing = [k for k in required if k not in q]
-                    if missing:
-                        print(f"题目 {idx}: 缺少必需字段 {missing}，跳过")
-                        fail_count += 1
-                        continue
-
-                    category = str(q.get("category", "Python Basics")).strip() or "Python Basics"
-                    title = str(q.get("title", "")).strip()
-                    option_a = str(q.get("option_a", "")).strip()
-                    option_b = str(q.get("option_b", "")).strip()
-                    option_c = str(q.get("option_c", "")).strip()
-                    option_d = str(q.get("option_d", "")).strip()
-                    difficulty = str(q.get("difficulty", "Easy")).strip() or "Easy"
-                    is_high_frequency = 1 if bool(q.get("is_high_frequency", False)) else 0
-
-                    cur = conn.execute(
-                        """
-                        INSERT INTO questions(category,title,option_a,option_b,option_c,option_d,difficulty,is_high_frequency)
-                        VALUES(?,?,?,?,?,?,?,?)
-                        """,
-                        (category, title, option_a, option_b, option_c, option_d, difficulty, is_high_frequency),
-                    )
-                    question_id = cur.lastrowid
-
-                    correct_answer = str(q.get("correct_answer", "")).strip().upper()
-                    analysis = str(q.get("analysis", "")).strip()
-                    knowledge_point = str(q.get("knowledge_point", "")).strip()
-
-                    if correct_answer:
-                        conn.execute(
-                            """
-                            INSERT INTO answers(question_id, correct_answer, analysis, knowledge_point)
-                            VALUES(?,?,?,?)
-                            """,
-                            (question_id, correct_answer, analysis, knowledge_point),
-                        )
-
-                    conn.commit()
-                    success_count += 1
-
-                    if idx % 10 == 0:
-                        print(f"已导入 {idx}/{len(data)} 道题目...")
-
-                except Exception as e:
-                    conn.rollback()
-                    fail_count += 1
-                    print(f"题目 {idx}: 导入失败 - {e}")
-
-            print("\n导入完成！")
-            print(f"成功: {success_count} 道")
-            print(f"失败: {fail_count} 道")
-            return True
+            print(f"\n开始导入 {path} 到 {DB_PATH}\n")
+            stats = import_file(conn, path, fmt=fmt, batch_size=batch_size, progress=_print_progress)
         finally:
             conn.close()
+    except json.JSONDecodeError as e:
+        print(f"错误：JSON格式错误 - {e}")
+        return False
+    except Exception as e:
+        print(f"错误：{e}")
+        return False
 
-    except FileNotFoundError:
-        print(f"错误：文件不存在 - {json_file}")
+    for msg in stats.errors:
+        print(msg)
+    if stats.failed > len(stats.errors):
+        print(f"...另有 {stats.failed - len(stats.errors)} 条失败未列出")
+    print("\n导入完成！")
+    print(f"新增: {stats.added} 道")
+    print(f"更新: {stats.updated} 道")
+    print(f"跳过: {stats.skipped} 道（内容未变化）")
+    print(f"失败: {stats.failed} 道")
+    print(f"耗时: {stats.seconds:.2f}s（{stats.rows_per_sec:.0f} rows/sec，{stats.batches} 批）")
+    return True
+
+
+def report_near_duplicates(path: str, fmt: Optional[str] = None, threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """只报告导入文件中与题库/文件内其他题近似重复的题，不写库"""
+    if not os.path.exists(path):
+        print(f"错误：文件不存在 - {path}")
         return False
+    try:
+        conn = _connect()
+        try:
+            _init_schema(conn)
+            clusters, stats = near_duplicates(conn, iter_records(path, fmt), threshold=threshold)
+        finally:
+            conn.close()
     except json.JSONDecodeError as e:
         print(f"错误：JSON格式错误 - {e}")
         return False
@@ -145,6 +102,19 @@ def import_from_json(json_file: str) -> bool:
         print(f"错误：{e}")
         return False
 
+    def _label(key) -> str:
+        return f"文件第 {key.line} 条" if isinstance(key, SourceLine) else f"题库 #{key}"
+
+    print(f"\n读取 {stats.read} 道题（失败 {stats.failed}），发现 {len(clusters)} 个近似重复簇，耗时 {stats.seconds:.2f}s")
+    for c in clusters:
+        print(f"[相似度 >= {c.similarity:.2f}] " + "，".join(_label(k) for k in c.keys))
+    return True
+
+
+def import_from_json(json_file: str) -> bool:
+    """从JSON文件导入题目"""
+    return import_file_to_db(json_file, fmt="json")
+
 
 def create_sample_json(output_file: str = "sample_questions.json") -> None:
     """创建示例JSON文件"""
@@ -225,41 +195,31 @@ def create_sample_json(output_file: str = "sample_questions.json") -> None:
 
 def main() -> None:
     """主函数"""
-    if len(sys.argv) < 2:
-        print("批量导入题目工具")
-        print("\n使用方法:")
-        print("  python batch_import_questions.py <json_file>  # 从JSON文件导入")
-        print("  python batch_import_questions.py --sample     # 创建示例JSON文件")
-        print("\nJSON文件格式:")
-        print("  [")
-        print("    {")
-        print("      \"category\": \"Python Basics\",")
-        print("      \"title\": \"题目内容\",")
-        print("      \"option_a\": \"选项A\",")
-        print("      \"option_b\": \"选项B\",")
-        print("      \"option_c\": \"选项C\",")
-        print("      \"option_d\": \"选项D\",")
-        print("      \"correct_answer\": \"A\",")
-        print("      \"difficulty\": \"Easy\",  # Easy/Medium/Hard")
-        print("      \"is_high_frequency\": true,")
-        print("      \"analysis\": \"解析内容\",")
-        print("      \"knowledge_point\": \"知识点\"")
-        print("    }")
-        print("  ]")
+    parser = argparse.ArgumentParser(description="批量导入题目工具")
+    parser.add_argument("file", nargs="?", help="题目文件（.json / .jsonl / .csv）")
+    parser.add_argument("--format", choices=FORMATS, help="文件格式，缺省按扩展名判断")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每个事务写入的题目数")
+    parser.add_argument("--near-dups", action="store_true", help="只报告近似重复题，不导入")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="近似重复的 Jaccard 阈值（0~1）")
+    parser.add_argument("--sample", nargs="?", const="sample_questions.json", metavar="OUTPUT", help="创建示例JSON文件")
+    args = parser.parse_args()
+
+    if args.sample:
+        create_sample_json(args.sample)
         return
-
-    if sys.argv[1] == "--sample":
-        output_file = sys.argv[2] if len(sys.argv) > 2 else "sample_questions.json"
-        create_sample_json(output_file)
-    else:
-        json_file = sys.argv[1]
-        if not os.path.exists(json_file):
-            print(f"错误：文件不存在 - {json_file}")
-            print("提示：使用 --sample 参数创建示例文件")
-            return
-        import_from_json(json_file)
+    if not args.file:
+        parser.print_help()
+        print("\nCSV 表头与 JSON 字段同名：category,title,option_a,option_b,option_c,option_d,correct_answer,...")
+        return
+    if not os.path.exists(args.file):
+        print(f"错误：文件不存在 - {args.file}")
+        print("提示：使用 --sample 参数创建示例文件")
+        return
+    if args.near_dups:
+        report_near_duplicates(args.file, fmt=args.format, threshold=args.threshold)
+        return
+    import_file_to_db(args.file, fmt=args.format, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
     main()
-
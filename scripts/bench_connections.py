@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+连接池基准脚本
+- 在数据库副本上启动 Werkzeug 多线程服务（与 app.run(threaded=True) 相同的服务器）
+- 分别在“不复用连接”（DB_POOL_SIZE=0，旧行为）与连接池模式下压测若干页面/接口
+- 输出每种模式的 requests/sec
+
+用法：
+  python scripts/bench_connections.py [--seconds 5] [--clients 8] [--pool-size 8]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app.database import db  # noqa: E402
+
+DEFAULT_PATHS = ["/", "/progress/", "/question/api/questions?category=basic", "/question/api/question/1"]
+
+
+def _client(base: str, paths: List[str], stop_at: float, counts: List[int], errors: List[int]) -> None:
+    i = 0
+    while time.monotonic() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        try:
+            with urllib.request.urlopen(base + path, timeout=10) as r:
+                r.read()
+            counts[0] += 1
+        except Exception:
+            errors[0] += 1
+
+
+def run_mode(app, pool_size: int, seconds: float, clients: int, paths: List[str]) -> float:
+    db.configure(pool_size=pool_size)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    base = f"http://127.0.0.1:{server.server_port}"
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        # 预热
+        for p in paths:
+            urllib.request.urlopen(base + p, timeout=10).read()
+
+        stop_at = time.monotonic() + seconds
+        per_client = [([0], [0]) for _ in range(clients)]
+        threads = [
+            threading.Thread(target=_client, args=(base, paths, stop_at, c, e))
+            for c, e in per_client
+        ]
+        started = time.monotonic()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+        t.join()
+
+    total = sum(c[0] for c, _ in per_client)
+    errors = sum(e[0] for _, e in per_client)
+    stats = db.get_pool().stats()
+    rps = total / elapsed if elapsed else 0.0
+    label = "no-pool" if pool_size == 0 else f"pool={pool_size}"
+    print(f"{label:>10}: {total} 请求 / {elapsed:.1f}s = {rps:.1f} req/s, 错误 {errors}, 连接创建 {stats['created']}")
+    return rps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="连接池前后吞吐对比")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--path", action="append", help="压测路径，可重复；默认首页/进度页/题目接口")
+    args = parser.parse_args()
+
+    # 关闭 Werkzeug 的逐请求访问日志，避免打印拖慢压测
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_pool_")
+    try:
+        db_copy = os.path.join(tmpdir, "interview.db")
+        if os.path.exists(db.DB_PATH):
+            # 用 backup API 复制，WAL 中尚未检查点的数据也会带上
+            src, dst = sqlite3.connect(db.DB_PATH), sqlite3.connect(db_copy)
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+        db.configure(db_path=db_copy)
+
+        from run import create_app
+
+        app = create_app()
+        paths = args.path or DEFAULT_PATHS
+
+        print(f"数据库副本: {db_copy}")
+        print(f"并发客户端: {args.clients}, 每种模式 {args.seconds:.0f}s\n")
+        before = run_mode(app, 0, args.seconds, args.clients, paths)
+        after = run_mode(app, args.pool_size, args.seconds, args.clients, paths)
+        if before:
+            print(f"\n提升: {after / before:.2f}x")
+    finally:
+        db.close_pool()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+近似重复检测（MinHash + LSH）规模基准
+- 生成合成题库：题干由少量模板 + 各题不同的具体内容组成，另有一部分是对已有题的改写（增删字、选项换序）
+- 分别在 10k / 100k 道题上测签名 + 分桶 + 复核的耗时、候选对数量与召回率
+- 逐对比较需要 n*(n-1)/2 次；LSH 只复核候选对，题数扩大 10 倍时耗时应接近 10 倍而不是 100 倍
+
+用法：
+  python scripts/bench_near_dups.py [--sizes 10000 100000] [--dup-rate 0.05] [--seed 1]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from typing import List, Set, Tuple
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.database.dedup import DEFAULT_THRESHOLD, NearDuplicateIndex, jaccard, shingle_set  # noqa: E402
+
+TOPICS = [
+    "列表", "字典", "元组", "集合", "生成器", "迭代器", "装饰器", "闭包", "上下文管理器", "协程",
+    "线程", "进程", "GIL", "垃圾回收", "引用计数", "切片", "推导式", "lambda", "异常", "模块",
+    "包", "虚拟环境", "Flask 路由", "蓝图", "请求上下文", "会话", "模板", "ORM", "事务", "索引",
+    "SQLite", "WAL", "缓存", "中间件", "WSGI", "REST", "JSON", "正则表达式", "单元测试", "日志",
+]
+VERBS = ["实现", "定义", "使用", "创建", "优化", "调试", "比较", "遍历", "序列化", "关闭"]
+STEMS = [
+    "下列关于{t}的说法正确的是", "在 Python 中如何{v}{t}", "以下哪种方式可以{v}{t}",
+    "{t}和{u}的主要区别是什么", "使用{t}时需要注意什么", "{t}在{u}场景下的作用是",
+]
+
+
+# 常用汉字区间里取 3000 个字作为题目具体内容的字库（模板之外的部分各题不同）
+CHARS = [chr(0x4E00 + i * 7) for i in range(3000)]
+
+
+def _phrase(rng: random.Random, lo: int, hi: int) -> str:
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(lo, hi)))
+
+
+def _question(rng: random.Random) -> Tuple[str, List[str]]:
+    t, u = rng.sample(TOPICS, 2)
+    title = rng.choice(STEMS).format(t=t, u=u, v=rng.choice(VERBS)) + "：" + _phrase(rng, 6, 12)
+    options = [f"{rng.choice(VERBS)}{_phrase(rng, 4, 8)}" for _ in range(4)]
+    return title, options
+
+
+def _reword(rng: random.Random, title: str, options: List[str]) -> Tuple[str, List[str]]:
+    options = list(options)
+    rng.shuffle(options)
+    words = list(title)
+    # 删一个字、替换一个字、末尾加标点
+    del words[rng.randrange(len(words))]
+    words[rng.randrange(len(words))] = rng.choice("的了是在")
+    return "".join(words) + rng.choice(["？", "?", "。", ""]), options
+
+
+def build_bank(size: int, dup_rate: float, seed: int) -> Tuple[List[Tuple[str, List[str]]], Set[Tuple[int, int]]]:
+    rng = random.Random(seed)
+    bank: List[Tuple[str, List[str]]] = []
+    dups: Set[Tuple[int, int]] = set()
+    while len(bank) < size:
+        if bank and rng.random() < dup_rate:
+            src = rng.randrange(len(bank))
+            dups.add((src, len(bank)))
+            bank.append(_reword(rng, *bank[src]))
+        else:
+            bank.append(_question(rng))
+    return bank, dups
+
+
+def _pairwise_seconds(bank: List[Tuple[str, List[str]]], samples: int = 200000) -> float:
+    """逐对比较全部题目的估算耗时：实测 samples 次 Jaccard 的平均耗时 x n*(n-1)/2（不含切 shingle）。"""
+    rng = random.Random(0)
+    sets = [shingle_set(t, o) for t, o in rng.sample(bank, min(len(bank), 1000))]
+    pairs = [(rng.choice(sets), rng.choice(sets)) for _ in range(samples)]
+    started = time.perf_counter()
+    for a, b in pairs:
+        jaccard(a, b)
+    per_pair = (time.perf_counter() - started) / samples
+    return per_pair * len(bank) * (len(bank) - 1) / 2
+
+
+def run(size: int, dup_rate: float, seed: int, threshold: float) -> dict:
+    bank, planted = build_bank(size, dup_rate, seed)
+    started = time.perf_counter()
+    index = NearDuplicateIndex(threshold)
+    for i, (title, options) in enumerate(bank):
+        index.add(i, title, options)
+    signed = time.perf_counter()
+    pairs = index.similar_pairs()
+    done = time.perf_counter()
+    found = {(a, b) for a, b, _ in pairs}
+    return {
+        "size": size,
+        "sign_s": signed - started,
+        "lsh_s": done - signed,
+        "total_s": done - started,
+        "candidates": index.candidates,
+        "all_pairs": size * (size - 1) // 2,
+        "pairs": len(pairs),
+        "recall": len(planted & found) / len(planted) if planted else 1.0,
+        "pairwise_s": _pairwise_seconds(bank),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="近似重复检测规模基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="改写题所占比例")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        r = run(size, args.dup_rate, args.seed, args.threshold)
+        results.append(r)
+        print(
+            f"n={r['size']:>7}  签名 {r['sign_s']:.2f}s  分桶+复核 {r['lsh_s']:.2f}s  合计 {r['total_s']:.2f}s  "
+            f"候选对 {r['candidates']} / 全部 {r['all_pairs']} ({r['candidates'] / max(1, r['all_pairs']):.2e})  "
+            f"相似对 {r['pairs']}  召回 {r['recall']:.1%}  逐对比较估算 {r['pairwise_s']:.0f}s"
+        )
+    if len(results) >= 2:
+        a, b = results[0], results[-1]
+        ratio = b["size"] / a["size"]
+        print(
+            f"\n题数 x{ratio:.0f}：耗时 x{b['total_s'] / a['total_s']:.1f}，"
+            f"候选对 x{b['candidates'] / max(1, a['candidates']):.1f}（逐对比较为 x{ratio * ratio:.0f}），"
+            f"增长指数约 {math.log(b['total_s'] / a['total_s'], ratio):.2f}（逐对比较为 2）"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+开发服务器 vs 生产多进程服务 吞吐对比
+- 在数据库副本上分别启动：python run.py（Werkzeug 开发服务器，threaded=True）
+  与 APP_ENV=production python run.py（预派生多进程，WEB_CONCURRENCY 个工作进程）
+- 用多个客户端进程循环请求首页、题目列表、单题、解析接口，输出 requests/sec 与 p50/p99 延迟
+- 结束时向服务发送 SIGTERM，顺带验证优雅退出
+
+用法：
+  python scripts/bench_server.py [--seconds 10] [--clients 8] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SOURCE_DB = os.path.join(PROJECT_ROOT, "database", "interview.db")
+
+PATHS = [
+    "/",
+    "/question/api/questions?category=basic",
+    "/question/api/question/1",
+    "/question/api/explanation/1?user_answer=A",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务进程提前退出（{proc.returncode}）")
+        try:
+            urllib.request.urlopen(base + "/", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("等待服务启动超时")
+
+
+def _client(base: str, stop_at: float, queue) -> None:
+    latencies: List[float] = []
+    errors = 0
+    i = 0
+    while time.monotonic() < stop_at:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + path, timeout=10) as r:
+                r.read()
+            latencies.append(time.perf_counter() - t0)
+        except OSError:
+            errors += 1
+    queue.put((latencies, errors))
+
+
+def run_mode(label: str, env: Dict[str, str], seconds: float, clients: int) -> Tuple[float, float, float, int]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "run.py")],
+        env={**os.environ, **env, "PORT": str(port), "HOST": "127.0.0.1"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(base, proc)
+        for p in PATHS:  # 预热
+            urllib.request.urlopen(base + p, timeout=10).read()
+
+        queue = multiprocessing.Queue()
+        stop_at = time.monotonic() + seconds
+        procs = [multiprocessing.Process(target=_client, args=(base, stop_at, queue)) for _ in range(clients)]
+        started = time.monotonic()
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.monotonic() - started
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=35)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    latencies = sorted(x for lat, _ in results for x in lat)
+    errors = sum(e for _, e in results)
+    rps = len(latencies) / elapsed if elapsed else 0.0
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0
+    print(f"{label:<28} {rps:8.1f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms   错误 {errors}")
+    return rps, p50, p99, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="开发服务器 vs 生产多进程服务 吞吐对比")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=8, help="并发客户端进程数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="生产模式工作进程数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_server_") as tmpdir:
+        db_path = os.path.join(tmpdir, "interview.db")
+        src, dst = sqlite3.connect(SOURCE_DB), sqlite3.connect(db_path)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+
+        print(f"CPU {os.cpu_count()}，客户端进程 {args.clients}，每种模式 {args.seconds:.0f}s\n")
+        dev = run_mode("dev (app.run threaded)", {"DB_PATH": db_path, "APP_ENV": "development"}, args.seconds, args.clients)
+        prod = run_mode(
+            f"production ({args.workers} workers)",
+            {"DB_PATH": db_path, "APP_ENV": "production", "WEB_CONCURRENCY": str(args.workers)},
+            args.seconds,
+            args.clients,
+        )
+        if dev[0]:
+            print(f"\n生产模式吞吐为开发服务器的 {prod[0] / dev[0]:.2f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+答题提交延迟基准
+- 在数据库副本上启动 Werkzeug 多线程服务，多个客户端并发 POST /question/api/submit_answer
+- 分别测同步写入与后写队列（ATTEMPT_WRITE_BEHIND）两种模式，输出 p50/p99 延迟与 requests/sec
+- 后写模式的计时结束后会等队列写完，并核对写入条数
+
+用法：
+  python scripts/bench_submit.py [--seconds 5] [--clients 8] [--batch-size 200] [--max-delay-ms 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app.database import db  # noqa: E402
+from app.database.attempt_log import attempt_log  # noqa: E402
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _client(url: str, question_ids: List[int], stop_at: float, latencies: List[float], errors: List[int]) -> None:
+    i = 0
+    while time.monotonic() < stop_at:
+        body = json.dumps({"question_id": question_ids[i % len(question_ids)], "user_answer": "A"}).encode()
+        i += 1
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as r:
+                r.read()
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors[0] += 1
+
+
+def _attempt_count() -> int:
+    return int(db.fetch_one("SELECT COUNT(*) AS n FROM attempts")["n"])
+
+
+def run_mode(app, write_behind: bool, seconds: float, clients: int, question_ids: List[int]) -> None:
+    attempt_log.enabled = write_behind
+    before = _attempt_count()
+    db.release_connection()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    url = f"http://127.0.0.1:{server.server_port}/question/api/submit_answer"
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    try:
+        stop_at = time.monotonic() + seconds
+        per_client = [([], [0]) for _ in range(clients)]
+        threads = [threading.Thread(target=_client, args=(url, question_ids, stop_at, lat, err)) for lat, err in per_client]
+        started = time.monotonic()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.monotonic() - started
+        attempt_log.flush()
+    finally:
+        server.shutdown()
+        t.join()
+
+    latencies = [x for lat, _ in per_client for x in lat]
+    errors = sum(e[0] for _, e in per_client)
+    written = _attempt_count() - before
+    db.release_connection()
+    label = "write-behind" if write_behind else "sync"
+    print(
+        f"{label:>12}: {len(latencies)} 请求 / {elapsed:.1f}s = {len(latencies) / elapsed:.1f} req/s, "
+        f"p50 {_percentile(latencies, 50) * 1000:.2f}ms, p99 {_percentile(latencies, 99) * 1000:.2f}ms, "
+        f"错误 {errors}, 写入 {written} 条"
+    )
+    if write_behind:
+        s = attempt_log.stats()
+        print(f"{'':>12}  批次 {s['batches']}，最大批 {s['max_batch']}，同步回退 {s['sync_fallbacks']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="答题提交：同步写入 vs 后写队列")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=attempt_log.batch_size)
+    parser.add_argument("--max-delay-ms", type=float, default=attempt_log.max_delay * 1000)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    attempt_log.batch_size = max(1, args.batch_size)
+    attempt_log.max_delay = args.max_delay_ms / 1000.0
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_submit_")
+    try:
+        db_copy = os.path.join(tmpdir, "interview.db")
+        if os.path.exists(db.DB_PATH):
+            src, dst = sqlite3.connect(db.DB_PATH), sqlite3.connect(db_copy)
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+        db.configure(db_path=db_copy)
+
+        from run import create_app
+
+        app = create_app()
+        question_ids = [int(r["id"]) for r in db.fetch_all("SELECT id FROM questions ORDER BY id LIMIT 200")]
+        if not question_ids:
+            print("题库为空，先导入题目")
+            return
+
+        print(f"数据库副本: {db_copy}")
+        print(f"并发客户端: {args.clients}, 每种模式 {args.seconds:.0f}s\n")
+        run_mode(app, False, args.seconds, args.clients, question_ids)
+        run_mode(app, True, args.seconds, args.clients, question_ids)
+    finally:
+        attempt_log.close()
+        db.close_pool()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
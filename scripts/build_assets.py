@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+构建生产环境静态资源
+- static/ 下的 css/js -> static/dist/（带内容哈希的文件名 + .gz 预压缩）+ static/dist/manifest.json
+- 以 APP_ENV=production 启动时模板里的 asset_url() 会指向这些文件
+
+用法：
+  python scripts/build_assets.py
+"""
+from __future__ import annotations
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.assets import DIST_DIRNAME, build_assets  # noqa: E402
+
+STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
+
+
+def main() -> None:
+    manifest = build_assets(STATIC_DIR)
+    total_src = total_out = total_gz = 0
+    for src, out in sorted(manifest.items()):
+        src_size = os.path.getsize(os.path.join(STATIC_DIR, src))
+        out_path = os.path.join(STATIC_DIR, out)
+        out_size = os.path.getsize(out_path)
+        gz_size = os.path.getsize(out_path + ".gz") if os.path.exists(out_path + ".gz") else out_size
+        total_src += src_size
+        total_out += out_size
+        total_gz += gz_size
+        print(f"{src:<36} -> {out:<52} {src_size:>7} B -> {out_size:>7} B (gzip {gz_size:>6} B)")
+    print(f"\n共 {len(manifest)} 个文件：{total_src} B -> {total_out} B，gzip 后 {total_gz} B")
+    print(f"输出目录：{os.path.join(STATIC_DIR, DIST_DIRNAME)}")
+
+
+if __name__ == "__main__":
+    main()
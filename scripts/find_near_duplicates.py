@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+题库近似重复检测工具（MinHash + LSH，见 app/database/dedup.py）
+- 默认：只输出报告（每个簇列出保留的题与重复题、最低相似度）
+- --flag：把重复题的 questions.duplicate_of 指向同簇里 id 最小的题（可用 --unflag 清除）
+- --merge：答题记录/收藏改挂到保留的题，删除重复题，并重算错题数/收藏数计数器与复习排期
+
+用法：
+  python scripts/find_near_duplicates.py [--threshold 0.7] [--flag | --merge | --unflag] [--limit 50] [--db path/to/interview.db]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.database import db  # noqa: E402
+from app.database.dedup import DEFAULT_THRESHOLD, bank_index, flag_clusters, merge_clusters  # noqa: E402
+from app.database.migrations import migrate  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="检测题库中的近似重复题")
+    parser.add_argument("--db", default=db.DB_PATH, help="数据库文件（默认 database/interview.db）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Jaccard 相似度阈值（0~1）")
+    parser.add_argument("--limit", type=int, default=50, help="报告里最多列出的簇数")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--flag", action="store_true", help="标记重复题（duplicate_of）")
+    action.add_argument("--merge", action="store_true", help="合并重复题（改挂答题记录/收藏后删除）")
+    action.add_argument("--unflag", action="store_true", help="清除全部 duplicate_of 标记")
+    args = parser.parse_args()
+
+    db.configure(db_path=args.db)
+    conn = db.get_pool().connection()
+    migrate(conn)
+
+    if args.unflag:
+        n = db.run_write(lambda c: c.execute("UPDATE questions SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL").rowcount)
+        print(f"已清除 {n} 道题的重复标记")
+        return 0
+
+    started = time.perf_counter()
+    index = bank_index(conn, threshold=args.threshold)
+    clusters = index.clusters()
+    elapsed = time.perf_counter() - started
+    titles = {key: title for key, (title, _options) in zip(index.keys, index.texts)}
+
+    dup_count = sum(len(c.keys) - 1 for c in clusters)
+    print(
+        f"共 {len(index)} 道题，候选对 {index.candidates}，发现 {len(clusters)} 个近似重复簇"
+        f"（重复题 {dup_count} 道），耗时 {elapsed:.2f}s"
+    )
+    for c in clusters[: args.limit]:
+        keep, rest = c.keys[0], c.keys[1:]
+        print(f"\n[相似度 >= {c.similarity:.2f}] 保留 #{keep} {titles.get(keep, '')}")
+        for qid in rest:
+            print(f"    重复 #{qid} {titles.get(qid, '')}")
+    if len(clusters) > args.limit:
+        print(f"\n...另有 {len(clusters) - args.limit} 个簇未列出（--limit 调整）")
+
+    if args.flag:
+        n = db.run_write(lambda c: flag_clusters(c, clusters))
+        print(f"\n已标记 {n} 道重复题（questions.duplicate_of）")
+    elif args.merge:
+        n = db.run_write(lambda c: merge_clusters(c, clusters))
+        print(f"\n已合并并删除 {n} 道重复题")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移工具
+- 默认把 database/interview.db 升级到最新版本（Web 启动时也会自动执行）
+- --status 只查看当前版本与待执行的迁移
+
+用法：
+  python scripts/migrate.py [--status] [--db path/to/interview.db]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.database import db  # noqa: E402
+from app.database.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据库迁移")
+    parser.add_argument("--db", default=db.DB_PATH, help="数据库文件（默认 database/interview.db）")
+    parser.add_argument("--status", action="store_true", help="只显示版本信息，不执行迁移")
+    args = parser.parse_args()
+
+    conn = db._connect(args.db)
+    try:
+        version = current_version(conn)
+        pending = [(v, name) for v, name, _ in MIGRATIONS if v > version]
+        print(f"数据库: {os.path.abspath(args.db)}")
+        print(f"当前版本: {version} / 最新版本: {LATEST_VERSION}")
+        for v, name in pending:
+            print(f"  待执行: {v:>3} {name}")
+        if args.status or not pending:
+            return
+        applied = migrate(conn)
+        print(f"已执行 {applied} 步迁移，当前版本: {current_version(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+学习进度汇总表维护工具
+- 默认：从 attempts/favorites 全量重算 progress_daily、user_question_state 与 user_counters
+- --check：只校验汇总表与 attempts 是否一致，不一致时以非 0 退出码结束
+
+用法：
+  python scripts/rebuild_progress.py [--check] [--user-id 1] [--db path/to/interview.db]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.database import db  # noqa: E402
+from app.database.migrations import migrate  # noqa: E402
+from app.database.rollups import check_rollups, rebuild_rollups  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="重算/校验学习进度汇总表")
+    parser.add_argument("--db", default=db.DB_PATH, help="数据库文件（默认 database/interview.db）")
+    parser.add_argument("--check", action="store_true", help="只校验，不重算")
+    parser.add_argument("--user-id", type=int, default=None, help="只重算指定用户")
+    args = parser.parse_args()
+
+    db.configure(db_path=args.db)
+    migrate(db.get_pool().connection())
+
+    if args.check:
+        problems = check_rollups(db.get_pool().connection())
+        if not problems:
+            print("汇总表与 attempts 一致")
+            return 0
+        print(f"发现 {len(problems)} 处不一致：")
+        for p in problems[:50]:
+            if p["problem"] == "counter":
+                print(
+                    f"  [counter] user={p['user_id']} "
+                    f"error_questions 记录/实际={p['error_questions'][0]}/{p['error_questions'][1]} "
+                    f"favorites 记录/实际={p['favorites'][0]}/{p['favorites'][1]}"
+                )
+                continue
+            if p["problem"] == "state":
+                print(f"  [state] user={p['user_id']} question={p['question_id']}")
+                continue
+            print(
+                f"  [{p['problem']}] user={p['user_id']} day={p['day']} "
+                f"category={p['category'] or '未分类'} difficulty={p['difficulty'] or '未知'} "
+                f"total={p['total']} correct={p['correct']}"
+            )
+        print("可执行 python scripts/rebuild_progress.py 重算")
+        return 1
+
+    rows = db.run_write(lambda conn: rebuild_rollups(conn, user_id=args.user_id))
+    print(f"已重算汇总表，共 {rows} 行")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 并发读写压测
+- 多个线程混合执行：进度统计聚合（读）、取题（读）、写练习记录、切换收藏（写）
+- 写操作走 run_write（BEGIN IMMEDIATE + 锁冲突退避重试）
+- 输出吞吐（ops/s）与锁错误次数（重试耗尽后仍失败的写）
+
+默认在 database/interview.db 的副本上运行；--in-place 直接压测原库（结束后删除压测写入的数据）。
+可用 --journal-mode DELETE 对比旧的回滚日志模式。
+
+用法：
+  python scripts/stress_db.py [--threads 8] [--seconds 5] [--write-ratio 0.3] [--journal-mode WAL]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.database import db  # noqa: E402
+from app.database.migrations import migrate  # noqa: E402
+
+STRESS_USER_ID = 1
+
+
+class Counters:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.lock_errors = 0
+        self.other_errors = 0
+
+    def add(self, **kw: int) -> None:
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+
+def _read(conn: sqlite3.Connection, question_ids) -> None:
+    if random.random() < 0.5:
+        conn.execute(
+            """
+            SELECT COUNT(1), SUM(CASE WHEN is_correct=1 THEN 1 ELSE 0 END)
+            FROM attempts WHERE user_id=?
+            """,
+            (STRESS_USER_ID,),
+        ).fetchone()
+    else:
+        qid = random.choice(question_ids)
+        conn.execute("SELECT * FROM questions WHERE id=?", (qid,)).fetchone()
+        conn.execute("SELECT correct_answer FROM answers WHERE question_id=?", (qid,)).fetchone()
+
+
+def _write(pool: db.ConnectionPool, policy: db.RetryPolicy, question_ids) -> None:
+    qid = random.choice(question_ids)
+    if random.random() < 0.8:
+        db.run_write(
+            lambda conn: conn.execute(
+                "INSERT INTO attempts(user_id, question_id, user_answer, is_correct) VALUES(?,?,?,?)",
+                (STRESS_USER_ID, qid, "A", random.randint(0, 1)),
+            ),
+            policy=policy,
+            pool=pool,
+        )
+    else:
+        def _toggle(conn: sqlite3.Connection) -> None:
+            cur = conn.execute(
+                "DELETE FROM favorites WHERE user_id=? AND question_id=?", (STRESS_USER_ID, qid)
+            )
+            if not cur.rowcount:
+                conn.execute(
+                    "INSERT OR IGNORE INTO favorites(user_id, question_id) VALUES(?, ?)",
+                    (STRESS_USER_ID, qid),
+                )
+
+        db.run_write(_toggle, policy=policy, pool=pool)
+
+
+def _worker(pool, policy, question_ids, write_ratio, stop_at, counters: Counters) -> None:
+    try:
+        while time.monotonic() < stop_at:
+            is_write = random.random() < write_ratio
+            try:
+                if is_write:
+                    _write(pool, policy, question_ids)
+                    counters.add(writes=1)
+                else:
+                    _read(pool.connection(), question_ids)
+                    counters.add(reads=1)
+            except sqlite3.OperationalError as e:
+                if db.is_lock_error(e):
+                    counters.add(lock_errors=1)
+                else:
+                    counters.add(other_errors=1)
+    finally:
+        pool.release()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite 并发读写压测")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--journal-mode", default=db.PROFILE.journal_mode)
+    parser.add_argument("--synchronous", default=db.PROFILE.synchronous)
+    parser.add_argument("--busy-timeout-ms", type=int, default=db.PROFILE.busy_timeout_ms)
+    parser.add_argument("--retries", type=int, default=db.RETRY_POLICY.attempts, help="写事务最多尝试次数（1 表示不重试）")
+    parser.add_argument("--in-place", action="store_true", help="直接压测 database/interview.db")
+    args = parser.parse_args()
+
+    profile = replace(
+        db.PROFILE,
+        journal_mode=args.journal_mode.upper(),
+        synchronous=args.synchronous.upper(),
+        busy_timeout_ms=args.busy_timeout_ms,
+    )
+    policy = replace(db.RETRY_POLICY, attempts=max(1, args.retries))
+
+    tmpdir = None
+    db_path = db.DB_PATH
+    if not args.in_place:
+        tmpdir = tempfile.mkdtemp(prefix="stress_db_")
+        db_path = os.path.join(tmpdir, "interview.db")
+        if os.path.exists(db.DB_PATH):
+            src, dst = sqlite3.connect(db.DB_PATH), sqlite3.connect(db_path)
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+
+    pool = db.ConnectionPool(db_path, max_size=args.threads, profile=profile)
+    try:
+        conn = pool.connection()
+        migrate(conn)
+        # journal_mode 持久化在库文件里，可能与本次参数不同，这里显式切换
+        mode = conn.execute(f"PRAGMA journal_mode = {profile.journal_mode}").fetchone()[0]
+        question_ids = [r[0] for r in conn.execute("SELECT id FROM questions")] or [1]
+        max_attempt_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM attempts").fetchone()[0]
+        favorites_before = [tuple(r) for r in conn.execute(
+            "SELECT question_id, collect_time FROM favorites WHERE user_id=?", (STRESS_USER_ID,)
+        )]
+        pool.release()
+
+        counters = Counters()
+        stop_at = time.monotonic() + args.seconds
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(pool, policy, question_ids, args.write_ratio, stop_at, counters),
+            )
+            for _ in range(args.threads)
+        ]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+
+        ops = counters.reads + counters.writes
+        print(f"数据库: {db_path}")
+        print(f"journal_mode={mode} synchronous={profile.synchronous} busy_timeout={profile.busy_timeout_ms}ms "
+              f"重试次数上限={policy.attempts}")
+        print(f"线程 {args.threads}，时长 {elapsed:.1f}s，写比例 {args.write_ratio:.0%}")
+        print(f"吞吐: {ops / elapsed:.1f} ops/s（读 {counters.reads}，写 {counters.writes}）")
+        print(f"锁错误: {counters.lock_errors}，其他错误: {counters.other_errors}")
+
+        if args.in_place:
+            def _cleanup(conn: sqlite3.Connection) -> None:
+                conn.execute("DELETE FROM attempts WHERE id > ?", (max_attempt_id,))
+                conn.execute("DELETE FROM favorites WHERE user_id=?", (STRESS_USER_ID,))
+                conn.executemany(
+                    "INSERT INTO favorites(user_id, question_id, collect_time) VALUES(?, ?, ?)",
+                    [(STRESS_USER_ID, q, t) for q, t in favorites_before],
+                )
+
+            db.run_write(_cleanup, pool=pool)
+            pool.release()
+            print("已清理压测写入的数据")
+    finally:
+        pool.close()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -188,3 +188,20 @@ def populate_db(db_manager):
 
     db_manager.commit()
 
+
+
+@pytest.fixture()
+def app_client(tmp_path):
+    # Web 应用切到临时库（迁移在 create_app 中执行），测试结束后恢复
+    from app.database import db
+
+    original = db.DB_PATH
+    db.configure(db_path=str(tmp_path / 'app.db'))
+    from run import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    try:
+        yield app.test_client()
+    finally:
+        db.configure(db_path=original)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+import pytest
+from flask import Flask, render_template_string
+
+from app.assets import IMMUTABLE_CACHE_CONTROL, build_assets, init_assets, minify_css
+
+TEMPLATE = "{{ asset_url('css/site.css') }} {{ asset_url('js/app.js') }} {{ asset_url('img/logo.png') }}"
+
+
+@pytest.fixture()
+def static_dir(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('/* note */\nbody {\n  color: red;\n}\n' * 50, encoding='utf-8')
+    (tmp_path / 'js' / 'app.js').write_text('console.log(1);\n', encoding='utf-8')
+    return tmp_path
+
+
+def _app(static_dir, production):
+    app = Flask(__name__, static_folder=str(static_dir), static_url_path='/static')
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+    init_assets(app, production=production)
+    return app
+
+
+def test_minify_css_keeps_declarations():
+    css = '/*! license */\n/* comment */\n.a {\n    color: red;\n\n}\n'
+    assert minify_css(css) == '/*! license */\n.a {\ncolor: red;\n}\n'
+
+
+def test_build_writes_hashed_files_and_manifest(static_dir):
+    manifest = build_assets(str(static_dir))
+    assert set(manifest) == {'css/site.css', 'js/app.js'}
+    css_out = static_dir / manifest['css/site.css']
+    assert css_out.name.startswith('site.') and css_out.name != 'site.css'
+    assert b'note' not in css_out.read_bytes()
+    assert gzip.decompress((static_dir / (manifest['css/site.css'] + '.gz')).read_bytes()) == css_out.read_bytes()
+    # 太小的文件压缩后不会更小，不生成 .gz
+    assert not (static_dir / (manifest['js/app.js'] + '.gz')).exists()
+    assert json.loads((static_dir / 'dist' / 'manifest.json').read_text(encoding='utf-8')) == manifest
+
+    # 内容不变则文件名不变；重复构建清理旧产物
+    assert build_assets(str(static_dir)) == manifest
+
+
+def test_min_css_is_minified_too(static_dir):
+    (static_dir / 'css' / 'icons.min.css').write_text('/* icons */\n.fa {\n  display: inline-block;\n}\n', encoding='utf-8')
+    manifest = build_assets(str(static_dir))
+    assert (static_dir / manifest['css/icons.min.css']).read_text(encoding='utf-8') == '.fa {\ndisplay: inline-block;\n}\n'
+
+
+def test_dev_mode_uses_plain_static_urls(static_dir):
+    build_assets(str(static_dir))
+    app = _app(static_dir, production=False)
+    with app.test_request_context():
+        assert render_template_string(TEMPLATE) == '/static/css/site.css /static/js/app.js /static/img/logo.png'
+    resp = app.test_client().get('/static/css/site.css')
+    assert 'immutable' not in resp.headers['Cache-Control']
+    resp.close()
+
+
+def test_production_serves_hashed_gzip_assets(static_dir):
+    manifest = build_assets(str(static_dir))
+    app = _app(static_dir, production=True)
+    with app.test_request_context():
+        css_url, js_url, logo_url = render_template_string(TEMPLATE).split()
+    assert css_url == '/static/' + manifest['css/site.css']
+    assert logo_url == '/static/img/logo.png'
+
+    client = app.test_client()
+    resp = client.get(css_url, headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.headers['Content-Type'].startswith('text/css')
+    assert resp.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert resp.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(resp.get_data()).startswith(b'body')
+    resp.close()
+
+    for accept in ('gzip;q=0, br', 'identity', 'x-gzip-ish'):
+        resp = client.get(css_url, headers={'Accept-Encoding': accept})
+        assert 'Content-Encoding' not in resp.headers, accept
+        resp.close()
+    resp = client.get(css_url, headers={'Accept-Encoding': '*'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    resp.close()
+
+    resp = client.get(css_url)
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.get_data().startswith(b'body')
+    assert resp.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    resp.close()
+
+
+def test_production_without_manifest_falls_back(static_dir):
+    app = _app(static_dir, production=True)
+    with app.test_request_context():
+        assert render_template_string(TEMPLATE).split()[0] == '/static/css/site.css'
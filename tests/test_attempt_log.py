@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+import time
+
+from app.database import db
+from app.database.attempt_log import AttemptLogger, attempt_log
+from app.database.bank import bank_cache
+from app.database.db import ConnectionPool
+from app.database.migrations import migrate
+
+
+def _pool(tmp_path):
+    db_path = str(tmp_path / 'attempts.db')
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO questions(id, category, title) VALUES(?, 'Python Basics', 'Q')", [(i,) for i in range(4000)]
+    )
+    conn.commit()
+    conn.close()
+    return ConnectionPool(db_path)
+
+
+def _row(qid, correct=1):
+    return (1, qid, 'A', correct, 'Python Basics', 'Easy', 1700000000)
+
+
+def _count(pool):
+    return pool.connection().execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+
+
+def test_batches_concurrent_records_into_group_commits(tmp_path):
+    pool = _pool(tmp_path)
+    logger = AttemptLogger(enabled=True, pool=pool, batch_size=50, max_delay=0.05)
+
+    def _producer(base):
+        for i in range(100):
+            logger.record(_row(base + i, correct=i % 2))
+
+    threads = [threading.Thread(target=_producer, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert logger.flush(timeout=10)
+
+    stats = logger.stats()
+    assert stats['written'] == 400 and stats['failed'] == 0
+    assert stats['batches'] < 400 and stats['max_batch'] <= 50
+    assert _count(pool) == 400
+    # 汇总表由触发器维护，批量写入同样生效
+    total, correct = pool.connection().execute("SELECT SUM(total), SUM(correct) FROM progress_daily").fetchone()
+    assert (total, correct) == (400, 200)
+    logger.close(timeout=5)
+    pool.close()
+
+
+def test_full_queue_applies_backpressure_then_falls_back(tmp_path, monkeypatch):
+    pool = _pool(tmp_path)
+    logger = AttemptLogger(enabled=True, pool=pool, queue_size=2, enqueue_timeout=0.05)
+    # 写线程暂不启动：队列只进不出
+    monkeypatch.setattr(logger, '_ensure_writer', lambda: None)
+    logger.record(_row(1))
+    logger.record(_row(2))
+    started = time.monotonic()
+    logger.record(_row(3))  # 队列已满：先等待，超时后同步写入
+    assert time.monotonic() - started >= 0.05
+    assert logger.stats()['sync_fallbacks'] == 1
+    assert _count(pool) == 1
+
+    monkeypatch.undo()
+    logger._ensure_writer()
+    assert logger.flush(timeout=10)
+    assert _count(pool) == 3
+    logger.close(timeout=5)
+    pool.close()
+
+
+def test_close_flushes_pending_records(tmp_path):
+    pool = _pool(tmp_path)
+    logger = AttemptLogger(enabled=True, pool=pool, batch_size=1000, max_delay=10)
+    for i in range(25):
+        logger.record(_row(i))
+    logger.close(timeout=5)
+    assert _count(pool) == 25
+    pool.close()
+
+
+def test_failed_batches_are_retried_then_written_row_by_row(tmp_path, monkeypatch):
+    from app.database import attempt_log as module
+
+    pool = _pool(tmp_path)
+    monkeypatch.setattr(module, 'RETRY_BACKOFF', 0)
+    logger = AttemptLogger(enabled=True, pool=pool, batch_size=10, max_delay=0.05, retries=1)
+
+    # 偶发失败：重试后整批写入
+    real_write = module.write_attempts
+    calls = []
+
+    def _flaky(rows, pool=None):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        real_write(rows, pool=pool)
+
+    monkeypatch.setattr(module, 'write_attempts', _flaky)
+    logger.record(_row(1))
+    logger.record(_row(2))
+    assert logger.flush(timeout=10)
+    assert _count(pool) == 2 and logger.stats()['retried'] == 1
+
+    # 整批一直失败（其中一条违反 NOT NULL）：逐条写入，只丢掉坏的那条
+    monkeypatch.setattr(module, 'write_attempts', real_write)
+    for row in (_row(3), (1, 4, None, 1, 'Python Basics', 'Easy', 1700000000), _row(5)):
+        logger.record(row)
+    assert logger.flush(timeout=10)
+    stats = logger.stats()
+    assert _count(pool) == 4
+    assert (stats['written'], stats['failed'], stats['row_fallbacks']) == (4, 1, 1)
+    assert 'NOT NULL' in stats['last_error']
+    logger.close(timeout=5)
+    pool.close()
+
+
+def test_submit_answer_uses_write_behind_when_enabled(app_client, monkeypatch):
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title) VALUES(1, 'Python Basics', 'Q1')")
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(1, 'A')")
+    bank_cache.invalidate()
+    monkeypatch.setattr(attempt_log, 'enabled', True)
+
+    for _ in range(3):
+        assert app_client.post('/question/api/submit_answer', json={'question_id': 1, 'user_answer': 'A'}).status_code == 200
+    assert attempt_log.flush(timeout=10)
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM attempts WHERE is_correct = 1")['n'] == 3
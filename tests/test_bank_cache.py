@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from app.database import db
+from app.database.bank import BankCache, bank_cache, load_question, load_questions
+from app.database.db import ConnectionPool
+from app.database.migrations import migrate
+
+
+def _seed(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.execute(
+        "INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d, difficulty) "
+        "VALUES(1, 'Python Basics', 'Q1', 'a', 'b', 'c', 'd', 'Easy')"
+    )
+    conn.execute("INSERT INTO answers(question_id, correct_answer, analysis) VALUES(1, 'ca', '解析')")
+    conn.commit()
+    return conn
+
+
+def test_snapshot_served_from_memory_until_version_changes(tmp_path):
+    db_path = str(tmp_path / 'bank.db')
+    writer = _seed(db_path)
+    pool = ConnectionPool(db_path)
+    cache = BankCache(pool=pool, check_interval=60)
+
+    q = cache.get(1)
+    assert q.title == 'Q1'
+    assert q.correct_answer == 'AC'
+    assert q.type == 'multi'
+    assert q.to_payload()['options'][0] == {'option_key': 'A', 'option_content': 'a'}
+    assert cache.get(2) is None
+    assert cache.stats()['reloads'] == 1
+
+    # 检查间隔内不访问数据库
+    writer.execute("UPDATE questions SET title='Q1-new' WHERE id=1")
+    writer.commit()
+    assert cache.get(1).title == 'Q1'
+    assert cache.stats()['reloads'] == 1
+    assert cache.stats()['hits'] >= 2
+
+    cache.invalidate()
+    assert cache.get(1).title == 'Q1-new'
+    assert cache.stats()['reloads'] == 2
+    writer.close()
+    pool.close()
+
+
+def test_unchanged_version_does_not_reload(tmp_path):
+    db_path = str(tmp_path / 'bank.db')
+    writer = _seed(db_path)
+    pool = ConnectionPool(db_path)
+    cache = BankCache(pool=pool, check_interval=0)
+
+    version = cache.version
+    for _ in range(3):
+        cache.get(1)
+    stats = cache.stats()
+    assert stats['reloads'] == 1
+    assert stats['version_checks'] == 4
+
+    # 答案变更同样递增版本号
+    writer.execute("UPDATE answers SET correct_answer='B' WHERE question_id=1")
+    writer.commit()
+    assert cache.get(1).correct_answer == 'B'
+    assert cache.version > version
+    assert cache.stats()['reloads'] == 2
+    writer.close()
+    pool.close()
+
+
+def test_load_questions_chunks_in_list(tmp_path):
+    db_path = str(tmp_path / 'bank.db')
+    conn = _seed(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executemany(
+        "INSERT INTO questions(id, category, title, difficulty) VALUES(?, 'Flask', ?, 'Hard')",
+        [(i, f'Q{i}') for i in range(2, 12)],
+    )
+    conn.commit()
+
+    found = load_questions(conn, [11, 1, 3, 3, 99], chunk_size=2)
+    assert sorted(found) == [1, 3, 11]
+    assert found[1].correct_answer == 'AC'
+    assert found[11].correct_answer == ''
+    assert load_question(conn, 3).title == 'Q3'
+    assert load_question(conn, 99) is None
+    conn.close()
+
+
+def test_batch_endpoint(app_client):
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, difficulty) VALUES(?, 'Python Basics', ?, 'x', 'Easy')",
+            [(i, f'Q{i}') for i in range(1, 4)],
+        )
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(2, 'BD')")
+    bank_cache.invalidate()
+
+    data = app_client.get('/question/api/questions/batch?ids=3,2,42').get_json()
+    assert data['success']
+    assert [q['id'] for q in data['data']] == [3, 2]
+    assert data['data'][1]['type'] == 'multi'
+    assert 'correct_answer' not in data['data'][1]
+    assert data['missing'] == [42]
+
+    assert app_client.get('/question/api/questions/batch?ids=a').status_code == 400
+    assert app_client.get('/question/api/questions/batch').status_code == 400
+
+
+def test_misses_fall_back_to_the_database(tmp_path):
+    db_path = str(tmp_path / 'bank.db')
+    writer = _seed(db_path)
+    pool = ConnectionPool(db_path)
+    cache = BankCache(pool=pool, check_interval=60)
+    assert [q.id for q in cache.get_many([1])] == [1]
+
+    # 快照还没到检查时间，新导入的题按 id 回源取到
+    writer.execute("INSERT INTO questions(id, category, title, difficulty) VALUES(2, 'Flask', 'Q2', 'Hard')")
+    writer.commit()
+    assert [q.id for q in cache.get_many([2, 1, 7])] == [2, 1]
+    assert cache.get(2).title == 'Q2'
+    assert cache.get(7) is None
+    stats = cache.stats()
+    assert stats['reloads'] == 1
+    assert stats['fallback_loads'] == 3
+    writer.close()
+    pool.close()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from app.database.categories import category_key_for, category_key_sql
+from app.database.migrations import migrate
+
+SAMPLES = [
+    'Python Basics', 'python基础', 'Flask Framework', 'Web框架', 'Project Experience',
+    '项目经验', 'Data Structure', 'Algorithm', '', 'BASICS of flask',
+]
+
+
+def test_python_and_sql_rules_agree():
+    conn = sqlite3.connect(':memory:')
+    for text in SAMPLES:
+        sql_key = conn.execute(f"SELECT {category_key_sql(':c')}", {'c': text}).fetchone()[0]
+        assert sql_key == category_key_for(text), text
+    conn.close()
+
+
+def test_category_key_backfilled_and_maintained(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'cat.db'))
+    conn.execute("CREATE TABLE questions (id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT NOT NULL, title TEXT NOT NULL)")
+    conn.execute("INSERT INTO questions(category, title) VALUES('Python Basics', 'old')")
+    conn.commit()
+    migrate(conn)
+    assert conn.execute("SELECT category_key FROM questions WHERE id=1").fetchone()[0] == 'basic'
+
+    conn.execute("INSERT INTO questions(category, title) VALUES('项目实战', 'new')")
+    conn.execute("UPDATE questions SET category='Flask 进阶' WHERE id=1")
+    conn.commit()
+    rows = dict(conn.execute("SELECT id, category_key FROM questions"))
+    assert rows == {1: 'framework', 2: 'project'}
+    conn.close()
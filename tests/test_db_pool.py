@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+
+import pytest
+
+from app.database.db import ConnectionPool, PoolClosed, PoolTimeout, RetryPolicy, SQLiteProfile, run_write
+
+
+def test_pool_reuses_connection_per_thread(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2)
+    conn = pool.connection()
+    assert pool.connection() is conn
+    pool.release()
+    assert pool.connection() is conn
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 1
+    pool.close()
+
+
+def test_pool_max_size_and_timeout(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=1, timeout=0.1)
+    pool.connection()
+    errors = []
+
+    def worker():
+        try:
+            pool.connection()
+        except PoolTimeout as e:
+            errors.append(e)
+
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+    assert len(errors) == 1
+    pool.close()
+
+
+def test_release_rolls_back_and_health_check(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=1, health_check_interval=0)
+    conn = pool.connection()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release()
+
+    conn = pool.connection()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()  # 模拟连接失效，下次借出时应被健康检查剔除
+    pool.release()
+    fresh = pool.connection()
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone()[0] == 1
+    pool.close()
+
+
+def test_closed_pool_rejects_checkout(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'))
+    pool.close()
+    with pytest.raises(PoolClosed):
+        pool.connection()
+
+
+def test_profile_applied_to_new_connections(tmp_path):
+    profile = SQLiteProfile(journal_mode='WAL', synchronous='NORMAL', busy_timeout_ms=1234)
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), profile=profile)
+    conn = pool.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    pool.close()
+
+
+def test_run_write_retries_on_lock(tmp_path):
+    db_path = str(tmp_path / 'pool.db')
+    pool = ConnectionPool(db_path, profile=SQLiteProfile(busy_timeout_ms=0))
+    setup = pool.connection()
+    setup.execute("CREATE TABLE t (x INTEGER)")
+    setup.commit()
+
+    # 另一条连接持有写锁，稍后释放
+    blocker = sqlite3.connect(db_path, timeout=0, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.1, blocker.rollback).start()
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_write(lambda c: c.execute("INSERT INTO t VALUES (1)"), policy=RetryPolicy(attempts=1), pool=pool)
+
+    run_write(
+        lambda c: c.execute("INSERT INTO t VALUES (2)"),
+        policy=RetryPolicy(attempts=20, base_delay=0.01, max_delay=0.05),
+        pool=pool,
+    )
+    assert pool.connection().execute("SELECT x FROM t").fetchall()[0][0] == 2
+    blocker.close()
+    pool.close()
+
+
+def test_discard_counted_for_closed_idle_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2)
+    pool.connection()
+    pool.release()
+    pool.close()
+    assert pool.stats()['discarded'] == 1
+
+
+def test_pool_timeout_returns_503(app_client, monkeypatch):
+    from app.database import db
+
+    monkeypatch.setattr(db, 'POOL_TIMEOUT', 0.05)
+    monkeypatch.setattr(db, 'POOL_SIZE', 1)
+    db.close_pool()
+
+    holder_ready = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        db.get_pool().connection()
+        holder_ready.set()
+        done.wait(5)
+        db.release_connection()
+
+    t = threading.Thread(target=hold)
+    t.start()
+    holder_ready.wait(5)
+    try:
+        page = app_client.get('/progress/')
+        assert page.status_code == 503
+        assert page.headers['Retry-After'] == '1'
+        api = app_client.post('/progress/api/favorite/toggle', json={'question_id': 1})
+        assert api.status_code == 503
+        assert api.get_json()['success'] is False
+    finally:
+        done.set()
+        t.join()
+    assert app_client.get('/progress/').status_code == 200
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import random
+import sqlite3
+
+import pytest
+
+from app.database.dedup import NearDuplicateIndex, bank_index, flag_clusters, jaccard, merge_clusters, shingle_set
+from app.database.importer import SourceLine, near_duplicates
+from app.database.migrations import migrate
+
+BASE = ('Python 中如何定义一个列表？', ['list = []', 'list()', '[1, 2, 3]', '以上都可以'])
+REWORDED = ('python中如何定义列表', ['以上都可以', 'list = []', '[1, 2, 3]', 'list()'])
+OTHER = ('Flask 中如何定义一个路由？', ['@app.route', 'app.url', 'route()', 'flask.path'])
+
+
+def _noise(rng, n):
+    return ''.join(chr(0x4E00 + rng.randrange(3000)) for _ in range(n))
+
+
+def test_reworded_and_reshuffled_questions_cluster():
+    assert shingle_set(*BASE) == shingle_set(BASE[0], list(reversed(BASE[1])))
+    assert jaccard(shingle_set(*BASE), shingle_set(*REWORDED)) >= 0.7
+
+    rng = random.Random(3)
+    index = NearDuplicateIndex()
+    index.add('base', *BASE)
+    for i in range(300):
+        index.add(i, _noise(rng, 12), [_noise(rng, 5) for _ in range(4)])
+    index.add('reworded', *REWORDED)
+    index.add('other', *OTHER)
+    assert not index.add('empty', '', ['', ''])
+
+    clusters = index.clusters()
+    assert [c.keys for c in clusters] == [['base', 'reworded']]
+    assert 0.7 <= clusters[0].similarity < 1
+    # 候选对远少于逐对比较
+    assert index.candidates < 50
+
+
+def test_clusters_are_transitive():
+    index = NearDuplicateIndex(threshold=0.6)
+    index.add(1, 'abcdefghijklmnopqrst')
+    index.add(2, 'abcdefghijklmnopqrsx')
+    index.add(3, 'abcdefghijklmnopqrxy')
+    assert [c.keys for c in index.clusters()] == [[1, 2, 3]]
+
+
+@pytest.fixture()
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'dedup.db'))
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    migrate(conn)
+    for title, options in (BASE, OTHER, REWORDED):
+        qid = conn.execute(
+            'INSERT INTO questions(category, title, option_a, option_b, option_c, option_d) VALUES(?,?,?,?,?,?)',
+            ('Python Basics', title, *options),
+        ).lastrowid
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", (qid,))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_flag_and_merge(conn):
+    clusters = bank_index(conn).clusters()
+    assert [c.keys for c in clusters] == [[1, 3]]
+
+    assert flag_clusters(conn, clusters) == 1
+    assert [tuple(r) for r in conn.execute('SELECT id, duplicate_of FROM questions ORDER BY id')] == [
+        (1, None), (2, None), (3, 1),
+    ]
+
+    conn.execute("INSERT INTO attempts(user_id, question_id, user_answer, is_correct) VALUES(1, 3, 'B', 0)")
+    conn.execute('INSERT INTO favorites(user_id, question_id) VALUES(1, 1)')
+    conn.execute('INSERT INTO favorites(user_id, question_id) VALUES(1, 3)')
+    assert merge_clusters(conn, clusters) == 1
+    conn.commit()
+    assert [r[0] for r in conn.execute('SELECT id FROM questions ORDER BY id')] == [1, 2]
+    assert conn.execute('SELECT question_id FROM attempts').fetchall()[0][0] == 1
+    assert [r[0] for r in conn.execute('SELECT question_id FROM favorites')] == [1]
+    assert tuple(conn.execute('SELECT error_questions, favorites FROM user_counters WHERE user_id = 1').fetchone()) == (1, 1)
+    assert conn.execute('SELECT COUNT(*) FROM questions WHERE duplicate_of IS NOT NULL').fetchone()[0] == 0
+
+
+def test_import_report_mode_does_not_write(conn):
+    title, options = REWORDED
+    records = [
+        {'title': title + '？', 'options': dict(zip('ABCD', options)), 'correct_answer': 'A'},
+        {'title': '一道全新的题目', 'option_a': 'x', 'option_b': 'y', 'option_c': 'z', 'option_d': 'w', 'correct_answer': 'A'},
+        {'title': 'broken'},
+    ]
+    version = conn.execute("SELECT value FROM meta WHERE key = 'bank_version'").fetchone()[0]
+    clusters, stats = near_duplicates(conn, records)
+    assert [c.keys for c in clusters] == [[1, 3, SourceLine(1)]]
+    assert (stats.read, stats.failed) == (3, 1)
+    assert conn.execute("SELECT value FROM meta WHERE key = 'bank_version'").fetchone()[0] == version
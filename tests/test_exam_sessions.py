@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from app.database import db
+from app.database.bank import bank_cache
+from app.database.db import ConnectionPool
+from app.database.exam_sessions import EXAM_SESSION_GRACE, ExamSessionStore, exam_store
+from app.database.migrations import migrate
+
+
+def _seed(n=5):
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, option_b) VALUES(?, 'Python Basics', ?, 'a', 'b')",
+            [(i, f'Q{i}') for i in range(1, n + 1)],
+        )
+        conn.executemany(
+            "INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", [(i,) for i in range(1, n + 1)]
+        )
+    bank_cache.invalidate()
+
+
+def _store(tmp_path, **kwargs):
+    db_path = str(tmp_path / 'exam.db')
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.close()
+    pool = ConnectionPool(db_path)
+    return ExamSessionStore(pool=pool, sweep_interval=0, **kwargs), pool
+
+
+def test_cookie_holds_only_the_session_id_and_exam_resumes(app_client):
+    _seed()
+    start = app_client.post('/exam/api/start', json={'count': 3}).get_json()['data']
+    with app_client.session_transaction() as sess:
+        assert set(sess) == {'exam_id'}
+
+    first = start['question']['id']
+    assert app_client.post('/exam/api/submit', json={'question_id': first, 'user_answer': 'A'}).get_json()['success']
+
+    # 模拟工作进程重启：进程内缓存清空后仍能从表里恢复
+    exam_store.clear_cache()
+    current = app_client.get('/exam/api/question').get_json()['data']
+    assert current['index'] == 2
+    assert current['question']['id'] == start['question_ids'][1]
+    assert current['start_ts'] == start['start_ts']
+
+    stale = app_client.post('/exam/api/submit', json={'question_id': first, 'user_answer': 'A'})
+    assert stale.status_code == 409
+
+    result = app_client.post('/exam/api/finish').get_json()['data']
+    assert (result['total'], result['answered'], result['correct']) == (3, 1, 1)
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM attempts")['n'] == 1
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM exam_sessions")['n'] == 0
+    assert app_client.get('/exam/api/question').status_code == 400
+
+
+def test_stale_revision_does_not_overwrite(tmp_path):
+    store, pool = _store(tmp_path)
+    created = store.create([1, 2, 3], time_limit=600)
+
+    a = store.get(created.id)
+    b = store.get(created.id)
+    a.idx = 1
+    assert store.save(a)
+    b.idx = 2
+    assert not store.save(b)
+    assert store.get(created.id).idx == 1
+    assert store.stats()['conflicts'] == 1
+
+    # 多进程模式下，其他进程改过的会话不会从本进程缓存里读到旧值
+    store.revalidate = True
+    other = ExamSessionStore(pool=pool, sweep_interval=0)
+    moved = other.get(created.id)
+    moved.idx = 3
+    assert other.save(moved)
+    assert store.get(created.id).idx == 3
+    pool.close()
+
+
+def test_sweep_removes_expired_sessions(tmp_path):
+    store, pool = _store(tmp_path)
+    old = store.create([1], time_limit=60, now=1000)
+    live = store.create([1], time_limit=60)
+
+    assert store.get(old.id) is None  # 已过期的不再返回
+    assert store.sweep(now=1000 + 60 + EXAM_SESSION_GRACE) == 1
+    store.clear_cache()
+    assert store.get(old.id) is None
+    assert store.get(live.id).question_ids == [1]
+    assert pool.connection().execute("SELECT COUNT(*) FROM exam_sessions").fetchone()[0] == 1
+    pool.close()
+
+
+def test_bundle_mode_grades_everything_at_finish(app_client):
+    _seed()
+    start = app_client.post('/exam/api/start', json={'count': 4, 'bundle': True}).get_json()['data']
+    assert start['mode'] == 'bundle'
+    assert [q['id'] for q in start['questions']] == start['question_ids']
+    assert all('correct_answer' not in q for q in start['questions'])
+
+    ids = start['question_ids']
+    answers = {str(ids[0]): 'A', str(ids[1]): 'b', str(ids[2]): '', '999': 'A'}
+    result = app_client.post('/exam/api/finish', json={'answers': answers}).get_json()['data']
+    assert (result['total'], result['answered'], result['correct'], result['wrong']) == (4, 2, 1, 1)
+    assert not result['timed_out']
+    assert [r['question_id'] for r in result['results']] == ids
+    assert result['results'][1]['user_answer'] == 'B' and result['results'][1]['correct_answer'] == 'A'
+    assert result['results'][3]['user_answer'] is None
+
+    rows = db.fetch_all("SELECT question_id, is_correct FROM attempts ORDER BY id")
+    assert [(r['question_id'], r['is_correct']) for r in rows] == [(ids[0], 1), (ids[1], 0)]
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM exam_sessions")['n'] == 0
+
+
+def test_conflicting_finish_keeps_the_exam_for_retry(app_client):
+    _seed()
+    ids = app_client.post('/exam/api/start', json={'count': 2, 'bundle': True}).get_json()['data']['question_ids']
+    # 另一个请求抢先改了会话：本进程缓存里的 rev 过期，交卷冲突
+    with db.get_conn() as conn:
+        conn.execute('UPDATE exam_sessions SET rev = rev + 1')
+    answers = {str(ids[0]): 'A', str(ids[1]): 'A'}
+    assert app_client.post('/exam/api/finish', json={'answers': answers}).status_code == 409
+    with app_client.session_transaction() as sess:
+        assert 'exam_id' in sess
+
+    result = app_client.post('/exam/api/finish', json={'answers': answers}).get_json()['data']
+    assert (result['answered'], result['correct']) == (2, 2)
+    with app_client.session_transaction() as sess:
+        assert 'exam_id' not in sess
+
+
+def test_time_limit_is_enforced_on_the_server(app_client, monkeypatch):
+    import time as real_time
+
+    from app.blueprints import interview
+
+    _seed()
+    start = app_client.post('/exam/api/start', json={'count': 2, 'bundle': True, 'time_limit_seconds': 60}).get_json()['data']
+
+    class _Later:
+        @staticmethod
+        def time():
+            return real_time.time() + 60 + interview.DEADLINE_GRACE_SECONDS + 1
+
+    monkeypatch.setattr(interview, 'time', _Later)
+    qid = start['question_ids'][0]
+    assert app_client.post('/exam/api/submit', json={'question_id': qid, 'user_answer': 'A'}).status_code == 400
+
+    result = app_client.post('/exam/api/finish', json={'answers': {str(qid): 'A'}}).get_json()['data']
+    assert result['timed_out'] and result['answered'] == 0
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM attempts")['n'] == 0
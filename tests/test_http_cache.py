@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import json
+import os
+
+import pytest
+
+from app.database import db
+from app.database.bank import bank_cache
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+URLS = [
+    '/question/api/questions?category=basic',
+    '/question/api/question/1',
+    '/question/api/explanation/1?user_answer=A',
+]
+
+
+@pytest.fixture()
+def importer(monkeypatch):
+    spec = importlib.util.spec_from_file_location(
+        'batch_import_questions', os.path.join(PROJECT_ROOT, 'scripts', 'batch_import_questions.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, 'DB_PATH', db.DB_PATH)
+    return module
+
+
+def _import(importer, tmp_path, questions):
+    path = tmp_path / 'questions.json'
+    path.write_text(json.dumps(questions, ensure_ascii=False), encoding='utf-8')
+    assert importer.import_from_json(str(path))
+
+
+def _question(title, answer='A'):
+    return {
+        'category': 'Python Basics', 'title': title, 'correct_answer': answer,
+        'option_a': 'a', 'option_b': 'b', 'option_c': 'c', 'option_d': 'd',
+    }
+
+
+def test_validators_and_304(app_client, importer, tmp_path, monkeypatch):
+    monkeypatch.setattr(bank_cache, 'check_interval', 0)
+    _import(importer, tmp_path, [_question('Q1')])
+
+    for url in URLS:
+        first = app_client.get(url)
+        assert first.status_code == 200
+        assert first.headers['ETag'].startswith('W/"bank-')
+        assert first.headers['Last-Modified']
+        assert first.headers['Cache-Control'] == 'no-cache'
+
+        again = app_client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert again.status_code == 304
+        assert again.data == b''
+        assert again.headers['ETag'] == first.headers['ETag']
+
+        assert app_client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+
+def test_import_invalidates_validators(app_client, importer, tmp_path, monkeypatch):
+    monkeypatch.setattr(bank_cache, 'check_interval', 0)
+    _import(importer, tmp_path, [_question('Q1')])
+
+    etags = {url: app_client.get(url).headers['ETag'] for url in URLS}
+    _import(importer, tmp_path, [_question('Q2', answer='BC')])
+
+    for url, etag in etags.items():
+        resp = app_client.get(url, headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] != etag
+
+    titles = [q['title'] for q in app_client.get(URLS[0]).get_json()['data']]
+    assert titles == ['Q1', 'Q2']
+    assert app_client.get('/question/api/question/2').get_json()['data']['type'] == 'multi'
+
+
+def test_missing_question_not_cached(app_client):
+    resp = app_client.get('/question/api/question/999')
+    assert resp.status_code == 404
+    assert 'ETag' not in resp.headers
+
+
+def test_etag_tracks_update_time_and_build(app_client, importer, tmp_path, monkeypatch):
+    from app.blueprints import caching
+
+    monkeypatch.setattr(bank_cache, 'check_interval', 0)
+    _import(importer, tmp_path, [_question('Q1')])
+    url = URLS[1]
+    etag = app_client.get(url).headers['ETag']
+    snap = bank_cache.snapshot()
+    assert etag == f'W/"bank-{snap.version}-{snap.updated_at}-{caching.build_id()}"'
+
+    # 换了一个版本号相同、变更时间不同的库
+    with db.get_conn() as conn:
+        conn.execute("UPDATE meta SET value = value - 1000 WHERE key = 'bank_updated_at'")
+    bank_cache.invalidate()
+    monkeypatch.setattr(bank_cache, '_snapshot', None)
+    moved = app_client.get(url, headers={'If-None-Match': etag})
+    assert moved.status_code == 200
+
+    # 发版后同一题库版本也不再命中旧缓存
+    monkeypatch.setattr(caching, '_build_id', 'next-release')
+    resp = app_client.get(url, headers={'If-None-Match': moved.headers['ETag']})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'].endswith('-next-release"')
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+
+from app.database import importer
+from app.database.importer import InvalidQuestion, import_file, iter_records, validate
+from app.database.migrations import migrate
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLAT = {
+    'category': 'Python Basics', 'title': 'Q', 'option_a': 'a', 'option_b': 'b',
+    'option_c': 'c', 'option_d': 'd', 'correct_answer': 'b', 'difficulty': 'Medium',
+    'is_high_frequency': True, 'analysis': 'why', 'knowledge_point': 'kp',
+}
+
+
+@pytest.fixture()
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'import.db'))
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _questions(n, start=0):
+    return [dict(FLAT, title=f'Q{i}') for i in range(start, start + n)]
+
+
+def _rows(conn):
+    return conn.execute(
+        'SELECT q.id, q.title, q.category_key, q.is_high_frequency, a.correct_answer '
+        'FROM questions q JOIN answers a ON a.question_id = q.id ORDER BY q.id'
+    ).fetchall()
+
+
+def test_formats_import_the_same_rows(conn, tmp_path):
+    data = _questions(25)
+    (tmp_path / 'q.json').write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    (tmp_path / 'q.jsonl').write_text('\n'.join(json.dumps(q) for q in data) + '\n', encoding='utf-8')
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(FLAT))
+    writer.writeheader()
+    writer.writerows(dict(q, is_high_frequency='1') for q in data)
+    (tmp_path / 'q.csv').write_text(buf.getvalue(), encoding='utf-8-sig')
+
+    stats = import_file(conn, str(tmp_path / 'q.json'), batch_size=10)
+    assert (stats.read, stats.added, stats.failed, stats.batches) == (25, 25, 0, 3)
+    assert stats.rows_per_sec > 0
+    # 三种格式内容相同：后两次全部跳过
+    for name in ('q.jsonl', 'q.csv'):
+        stats = import_file(conn, str(tmp_path / name), batch_size=10)
+        assert (stats.read, stats.added, stats.updated, stats.skipped) == (25, 0, 0, 25)
+
+    rows = _rows(conn)
+    assert [r['title'] for r in rows] == [q['title'] for q in data]
+    assert {(r['category_key'], r['is_high_frequency'], r['correct_answer']) for r in rows} == {('basic', 1, 'B')}
+
+
+def test_json_array_is_parsed_incrementally(tmp_path, monkeypatch):
+    # 读取块远小于单个元素：元素跨越多个块边界仍能正确解析
+    monkeypatch.setattr(importer, 'JSON_READ_SIZE', 7)
+    data = _questions(5) + [123, 'x']
+    path = tmp_path / 'q.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    assert list(iter_records(str(path))) == data
+
+    path.write_text('[]', encoding='utf-8')
+    assert list(iter_records(str(path))) == []
+    path.write_text('{"title": "Q"}', encoding='utf-8')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_records(str(path)))
+
+
+def test_nested_options_format():
+    row = validate({
+        'title': 'T', 'options': {'A': 'x', 'B': 'y', 'C': 'z', 'D': 'w'},
+        'correct_answer': 'C', 'category': 'Flask', 'difficulty': 'Hard', 'frequency': 3,
+    })
+    assert row.options == ('x', 'y', 'z', 'w')
+    assert (row.category_key, row.is_high_frequency, row.correct_answer) == ('framework', 1, 'C')
+    assert validate(dict(FLAT, is_high_frequency='false')).is_high_frequency == 0
+    listed = validate({'title': 'T', 'options': [{'option_key': 'A', 'option_content': 'x'}, 'y'], 'correct_answer': 'ab'})
+    assert listed.options == ('x', 'y', '', '') and listed.correct_answer == 'AB'
+
+
+def test_seed_file_imports(conn):
+    path = os.path.join(PROJECT_ROOT, 'data', 'initial_questions.json')
+    with open(path, encoding='utf-8') as f:
+        expected = len(json.load(f))
+    stats = import_file(conn, path)
+    assert stats.failed == 0 and stats.imported == expected == len(_rows(conn))
+
+
+def test_bad_rows_are_reported_and_skipped(conn, tmp_path):
+    lines = [json.dumps(FLAT), '{broken', json.dumps(dict(FLAT, correct_answer='X')),
+             json.dumps({'title': 'no options', 'correct_answer': 'A'}), json.dumps(dict(FLAT, title='ok'))]
+    path = tmp_path / 'q.jsonl'
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    stats = import_file(conn, str(path), batch_size=2)
+    assert (stats.read, stats.imported, stats.failed) == (5, 2, 3)
+    assert len(stats.errors) == 3 and stats.errors[0].startswith('第 2 条')
+    assert [r['title'] for r in _rows(conn)] == ['Q', 'ok']
+    with pytest.raises(InvalidQuestion):
+        validate(dict(FLAT, option_c='', correct_answer='C'))
+
+
+def test_ids_continue_after_deleted_rows(conn, tmp_path):
+    path = tmp_path / 'q.jsonl'
+    path.write_text('\n'.join(json.dumps(q) for q in _questions(3)), encoding='utf-8')
+    import_file(conn, str(path))
+    conn.execute('DELETE FROM questions WHERE id = 3')
+    conn.commit()
+    import_file(conn, str(path))
+    # AUTOINCREMENT 语义：删掉的 id 不复用，之后普通 INSERT 也不会撞 id
+    assert [r['id'] for r in _rows(conn)] == [1, 2, 4]
+    conn.execute("INSERT INTO questions(category, title) VALUES('c', 't')")
+    assert conn.execute('SELECT MAX(id) FROM questions').fetchone()[0] == 5
+
+
+def _write_jsonl(path, questions):
+    path.write_text('\n'.join(json.dumps(q, ensure_ascii=False) for q in questions), encoding='utf-8')
+    return str(path)
+
+
+def _bank_version(conn):
+    return conn.execute("SELECT value FROM meta WHERE key = 'bank_version'").fetchone()[0]
+
+
+def test_reimport_upserts_changes_and_skips_the_rest(conn, tmp_path):
+    data = _questions(30)
+    path = _write_jsonl(tmp_path / 'q.jsonl', data)
+    assert import_file(conn, path, batch_size=8).added == 30
+
+    version = _bank_version(conn)
+    stats = import_file(conn, path, batch_size=8)
+    assert (stats.added, stats.updated, stats.skipped) == (0, 0, 30)
+    # 没有变化时不写库
+    assert _bank_version(conn) == version
+
+    data[3] = dict(data[3], correct_answer='C', analysis='new')
+    data[4] = dict(data[4], difficulty='Hard')
+    # 题干只差大小写/空白，视为同一道题
+    data[5] = dict(data[5], title='  q5 ', is_high_frequency=False)
+    stats = import_file(conn, _write_jsonl(tmp_path / 'q2.jsonl', data + [dict(FLAT, title='new one')]))
+    assert (stats.added, stats.updated, stats.skipped) == (1, 3, 27)
+    row = conn.execute(
+        'SELECT a.correct_answer, a.analysis FROM answers a JOIN questions q ON q.id = a.question_id WHERE q.title = ?',
+        ('Q3',),
+    ).fetchone()
+    assert tuple(row) == ('C', 'new')
+    assert conn.execute("SELECT difficulty FROM questions WHERE title = 'Q4'").fetchone()[0] == 'Hard'
+    assert conn.execute("SELECT is_high_frequency FROM questions WHERE title = 'Q5'").fetchone()[0] == 0
+    assert conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0] == 31
+
+
+def test_duplicates_inside_one_file_and_unhashed_rows(conn, tmp_path):
+    # 不经过导入写入的题目（content_hash 为空）导入前先补指纹，不会重复
+    conn.execute("INSERT INTO questions(category, title, option_a, option_b, option_c, option_d) VALUES('c', 'Q0', 'a', 'b', 'c', 'd')")
+    conn.commit()
+    data = [FLAT, FLAT, dict(FLAT, analysis='later'), dict(FLAT, title='Q0')]
+    stats = import_file(conn, _write_jsonl(tmp_path / 'q.jsonl', data))
+    assert (stats.added, stats.updated, stats.skipped) == (1, 2, 1)
+    assert conn.execute("SELECT analysis FROM answers WHERE analysis = 'later'").fetchone() is not None
+    assert conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0] == 2
+    assert conn.execute('SELECT COUNT(*) FROM questions WHERE content_hash IS NULL').fetchone()[0] == 0
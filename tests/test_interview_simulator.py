@@ -15,3 +15,35 @@ def test_generate_and_save_exam(db_manager):
     sim.save_exam_record(user_answers)
     row = db_manager.query("SELECT COUNT(*) as cnt FROM user_records WHERE exam_id = ?;", (sim.exam_id,)).fetchone()
     assert row['cnt'] == len(user_answers)
+
+
+def test_web_exam_is_recorded(app_client):
+    from app.database import db
+    from app.database.bank import bank_cache
+
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, option_b) VALUES(?, 'Python Basics', ?, 'a', 'b')",
+            [(i, f'Q{i}') for i in range(1, 5)],
+        )
+        conn.executemany("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", [(i,) for i in range(1, 5)])
+    bank_cache.invalidate()
+
+    start = app_client.post('/exam/api/start', json={'count': 3}).get_json()['data']
+    first = start['question']['id']
+    app_client.post('/exam/api/submit', json={'question_id': first, 'user_answer': 'A'})
+    rest = {str(q): 'B' for q in start['question_ids'][1:]}
+    app_client.post('/exam/api/finish', json={'answers': rest})
+
+    with db.get_conn() as conn:
+        exam = conn.execute('SELECT id, question_ids, answered, correct, finished_ts FROM exams').fetchone()
+        assert (exam['answered'], exam['correct']) == (3, 1) and exam['finished_ts']
+        assert conn.execute('SELECT COUNT(*) FROM attempts WHERE exam_id = ?', (exam['id'],)).fetchone()[0] == 3
+
+    sim = InterviewSimulator()
+    assert sim.finished_count() == 1
+    questions = sim.generate_exam(category='basic', count=2)
+    sim.start_exam()
+    summary = sim.save_exam_record({str(questions[0]['id']): 'a', '999': 'A'})
+    assert (summary['total'], summary['answered'], summary['correct']) == (2, 1, 1)
+    assert sim.finished_count() == 2
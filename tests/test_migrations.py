@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from app.database.migrations import LATEST_VERSION, current_version, migrate
+
+
+def _tables(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+def test_migrate_fresh_database(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'fresh.db'))
+    applied = migrate(conn)
+    assert applied >= 1
+    assert current_version(conn) == LATEST_VERSION
+    assert {'users', 'questions', 'answers', 'attempts', 'favorites'} <= _tables(conn)
+    assert conn.execute("SELECT username FROM users WHERE id=1").fetchone()[0] == 'local_user'
+    # 已是最新版本时不再执行任何步骤
+    assert migrate(conn) == 0
+    conn.close()
+
+
+def test_migrate_legacy_database(db_manager):
+    # conftest 建出的是 scripts/init_db.py 时代的旧表结构
+    conn = sqlite3.connect(db_manager.db_path)
+    try:
+        conn.execute("PRAGMA user_version = 0")
+        migrate(conn)
+        assert current_version(conn) == LATEST_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+def test_content_hash_backfill_keeps_duplicates_unhashed(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'dup.db'))
+    migrate(conn)
+    conn.execute("PRAGMA user_version = 10")
+    conn.execute("DROP INDEX idx_questions_content_hash")
+    conn.execute("UPDATE questions SET content_hash = NULL")
+    for title in ('Same', ' same ', 'Other'):
+        conn.execute(
+            "INSERT INTO questions(category, title, option_a, option_b, option_c, option_d) VALUES('c', ?, 'a', 'b', 'c', 'd')",
+            (title,),
+        )
+    conn.commit()
+    migrate(conn)
+    hashes = [r[0] for r in conn.execute("SELECT content_hash FROM questions ORDER BY id")]
+    assert hashes[0] and hashes[2] and hashes[1] is None
+    assert conn.execute("PRAGMA index_info(idx_questions_content_hash)").fetchone() is not None
+    conn.close()
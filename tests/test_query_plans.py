@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+EXPLAIN QUERY PLAN 回归测试：首页、进度相关页面与分类题目列表执行的每条 SELECT 都必须走索引。
+通过连接的 trace 回调收集请求中实际执行的 SQL（参数已展开），再逐条检查执行计划。
+"""
+import re
+import sqlite3
+import time
+
+import pytest
+
+from app.database import db
+
+# 允许整表扫描的表：users 只有本地用户一行
+FULL_SCAN_ALLOWED = {'users'}
+
+PAGES = [
+    '/',
+    '/progress/',
+    '/progress/errors',
+    '/progress/errors?show=mastered',
+    '/progress/favorites',
+    '/progress/api/review/next',
+    '/progress/api/review/batch?limit=5',
+    '/question/api/questions?category=basic',
+    '/question/api/questions?category=basic&difficulty=Easy&after=1',
+    '/question/api/questions?high_frequency=1',
+]
+
+
+@pytest.fixture()
+def traced_statements(monkeypatch, app_client):
+    statements = []
+    original = db._connect
+
+    def _traced_connect(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    # 丢弃已建好的连接，确保之后的连接都带 trace
+    db.configure()
+    monkeypatch.setattr(db, '_connect', _traced_connect)
+
+    now = int(time.time())
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d, difficulty) "
+            "VALUES(?,?,?,?,?,?,?,?)",
+            [(i, 'Python Basics', f'Q{i}', 'a', 'b', 'c', 'd', 'Easy') for i in range(1, 6)],
+        )
+        conn.executemany(
+            "INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty, created_ts) "
+            "VALUES(1,?,?,?,?,?,?)",
+            [(i, 'A', i % 2, 'Python Basics', 'Easy', now - i * 3600) for i in range(1, 6)],
+        )
+        conn.execute("INSERT INTO favorites(user_id, question_id) VALUES(1, 1)")
+    db.release_connection()
+    statements.clear()
+    return statements
+
+
+def _full_scans(conn, sql):
+    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+    derived = {m.group(1) for d in plan for m in [re.match(r'(?:MATERIALIZE|CO-ROUTINE) (\w+)', d)] if m}
+    scans = []
+    for detail in plan:
+        m = re.match(r'SCAN (\w+)', detail)
+        if m and m.group(1) not in derived and m.group(1) not in FULL_SCAN_ALLOWED:
+            scans.append(detail)
+    return plan, scans
+
+
+def test_progress_and_index_queries_use_indexes(app_client, traced_statements):
+    for path in PAGES:
+        assert app_client.get(path).status_code == 200
+
+    selects = [s for s in traced_statements if s.lstrip().upper().startswith('SELECT')]
+    assert selects
+
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        for sql in selects:
+            plan, scans = _full_scans(conn, sql)
+            assert not scans, f"全表扫描: {scans}\nSQL: {' '.join(sql.split())}\nPLAN: {plan}"
+    finally:
+        conn.close()
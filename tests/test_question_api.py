@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from app.database import db
+from app.database.bank import bank_cache
+
+
+def _seed(n=12):
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, difficulty, is_high_frequency) VALUES(?,?,?,?,?)",
+            [
+                (i, 'Python Basics' if i % 3 else 'Flask', f'Q{i}', ('Easy', 'Hard')[i % 2], int(i % 4 == 0))
+                for i in range(1, n + 1)
+            ],
+        )
+
+
+def test_questions_keyset_pagination(app_client):
+    _seed()
+    first = app_client.get('/question/api/questions?category=basic&limit=3').get_json()
+    assert [q['id'] for q in first['data']] == [1, 2, 4]
+    assert first['total'] == 8
+    assert first['has_more'] and first['next_cursor'] == 4
+    assert set(first['data'][0]) == {'id', 'title', 'category'}
+
+    seen = [q['id'] for q in first['data']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = app_client.get(f'/question/api/questions?category=basic&limit=3&after={cursor}').get_json()
+        assert 'total' not in page
+        seen += [q['id'] for q in page['data']]
+        cursor = page['next_cursor']
+    assert seen == [1, 2, 4, 5, 7, 8, 10, 11]
+
+
+def test_questions_filters_and_fields(app_client):
+    _seed()
+    data = app_client.get('/question/api/questions?difficulty=Hard&high_frequency=0&fields=difficulty').get_json()
+    assert [q['id'] for q in data['data']] == [1, 3, 5, 7, 9, 11]
+    assert data['data'][0] == {'id': 1, 'difficulty': 'Hard'}
+    assert not data['has_more'] and data['next_cursor'] is None
+
+    assert app_client.get('/question/api/questions?limit=10000').get_json()['total'] == 12
+    assert len(app_client.get('/question/api/questions?limit=10000').get_json()['data']) == 12
+
+    assert app_client.get('/question/api/questions?fields=option_a').status_code == 400
+    assert app_client.get('/question/api/questions?difficulty=Extreme').status_code == 400
+    assert app_client.get('/question/api/questions?after=x').status_code == 400
+
+
+def test_difficulty_filter_accepts_stored_values(app_client):
+    _seed(4)
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title, difficulty) VALUES(5, 'Flask', 'Q5', '中等')")
+    bank_cache.invalidate()
+    data = app_client.get('/question/api/questions?difficulty=中等').get_json()
+    assert [q['id'] for q in data['data']] == [5]
+    assert app_client.get('/question/api/questions?difficulty=Medium').status_code == 400
+
+
+def test_submit_normalizes_like_the_bank(app_client):
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title) VALUES(1, 'Python Basics', 'Q1')")
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(1, 'c, a')")
+    bank_cache.invalidate()
+    resp = app_client.post('/question/api/submit_answer', json={'question_id': 1, 'user_answer': 'ca'}).get_json()
+    assert resp['data']['is_correct'] is True
+    assert resp['data']['correct_answer'] == 'AC'
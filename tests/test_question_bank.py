@@ -20,3 +20,50 @@ def test_search_question(db_manager):
     results = qb.search_question('print')
     assert isinstance(results, list)
     assert any('print' in item['title'].lower() for item in results)
+
+
+def _migrated_bank(tmp_path, cache_size=4):
+    import sqlite3
+
+    from app.database.db_manager import DBManager
+    from app.database.migrations import migrate
+
+    db_path = str(tmp_path / 'bank.db')
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d, difficulty) "
+        "VALUES(?, ?, ?, 'a', 'b', 'c', 'd', 'Easy')",
+        [(i, 'Python Basics' if i % 2 else 'Flask Framework', f'Q{i}') for i in range(1, 11)],
+    )
+    conn.executemany("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'ba')", [(i,) for i in range(1, 11)])
+    conn.commit()
+    conn.close()
+    dbm = DBManager(db_path=db_path)
+    return dbm, QuestionBank(dbm, cache_size=cache_size)
+
+
+def test_payloads_are_memoized_and_bounded(tmp_path):
+    dbm, qb = _migrated_bank(tmp_path)
+    first = qb.get_question_by_id(1)
+    assert first['correct_answer'] == 'AB' and first['category_key'] == 'basic'
+    assert qb.get_question_by_id(1) is first
+    assert qb.get_question_by_id(99) is None
+
+    page = qb.get_questions_by_category('basic', limit=2)
+    assert [q['id'] for q in page['questions']] == [1, 3]
+    assert page['has_more'] and page['next_cursor'] == 3 and page['total'] == 5
+    nxt = qb.get_questions_by_category('Python Basics', after=3, limit=2, fields=['id', 'category_key'])
+    assert nxt['questions'] == [{'id': 5, 'category_key': 'basic'}, {'id': 7, 'category_key': 'basic'}]
+    assert 'total' not in nxt
+
+    for i in range(1, 11):
+        qb.get_payload(i)
+    assert qb.stats()['cached'] == 4
+
+    # 题库版本变化后缓存整体失效
+    with dbm.conn:
+        dbm.execute("UPDATE questions SET title = 'Q1-new' WHERE id = 1")
+    qb.invalidate()
+    assert qb.get_question_by_id(1)['title'] == 'Q1-new'
+    dbm.close()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import time
+
+from app.database.migrations import migrate
+from app.database.review_schedule import FIRST_INTERVAL, RELEARN_SECONDS, SECOND_INTERVAL, rebuild_review_schedule
+
+
+def _schedule(conn):
+    return conn.execute('SELECT question_id, reps, interval, due_at FROM review_schedule ORDER BY question_id').fetchall()
+
+
+def test_schedule_follows_answers_and_rebuild_agrees(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'review.db'))
+    migrate(conn)
+    conn.executemany("INSERT INTO questions(id, category, title) VALUES(?, 'Python Basics', ?)", [(1, 'q1'), (2, 'q2'), (3, 'q3')])
+    t = 1700000000
+
+    def answer(qid, is_correct, ts):
+        conn.execute(
+            "INSERT INTO attempts(user_id, question_id, user_answer, is_correct, created_ts) VALUES(1, ?, 'A', ?, ?)",
+            (qid, is_correct, ts),
+        )
+
+    answer(1, 0, t)
+    assert _schedule(conn) == [(1, 0, RELEARN_SECONDS, t + RELEARN_SECONDS)]
+    answer(1, 1, t + 100)
+    answer(1, 1, t + 200)
+    answer(2, 1, t)  # 不在队列里的题答对不入队
+    conn.execute("INSERT INTO favorites(user_id, question_id, collect_time) VALUES(1, 3, datetime(?, 'unixepoch'))", (t + 300,))
+    conn.commit()
+    assert _schedule(conn) == [
+        (1, 2, SECOND_INTERVAL, t + 200 + SECOND_INTERVAL),
+        (3, 0, 0, t + 300),
+    ]
+    answer(3, 1, t + 400)
+    assert _schedule(conn)[1] == (3, 1, FIRST_INTERVAL, t + 400 + FIRST_INTERVAL)
+
+    before = conn.execute('SELECT * FROM review_schedule ORDER BY 1, 2').fetchall()
+    rebuild_review_schedule(conn)
+    assert conn.execute('SELECT * FROM review_schedule ORDER BY 1, 2').fetchall() == before
+
+    # 取消收藏：没答错过的题移出队列，答错过的保留
+    conn.execute('INSERT INTO favorites(user_id, question_id) VALUES(1, 1)')
+    conn.execute('DELETE FROM favorites')
+    assert [r[0] for r in _schedule(conn)] == [1]
+    conn.close()
+
+
+def test_review_endpoints_return_due_questions(app_client):
+    from app.database import db
+    from app.database.bank import bank_cache
+
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, option_b) VALUES(?, 'Python Basics', ?, 'a', 'b')",
+            [(1, 'Q1'), (2, 'Q2'), (3, 'Q3')],
+        )
+        conn.executemany("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", [(1,), (2,), (3,)])
+    bank_cache.invalidate()
+
+    assert app_client.get('/progress/api/review/next').get_json()['data'] is None
+
+    app_client.post('/question/api/submit_answer', json={'question_id': 1, 'user_answer': 'B'})
+    app_client.post('/progress/api/favorite/toggle', json={'question_id': 2})
+    # 错题 10 分钟后才到期，收藏的题立即到期
+    res = app_client.get('/progress/api/review/next').get_json()
+    assert (res['data']['id'], res['data']['review']['reps'], res['due_count']) == (2, 0, 1)
+    assert 'correct_answer' not in res['data']
+    assert res['next_due_at'] > time.time()
+
+    with db.get_conn() as conn:
+        conn.execute('UPDATE review_schedule SET due_at = due_at - 3600')
+    batch = app_client.get('/progress/api/review/batch?limit=1').get_json()
+    assert (len(batch['data']), batch['due_count'], batch['has_more']) == (1, 2, True)
+    assert [q['id'] for q in app_client.get('/progress/api/review/batch').get_json()['data']] == [2, 1]
+
+    # 答对后推后一天，不再到期
+    app_client.post('/question/api/submit_answer', json={'question_id': 2, 'user_answer': 'A'})
+    res = app_client.get('/progress/api/review/batch').get_json()
+    assert [q['id'] for q in res['data']] == [1]
+    assert app_client.get('/progress/api/review/batch?limit=x').status_code == 400
+
+
+def test_merged_question_leaves_review_queue(tmp_path):
+    from app.core.review_scheduler import ReviewScheduler
+    from app.database.db_manager import DBManager
+    from app.database.dedup import bank_index, merge_clusters
+
+    path = str(tmp_path / 'merge.db')
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    for title, options in (
+        ('Python 中如何定义一个列表？', ['list = []', 'list()', '[1, 2, 3]', '以上都可以']),
+        ('python中如何定义列表', ['以上都可以', 'list = []', '[1, 2, 3]', 'list()']),
+    ):
+        qid = conn.execute(
+            "INSERT INTO questions(category, title, option_a, option_b, option_c, option_d) VALUES('Python Basics', ?,?,?,?,?)",
+            (title, *options),
+        ).lastrowid
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", (qid,))
+    conn.execute("INSERT INTO attempts(user_id, question_id, user_answer, is_correct, created_ts) VALUES(1, 2, 'B', 0, 1)")
+    conn.commit()
+    assert [r[0] for r in _schedule(conn)] == [2]
+
+    assert merge_clusters(conn, bank_index(conn).clusters()) == 1
+    conn.commit()
+    # 答题记录改挂到保留的题，排期随之重算
+    assert [r[0] for r in _schedule(conn)] == [1]
+
+    dbm = DBManager(db_path=path)
+    try:
+        page = ReviewScheduler(dbm).due(now=10 ** 10)
+        assert ([q['id'] for q in page['questions']], page['due_count']) == ([1], 1)
+
+        conn.execute('DELETE FROM answers WHERE question_id = 1')
+        conn.execute('DELETE FROM questions WHERE id = 1')
+        conn.commit()
+        assert _schedule(conn) == []
+        page = ReviewScheduler(dbm).due(now=10 ** 10)
+        assert (page['questions'], page['due_count'], page['next_due_at']) == ([], 0, None)
+    finally:
+        dbm.close()
+        conn.close()
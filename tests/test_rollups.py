@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import time
+
+from app.database.migrations import migrate
+from app.database.rollups import check_rollups, local_day, rebuild_rollups
+
+
+def _db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'rollup.db'))
+    migrate(conn)
+    conn.execute("INSERT INTO questions(id, category, title) VALUES(1, 'Python Basics', 'q')")
+    conn.commit()
+    return conn
+
+
+def _insert(conn, is_correct, ts, category='Python Basics', difficulty='Easy'):
+    conn.execute(
+        "INSERT INTO attempts(user_id, question_id, user_answer, is_correct, category, difficulty, created_ts) "
+        "VALUES(1, 1, 'A', ?, ?, ?, ?)",
+        (is_correct, category, difficulty, ts),
+    )
+
+
+def test_rollups_follow_attempt_writes(tmp_path):
+    conn = _db(tmp_path)
+    now = int(time.time())
+    _insert(conn, 1, now)
+    _insert(conn, 0, now)
+    _insert(conn, 1, now - 3 * 86400, difficulty='Hard')
+    _insert(conn, 0, now, category=None, difficulty=None)
+    conn.commit()
+
+    rows = conn.execute("SELECT SUM(total), SUM(correct) FROM progress_daily WHERE user_id=1").fetchone()
+    assert rows == (4, 2)
+    assert check_rollups(conn) == []
+
+    conn.execute("DELETE FROM attempts WHERE difficulty='Hard'")
+    conn.commit()
+    assert check_rollups(conn) == []
+    conn.close()
+
+
+def test_check_detects_drift_and_rebuild_fixes(tmp_path):
+    conn = _db(tmp_path)
+    _insert(conn, 1, int(time.time()))
+    conn.execute("UPDATE progress_daily SET total = total + 5")
+    conn.commit()
+    problems = check_rollups(conn)
+    assert {p['problem'] for p in problems} == {'missing', 'unexpected'}
+
+    rebuild_rollups(conn)
+    conn.commit()
+    assert check_rollups(conn) == []
+    conn.close()
+
+
+def test_days_bucketed_in_local_time(tmp_path, monkeypatch):
+    from app.database import rollups
+    from app.database.migrations import sync_day_offset
+
+    monkeypatch.setattr(rollups, 'DAY_OFFSET_SECONDS', 8 * 3600)
+    conn = _db(tmp_path)
+    # 2024-01-01 23:30 UTC = 2024-01-02 07:30 北京时间
+    _insert(conn, 1, 1704151800)
+    conn.commit()
+    assert conn.execute("SELECT day FROM progress_daily").fetchone()[0] == '2024-01-02'
+    assert local_day(1704151800) == '2024-01-02'
+    assert not sync_day_offset(conn)
+
+    # 改成 UTC：启动时重建触发器并重算，Python 与 SQL 的日期边界保持一致
+    monkeypatch.setattr(rollups, 'DAY_OFFSET_SECONDS', 0)
+    assert sync_day_offset(conn)
+    assert conn.execute("SELECT day FROM progress_daily").fetchone()[0] == '2024-01-01'
+    assert local_day(1704151800) == '2024-01-01'
+    _insert(conn, 0, 1704151800)
+    conn.commit()
+    assert conn.execute("SELECT day, total FROM progress_daily").fetchall() == [('2024-01-01', 2)]
+    assert check_rollups(conn) == []
+    conn.close()
+
+
+def test_error_and_favorite_counters(tmp_path):
+    conn = _db(tmp_path)
+    conn.execute("INSERT INTO questions(id, category, title) VALUES(2, 'Flask', 'q2')")
+    now = int(time.time())
+    _insert(conn, 0, now)
+    _insert(conn, 0, now)
+    _insert(conn, 1, now)
+    conn.execute(
+        "INSERT INTO attempts(user_id, question_id, user_answer, is_correct, created_ts) VALUES(1, 2, 'B', 0, ?)", (now,)
+    )
+    conn.execute("INSERT INTO favorites(user_id, question_id) VALUES(1, 1)")
+    conn.execute("INSERT INTO favorites(user_id, question_id) VALUES(1, 2)")
+    conn.commit()
+
+    def counters():
+        return conn.execute("SELECT error_questions, favorites FROM user_counters WHERE user_id=1").fetchone()
+
+    # 题 1 最后一次答对，已移出错题本
+    assert counters() == (1, 2)
+    conn.execute("DELETE FROM attempts WHERE question_id=1 AND is_correct=1")
+    assert counters() == (2, 2)  # 最近一次又是答错
+    conn.execute("DELETE FROM attempts WHERE question_id=1")
+    conn.execute("DELETE FROM favorites WHERE question_id=2")
+    conn.commit()
+    assert counters() == (1, 1)
+    assert check_rollups(conn) == []
+
+    conn.execute("UPDATE user_counters SET favorites = 7")
+    conn.commit()
+    problems = check_rollups(conn)
+    assert problems == [{'problem': 'counter', 'user_id': 1, 'error_questions': (1, 1), 'favorites': (7, 1)}]
+    rebuild_rollups(conn)
+    conn.commit()
+    assert check_rollups(conn) == []
+    conn.close()
+
+
+def test_question_state_follows_attempts(tmp_path):
+    conn = _db(tmp_path)
+    now = int(time.time())
+    for is_correct, ts in ((0, now - 30), (1, now - 20), (0, now - 10), (1, now), (1, now - 5)):
+        _insert(conn, is_correct, ts)
+    conn.commit()
+
+    state = conn.execute(
+        "SELECT attempts, wrong, last_correct, last_ts, streak FROM user_question_state WHERE user_id=1 AND question_id=1"
+    ).fetchone()
+    assert state == (5, 2, 1, now, 2)
+    assert check_rollups(conn) == []
+
+    conn.execute("UPDATE user_question_state SET streak = 9")
+    conn.commit()
+    assert check_rollups(conn) == [{'problem': 'state', 'user_id': 1, 'question_id': 1}]
+    rebuild_rollups(conn, user_id=1)
+    conn.commit()
+    assert check_rollups(conn) == []
+    conn.close()
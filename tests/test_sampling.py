@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import random
+from collections import Counter
+
+from app.database import db
+from app.database.bank import BankSnapshot, QuestionRecord, bank_cache
+from app.database.sampling import SamplingIndex, sampling_index
+
+
+def _record(qid, category_key='basic', difficulty='Easy', hf=0):
+    return QuestionRecord(qid, 'c', category_key, f'Q{qid}', ('a', 'b', 'c', 'd'), difficulty, hf, 'A', '', '')
+
+
+def _index(records):
+    return SamplingIndex(BankSnapshot(1, {r.id: r for r in records}))
+
+
+def test_sample_is_distinct_and_respects_categories():
+    records = [_record(i, 'basic' if i % 2 else 'framework') for i in range(1, 1001)]
+    index = _index(records)
+    picked = index.sample(50, ('basic',), rng=random.Random(1))
+    assert len(picked) == len(set(picked)) == 50
+    assert all(i % 2 for i in picked)
+    # 题不够时返回全部
+    assert index.sample(50, ('project',)) == []
+    assert len(_index(records[:10]).sample(50, ('basic', 'framework'))) == 10
+
+
+def test_stratified_mix_and_shortfall():
+    records = (
+        [_record(i, difficulty='Easy') for i in range(1, 101)]
+        + [_record(i, difficulty='Medium') for i in range(101, 201)]
+        + [_record(i, difficulty='Hard') for i in range(201, 203)]
+    )
+    index = _index(records)
+    diff = {r.id: r.difficulty for r in records}
+
+    picked = index.sample(10, ('basic',), difficulty_mix={'Easy': 40, 'Medium': 40, 'Hard': 20}, rng=random.Random(2))
+    assert Counter(diff[i] for i in picked) == {'Easy': 4, 'Medium': 4, 'Hard': 2}
+
+    # Hard 只有 2 道：差额挪给其他难度，总数不变
+    picked = index.sample(20, ('basic',), difficulty_mix={'Easy': 1, 'Medium': 1, 'Hard': 2}, rng=random.Random(3))
+    counts = Counter(diff[i] for i in picked)
+    assert len(picked) == 20 and counts['Hard'] == 2
+    assert counts['Easy'] + counts['Medium'] == 18
+
+
+def test_high_frequency_weight():
+    records = [_record(i, hf=int(i <= 10)) for i in range(1, 1001)]
+    index = _index(records)
+    rng = random.Random(4)
+    weighted = sum(sum(1 for i in index.sample(10, ('basic',), hf_weight=50, rng=rng) if i <= 10) for _ in range(200))
+    uniform = sum(sum(1 for i in index.sample(10, ('basic',), rng=rng) if i <= 10) for _ in range(200))
+    assert weighted > 5 * uniform
+    # 权重为 0：普通题够用时不抽高频题
+    assert all(i > 10 for i in index.sample(30, ('basic',), hf_weight=0, rng=rng))
+
+
+def test_index_follows_bank_version(app_client):
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title, difficulty) VALUES(1, 'Python Basics', 'Q1', 'Easy')")
+    bank_cache.invalidate()
+    first = sampling_index()
+    assert first is sampling_index()
+    assert first.count(('basic',)) == 1
+
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title, difficulty) VALUES(2, 'Python Basics', 'Q2', 'Hard')")
+    bank_cache.invalidate()
+    assert sampling_index().count(('basic',)) == 2
+
+    start = app_client.post('/exam/api/start', json={'count': 5, 'difficulty_mix': {'Hard': 1}}).get_json()['data']
+    assert start['question_ids'] == [2]
+    assert app_client.post('/exam/api/start', json={'difficulty_mix': [1]}).status_code == 400
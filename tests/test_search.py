@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from app.database import db
+from app.database.search import search_questions
+
+QUESTIONS = [
+    (1, 'Python Basics', 'Python 中如何定义一个列表？', '使用 []', '使用 list()', '使用 {}', '使用 tuple()'),
+    (2, 'Python Basics', '列表推导式的语法', '[x for x in y]', '(x for x in y)', '{x: y}', 'map()'),
+    (3, 'Flask Framework', 'Flask 中如何定义路由', '@app.route', 'app.url', 'route()', 'flask.path'),
+    (4, 'Flask Framework', '蓝图的作用', '拆分应用', '定义模型', '渲染模板', '管理 <script> 标签'),
+]
+ANSWERS = [
+    (1, 'A', '列表用方括号定义', '列表'),
+    (2, 'A', '推导式返回新列表', '推导式'),
+    (3, 'A', '用 app.route 装饰器注册路由', 'Flask 路由'),
+    (4, 'A', '蓝图用于拆分应用', 'Flask 蓝图'),
+]
+
+
+def _seed():
+    with db.get_conn() as conn:
+        conn.executemany(
+            'INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d) VALUES(?,?,?,?,?,?,?)',
+            QUESTIONS,
+        )
+        conn.executemany(
+            'INSERT INTO answers(question_id, correct_answer, analysis, knowledge_point) VALUES(?,?,?,?)', ANSWERS
+        )
+
+
+def _search(client, qs):
+    resp = client.get('/question/api/search?' + qs)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_search_ranks_and_highlights(app_client):
+    _seed()
+    data = _search(app_client, 'q=定义一个列表')
+    assert [q['id'] for q in data['data']] == [1]
+    assert data['ranked'] and data['data'][0]['score'] > 0
+    assert '<mark>' in data['data'][0]['snippet']
+
+    # 题干命中排在只在解析/选项里命中的前面
+    ids = [q['id'] for q in _search(app_client, 'q=app.route')['data']]
+    assert ids == [3]
+    ids = [q['id'] for q in _search(app_client, 'q=推导式')['data']]
+    assert ids == [2]
+
+    # 选项里的 HTML 被转义，只保留高亮标签
+    snippet = _search(app_client, 'q=script')['data'][0]['snippet']
+    assert '&lt;<mark>script</mark>&gt;' in snippet
+
+
+def test_short_terms_category_and_pagination(app_client):
+    _seed()
+    # 两个字的词 trigram 无法索引，走 LIKE
+    data = _search(app_client, 'q=列表')
+    assert [q['id'] for q in data['data']] == [1, 2]
+    assert not data['ranked'] and '<mark>列表</mark>' in data['data'][0]['snippet']
+
+    # 长词 + 短词同时满足
+    assert [q['id'] for q in _search(app_client, 'q=Flask 蓝图')['data']] == [4]
+    assert [q['id'] for q in _search(app_client, 'q=如何定义&category=framework')['data']] == [3]
+
+    first = _search(app_client, 'q=如何定义&page_size=1')
+    second = _search(app_client, 'q=如何定义&page_size=1&page=2')
+    assert first['has_more'] and not second['has_more']
+    assert {first['data'][0]['id'], second['data'][0]['id']} == {1, 3}
+
+    assert app_client.get('/question/api/search').status_code == 400
+    assert app_client.get('/question/api/search?q=x&category=nope').status_code == 400
+    assert app_client.get('/question/api/search?q=x&page=0').status_code == 400
+
+
+def test_index_follows_writes(app_client):
+    _seed()
+    with db.get_conn() as conn:
+        conn.execute("UPDATE questions SET title = '装饰器的原理' WHERE id = 1")
+        conn.execute("UPDATE answers SET analysis = '闭包加语法糖' WHERE question_id = 1")
+        conn.execute('DELETE FROM answers WHERE question_id = 4')
+        conn.execute('DELETE FROM questions WHERE id = 4')
+    assert [q['id'] for q in _search(app_client, 'q=装饰器的原理')['data']] == [1]
+    assert [q['id'] for q in _search(app_client, 'q=语法糖')['data']] == [1]
+    assert _search(app_client, 'q=定义一个列表')['data'] == []
+    assert _search(app_client, 'q=拆分应用')['data'] == []
+
+
+def test_legacy_database_without_fts(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'legacy.db'))
+    conn.execute('CREATE TABLE questions (id INTEGER PRIMARY KEY, category TEXT, title TEXT, option_a TEXT, '
+                 'option_b TEXT, option_c TEXT, option_d TEXT, difficulty TEXT, is_high_frequency INTEGER)')
+    conn.execute('CREATE TABLE answers (id INTEGER PRIMARY KEY, question_id INTEGER, correct_answer TEXT, '
+                 'analysis TEXT, knowledge_point TEXT)')
+    conn.executemany('INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d) VALUES(?,?,?,?,?,?,?)', QUESTIONS)
+    conn.executemany('INSERT INTO answers(question_id, correct_answer, analysis, knowledge_point) VALUES(?,?,?,?)', ANSWERS)
+    page = search_questions(conn, '如何定义', category_key='framework')
+    assert [q['id'] for q in page.items] == [3]
+    assert page.items[0]['category_key'] == 'framework' and not page.ranked
+    conn.close()
+
+
+def test_migration_without_fts5_falls_back_to_like(tmp_path, monkeypatch):
+    from app.database import migrations
+    from app.database.search import has_fts
+
+    monkeypatch.setattr(migrations, '_fts5_trigram_available', lambda conn: False)
+    conn = sqlite3.connect(str(tmp_path / 'nofts.db'))
+    migrations.migrate(conn)
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+    assert not has_fts(conn)
+
+    conn.executemany(
+        'INSERT INTO questions(id, category, title, option_a, option_b, option_c, option_d) VALUES(?,?,?,?,?,?,?)',
+        QUESTIONS,
+    )
+    conn.commit()
+    page = search_questions(conn, '路由', None, 10, 0)
+    assert [r['id'] for r in page.items] == [3] and not page.ranked
+    conn.close()
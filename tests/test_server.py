@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app import server
+from app.server import PreforkServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_quick_crashes_back_off_then_give_up(monkeypatch):
+    monkeypatch.setattr(server, '_log', lambda msg: None)
+    srv = PreforkServer(app=None, workers=1)
+    delays = []
+    for i in range(server.MAX_QUICK_CRASHES - 1):
+        before = time.monotonic()
+        srv._schedule_respawn(1000 + i, 256, uptime=0.1)
+        delays.append(round(srv._respawn_at[-1] - before, 2))
+    assert delays == sorted(delays)
+    assert delays[0] >= 0.5 and delays[-1] <= server.RESPAWN_BACKOFF_MAX + 1
+    assert not srv._stopping
+
+    srv._schedule_respawn(2000, 256, uptime=0.1)
+    assert srv._stopping and srv._gave_up
+
+
+def test_long_lived_worker_respawns_immediately(monkeypatch):
+    monkeypatch.setattr(server, '_log', lambda msg: None)
+    srv = PreforkServer(app=None, workers=1)
+    srv._quick_crashes = 3
+    srv._schedule_respawn(1000, 0, uptime=server.MIN_WORKER_UPTIME + 1)
+    assert srv._quick_crashes == 0
+    assert srv._respawn_at[-1] <= time.monotonic()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork 需要 os.fork')
+def test_production_server_graceful_restart(tmp_path):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = {
+        **os.environ,
+        'APP_ENV': 'production',
+        'DB_PATH': str(tmp_path / 'app.db'),
+        'WEB_CONCURRENCY': '2',
+        'PORT': str(port),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, 'run.py')],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                if _get(base + '/') == 200:
+                    break
+            except OSError:
+                pass
+            assert time.monotonic() < deadline and proc.poll() is None
+            time.sleep(0.1)
+
+        # 生产模式不暴露调试路由
+        assert _get(base + '/__debug/ping') == 404
+
+        proc.send_signal(signal.SIGHUP)
+        for _ in range(30):
+            assert _get(base + '/question/api/questions') == 200
+            time.sleep(0.02)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        code = proc.wait(timeout=40)
+    assert code == 0
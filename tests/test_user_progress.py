@@ -24,3 +24,73 @@ def test_error_and_favorite(db_manager):
     assert any(f['id'] == 1 for f in favs)
     removed = up.remove_favorite(1)
     assert removed is True
+
+
+def test_cached_aggregates_follow_writes(app_client):
+    from app.core.user_progress import user_progress
+    from app.database import db
+    from app.database.bank import bank_cache
+
+    with db.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO questions(id, category, title, option_a, option_b, difficulty) VALUES(?, ?, ?, 'a', 'b', 'Easy')",
+            [(1, 'Python Basics', 'Q1'), (2, 'Flask Framework', 'Q2')],
+        )
+        conn.executemany("INSERT INTO answers(question_id, correct_answer) VALUES(?, 'A')", [(1,), (2,)])
+    bank_cache.invalidate()
+
+    assert user_progress.get_progress()['total'] == 0
+    rebuilds = user_progress.stats()['rebuilds']
+    for qid, ans in ((1, 'A'), (2, 'B'), (2, 'C')):
+        app_client.post('/question/api/submit_answer', json={'question_id': qid, 'user_answer': ans})
+    app_client.post('/progress/api/favorite/toggle', json={'question_id': 2})
+
+    progress = user_progress.get_progress()
+    assert (progress['total'], progress['correct'], progress['error_count'], progress['favorite_count']) == (3, 1, 1, 1)
+    assert progress['category_stats']['Flask Framework'] == {'total': 2, 'correct': 0, 'accuracy': 0}
+    # 增量更新，没有重建
+    assert user_progress.stats()['rebuilds'] == rebuilds
+
+    # 绕过服务直接改库：版本戳变化，下次读取时重建
+    with db.get_conn() as conn:
+        conn.execute('DELETE FROM favorites')
+    assert user_progress.get_progress()['favorite_count'] == 0
+    assert user_progress.stats()['rebuilds'] == rebuilds + 1
+    assert user_progress.get_progress() == user_progress.rebuild().summary()
+
+
+def test_correct_answer_leaves_error_book(app_client):
+    from app.core.user_progress import user_progress
+    from app.database import db
+    from app.database.bank import bank_cache
+
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO questions(id, category, title, option_a, option_b) VALUES(1, 'Python Basics', 'Q1', 'a', 'b')")
+        conn.execute("INSERT INTO answers(question_id, correct_answer) VALUES(1, 'A')")
+    bank_cache.invalidate()
+
+    app_client.post('/question/api/submit_answer', json={'question_id': 1, 'user_answer': 'B'})
+    assert [q['id'] for q in user_progress.get_error_questions()] == [1]
+    assert user_progress.get_progress()['error_count'] == 1
+
+    app_client.post('/question/api/submit_answer', json={'question_id': 1, 'user_answer': 'A'})
+    assert user_progress.get_error_questions() == []
+    assert user_progress.get_progress()['error_count'] == 0
+    mastered = user_progress.get_error_questions(mastered=True)
+    assert [(q['id'], q['attempts'], q['wrong'], q['streak']) for q in mastered] == [(1, 2, 1, 1)]
+    assert user_progress.get_progress() == user_progress.rebuild().summary()
+    assert '已掌握' in app_client.get('/progress/errors?show=mastered').get_data(as_text=True)
+
+
+def test_schema_check_runs_once_per_database(db_manager):
+    up = UserProgress(db_manager)
+    up.save_answer(1, 'A')
+    statements = []
+    up._conn().set_trace_callback(statements.append)
+    try:
+        up.save_answer(2, 'B')
+        up.get_progress()
+        up.get_error_questions()
+    finally:
+        up._conn().set_trace_callback(None)
+    assert not any('table_info' in s for s in statements)